@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from cdxsummary import __VERSION
+from cdxsummary.columnar import ENGINES
+from cdxsummary.decompress import compression, open_compressed
+from cdxsummary.parser import PARSERS
+from cdxsummary.reader import MappedCDXFile
+
+from generate import generate
+
+
+def run_engine(engine, path, parser, samples, precision):
+    stream = open_compressed(path) if compression(path) else MappedCDXFile(path)
+    start = time.perf_counter()
+    report = ENGINES[engine](samplesize=samples, parser=parser, precision=precision)(stream)
+    elapsed = time.perf_counter() - start
+    stream.close()
+    report.pop("samples")
+    return {"elapsed": elapsed, "report": json.dumps(report, sort_keys=True), "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def measure(engine, path, parser, samples, precision, repeat):
+    ctx = multiprocessing.get_context("spawn")
+    runs = []
+    for _ in range(repeat):
+        with ctx.Pool(1) as pool:
+            runs.append(pool.apply(run_engine, (engine, path, parser, samples, precision)))
+    return min(runs, key=lambda run: run["elapsed"])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare the record and columnar analysis engines on a CDX file and report lines/sec, speedup, and whether reports are identical as JSON.")
+    ap.add_argument("-n", "--lines", type=int, default=10000000, help="Number of synthetic CDX lines to generate when no input is given (default: 10000000)")
+    ap.add_argument("-o", "--out", help="Keep the generated synthetic CDX at the given path (default: temporary file)")
+    ap.add_argument("-p", "--parser", choices=PARSERS, default="fast", help="CDX line parser engine (default: 'fast')")
+    ap.add_argument("-P", "--precision", type=int, default=12, help="HyperLogLog precision, 0 to disable (default: 12)")
+    ap.add_argument("-r", "--repeat", type=int, default=3, help="Number of runs per engine, best is reported (default: 3)")
+    ap.add_argument("-s", "--samples", type=int, default=10, help="Sample size (default: 10)")
+    ap.add_argument("cdx", nargs="?", help="Local CDX file (plain/gz/bz2/xz/zst), generated with generate.py if omitted")
+    args = ap.parse_args()
+
+    path = args.cdx
+    generated = not path and not args.out
+    if not path:
+        path = args.out or tempfile.mkstemp(suffix=".cdx")[1]
+        with open(path, "w") as out:
+            generate(out, args.lines)
+
+    try:
+        runs = {engine: measure(engine, path, args.parser, args.samples, args.precision, args.repeat) for engine in ENGINES}
+        lines = json.loads(runs["record"]["report"])["captures"]
+        results = {engine: {
+            "seconds": round(run["elapsed"], 4),
+            "lines_per_sec": round(lines / run["elapsed"]) if run["elapsed"] else None,
+            "peak_rss_kb": run["peak_rss_kb"]
+        } for engine, run in runs.items()}
+        print(json.dumps({
+            "version": __VERSION,
+            "python": sys.version.split()[0],
+            "input": path,
+            "bytes": os.path.getsize(path),
+            "captures": lines,
+            "parser": args.parser,
+            "precision": args.precision,
+            "engines": results,
+            "speedup": round(runs["record"]["elapsed"] / runs["columnar"]["elapsed"], 2),
+            "identical": runs["record"]["report"] == runs["columnar"]["report"]
+        }, indent=2))
+    finally:
+        if generated:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
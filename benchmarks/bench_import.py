@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(1, ROOT)
+
+from cdxsummary import __VERSION
+
+from generate import generate
+
+
+MODES = {
+    "report": ["--report", "--samples", "0"],
+    "json": ["--json"]
+}
+HEAVY = ("internetarchive", "requests", "rich", "humanize", "numpy")
+
+
+def command(mode, path, python=sys.executable):
+    return [python, "-m", "cdxsummary", *MODES[mode], path]
+
+
+def environment():
+    return dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+
+
+def wall_times(cmd, repeat):
+    env = environment()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def import_times(cmd):
+    out = subprocess.run([cmd[0], "-X", "importtime", *cmd[1:]], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env=environment(), text=True).stderr
+    modules = {}
+    toplevel = set()
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            modules[name.strip()] = int(cumulative) / 1000
+        except ValueError:
+            continue
+        if not name.startswith("  "):
+            toplevel.add(name.strip())
+    return modules, toplevel
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Measure cdxsummary CLI startup time on a small local CDX file and fail if it exceeds the budget.")
+    ap.add_argument("-b", "--budget", type=float, default=100, metavar="MS", help="Maximum best-of-N wall-clock time in milliseconds (default: 100)")
+    ap.add_argument("-m", "--modes", nargs="+", choices=MODES, default=["report"], help="CLI modes to measure (default: report)")
+    ap.add_argument("-n", "--lines", type=int, default=100, help="Number of synthetic CDX lines to generate when no input is given (default: 100)")
+    ap.add_argument("-r", "--repeat", type=int, default=10, help="Number of runs per mode (default: 10)")
+    ap.add_argument("-t", "--top", type=int, default=10, help="Number of slowest imports to report (default: 10)")
+    ap.add_argument("cdx", nargs="?", help="Local CDX file, generated with generate.py if omitted")
+    args = ap.parse_args()
+
+    path = args.cdx
+    if not path:
+        path = tempfile.mkstemp(suffix=".cdx")[1]
+        with open(path, "w") as out:
+            generate(out, args.lines, hostcount=10)
+
+    try:
+        interpreter = min(wall_times([sys.executable, "-c", "pass"], args.repeat))
+        results = {}
+        for mode in args.modes:
+            cmd = command(mode, path)
+            times = wall_times(cmd, args.repeat)
+            modules, toplevel = import_times(cmd)
+            top = sorted(((name, modules[name]) for name in toplevel), key=lambda item: -item[1])[:args.top]
+            results[mode] = {
+                "best_ms": round(min(times), 1),
+                "median_ms": round(statistics.median(times), 1),
+                "over_interpreter_ms": round(min(times) - interpreter, 1),
+                "heavy_imports": sorted(name for name in HEAVY if name in modules),
+                "top_imports_ms": {name: round(ms, 1) for name, ms in top},
+                "within_budget": min(times) <= args.budget
+            }
+    finally:
+        if not args.cdx:
+            os.remove(path)
+
+    print(json.dumps({
+        "version": __VERSION,
+        "python": sys.version.split()[0],
+        "budget_ms": args.budget,
+        "interpreter_ms": round(interpreter, 1),
+        "modes": results
+    }, indent=2))
+    if not all(result["within_budget"] for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+import argparse
+import fileinput
+import json
+import os
+import sys
+import time
+
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from cdxsummary.decompress import compression, open_compressed
+from cdxsummary.parser import PARSERS
+from cdxsummary.reader import MappedCDXFile
+
+
+def fileinput_lines(path):
+    return fileinput.input(files=path, mode="rb", openhook=fileinput.hook_compressed)
+
+
+def buffered_lines(path):
+    return open(path, "rb")
+
+
+def mmap_lines(path):
+    return MappedCDXFile(path)
+
+
+def builtin_lines(path):
+    return open_compressed(path, decoder="builtin")
+
+
+def external_lines(path):
+    return open_compressed(path, decoder="external")
+
+
+READERS = {
+    "fileinput": fileinput_lines,
+    "buffered": buffered_lines,
+    "mmap": mmap_lines
+}
+
+COMPRESSED_READERS = {
+    "fileinput": fileinput_lines,
+    "builtin": builtin_lines,
+    "external": external_lines
+}
+
+
+def measure(reader, path, parse=None):
+    stream = reader(path)
+    count = 0
+    start = time.perf_counter()
+    if parse:
+        for line in stream:
+            try:
+                parse(line)
+            except ValueError:
+                pass
+            count += 1
+    else:
+        for line in stream:
+            count += 1
+    elapsed = time.perf_counter() - start
+    stream.close()
+    return {"lines": count, "seconds": round(elapsed, 4), "lines_per_sec": round(count / elapsed) if elapsed else None}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare lines/sec of local CDX input readers and decompressors.")
+    ap.add_argument("-p", "--parser", choices=PARSERS, help="Also parse each line with the given parser engine")
+    ap.add_argument("-r", "--repeat", type=int, default=3, help="Number of runs per reader, best is reported (default: 3)")
+    ap.add_argument("cdx", help="Local CDX file (plain/gz/bz2/xz/zst)")
+    args = ap.parse_args()
+
+    parse = PARSERS.get(args.parser)
+    results = {}
+    for name, reader in (COMPRESSED_READERS if compression(args.cdx) else READERS).items():
+        runs = [measure(reader, args.cdx, parse) for _ in range(args.repeat)]
+        results[name] = min(runs, key=lambda run: run["seconds"])
+    print(json.dumps({"input": args.cdx, "bytes": os.path.getsize(args.cdx), "parser": args.parser, "readers": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from cdxsummary import __VERSION
+from cdxsummary.analyzer import CDXAnalyzer
+from cdxsummary.binary import dump_report, load_report
+from cdxsummary.console import write_json
+
+
+FORMATS = ("json", "binary", "binary-plain")
+
+
+def synthetic_report(hosts, mimes, seed=0):
+    rng = random.Random(seed)
+    analyzer = CDXAnalyzer(samplesize=10)
+    report = analyzer._report()
+    report["tophosts"] = {f"www.host{i}.example{i % 997}.com": rng.randint(1, 100000) for i in range(hosts)}
+    report["mimestatus"] = {f"application/x-type{i}": {code: rng.randint(1, 1000) for code in ("200", "301", "404")} for i in range(mimes)}
+    report["yearmonth"] = {str(year): {f"{month:02}": rng.randint(1, 1000) for month in range(1, 13)} for year in range(1996, 2024)}
+    report["pathquery"] = {f"P{p}": {f"Q{q}": rng.randint(1, 1000) for q in range(5)} for p in range(5)}
+    report["samples"] = [(f"2020010100000{i}", f"http://www.host{i}.example.com/") for i in range(10)]
+    report["captures"] = sum(report["tophosts"].values())
+    report["hosts"] = hosts
+    report["first"], report["last"] = "19960101000000", "20231231235959"
+    return report
+
+
+def write_report(report, path, fmt):
+    start = time.perf_counter()
+    if fmt == "json":
+        with open(path, "w") as f:
+            write_json(report, f)
+    else:
+        with open(path, "wb") as f:
+            dump_report(report, f, compress=fmt == "binary")
+    return time.perf_counter() - start
+
+
+def load(path, fmt):
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        report = json.loads(b"".join(f)) if fmt == "json" else load_report(f)
+    decoded = time.perf_counter() - start
+    report = CDXAnalyzer().load_report(report)
+    elapsed = time.perf_counter() - start
+    return {"elapsed": elapsed, "decoded": decoded, "hosts": len(report["tophosts"]), "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def measure(path, fmt, repeat):
+    ctx = multiprocessing.get_context("spawn")
+    runs = []
+    for _ in range(repeat):
+        with ctx.Pool(1) as pool:
+            runs.append(pool.apply(load, (path, fmt)))
+    return min(runs, key=lambda run: run["elapsed"])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare the size and load time of JSON and binary cdxsummary reports and print the results as JSON.")
+    ap.add_argument("-H", "--hosts", type=int, default=1000000, help="Number of hosts in the synthetic report when no input is given (default: 1000000)")
+    ap.add_argument("-m", "--mimes", type=int, default=10000, help="Number of distinct MIME types in the synthetic report when no input is given (default: 10000)")
+    ap.add_argument("-r", "--repeat", type=int, default=3, help="Number of load runs per format, best is reported (default: 3)")
+    ap.add_argument("report", nargs="?", help="JSON or binary report to convert and load, synthetic if omitted")
+    args = ap.parse_args()
+
+    if args.report:
+        with open(args.report, "rb") as f:
+            report = load_report(f)
+    else:
+        report = synthetic_report(args.hosts, args.mimes)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in FORMATS:
+            path = os.path.join(tmp, f"report.{fmt}")
+            written = write_report(report, path, fmt)
+            run = measure(path, fmt, args.repeat)
+            results[fmt] = {
+                "bytes": os.path.getsize(path),
+                "write_seconds": round(written, 4),
+                "decode_seconds": round(run["decoded"], 4),
+                "load_seconds": round(run["elapsed"], 4),
+                "peak_rss_kb": run["peak_rss_kb"]
+            }
+    print(json.dumps({
+        "version": __VERSION,
+        "python": sys.version.split()[0],
+        "input": args.report,
+        "hosts": len(report["tophosts"]),
+        "formats": results
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from cdxsummary import __VERSION
+from cdxsummary.analyzer import CDXAnalyzer
+from cdxsummary.decompress import compression, open_compressed
+from cdxsummary.parser import PARSERS
+from cdxsummary.reader import MappedCDXFile
+
+
+def open_input(path):
+    return open_compressed(path) if compression(path) else MappedCDXFile(path)
+
+
+def read_lines(path):
+    stream = open_input(path)
+    lines = list(stream)
+    stream.close()
+    return lines
+
+
+def parsed(lines, parser):
+    parse = PARSERS[parser]
+    records = []
+    for line in lines:
+        try:
+            records.append(parse(line))
+        except Exception:
+            pass
+    return records
+
+
+def stage_io(path, lines, parser, samples):
+    return lambda: read_lines(path)
+
+
+def stage_parse(path, lines, parser, samples):
+    parse = PARSERS[parser]
+    def run():
+        for line in lines:
+            try:
+                parse(line)
+            except Exception:
+                pass
+    return run
+
+
+def stage_aggregate(path, lines, parser, samples):
+    records = parsed(lines, parser)
+    analyzer = CDXAnalyzer(samplesize=0, parser=parser)
+    analyzer._parse = lambda record: record
+    return lambda: analyzer(records)
+
+
+def stage_sample(path, lines, parser, samples):
+    records = parsed(lines, parser)
+    sampler = CDXAnalyzer(samplesize=samples, parser=parser)._sampler
+    def run():
+        for record in records:
+            sampler(record)
+    return run
+
+
+def stage_render(path, lines, parser, samples):
+    from cdxsummary.summarizer import ReportSummarizer
+    report = CDXAnalyzer(samplesize=samples, parser=parser)(lines)
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            rs = ReportSummarizer(report, outfile=sys.stdout)
+            rs.print_summary()
+            rs.print_summary_json()
+    return run
+
+
+STAGES = {
+    "io": stage_io,
+    "parse": stage_parse,
+    "aggregate": stage_aggregate,
+    "sample": stage_sample,
+    "render": stage_render
+}
+
+
+def measure(name, path, lines, parser, samples, repeat):
+    best = None
+    for _ in range(repeat):
+        run = STAGES[name](path, lines, parser, samples)
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Time each cdxsummary pipeline stage on its own over the same pre-read lines and report lines/sec and peak RSS as JSON.")
+    ap.add_argument("-p", "--parser", choices=PARSERS, default="fast", help="CDX line parser engine (default: 'fast')")
+    ap.add_argument("-r", "--repeat", type=int, default=3, help="Number of runs per stage, best is reported (default: 3)")
+    ap.add_argument("-s", "--samples", type=int, default=10, help="Sample size for the sampling and rendering stages (default: 10)")
+    ap.add_argument("-S", "--stages", nargs="+", choices=STAGES, default=list(STAGES), help="Stages to run (default: all)")
+    ap.add_argument("cdx", help="Local CDX file (plain/gz/bz2/xz/zst), see generate.py for synthetic data")
+    args = ap.parse_args()
+
+    lines = read_lines(args.cdx)
+    results = {}
+    for name in args.stages:
+        seconds = measure(name, args.cdx, lines, args.parser, args.samples, args.repeat)
+        results[name] = {
+            "seconds": round(seconds, 4),
+            "lines_per_sec": round(len(lines) / seconds) if name != "render" and seconds else None
+        }
+    print(json.dumps({
+        "version": __VERSION,
+        "python": sys.version.split()[0],
+        "input": args.cdx,
+        "bytes": os.path.getsize(args.cdx),
+        "lines": len(lines),
+        "parser": args.parser,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "stages": results
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+import argparse
+import gzip
+import random
+import sys
+
+
+TLDS = ["com", "org", "net", "gov", "edu", "de", "uk", "jp", "br", "in"]
+WORDS = ["news", "blog", "shop", "media", "static", "cdn", "api", "img", "docs", "forum", "wiki", "app"]
+SEGMENTS = ["index", "about", "2021", "page", "article", "assets", "css", "js", "img", "en", "search", "tag", "user", "view", "id"]
+PARAMS = ["id", "q", "page", "sort", "ref", "utm_source", "utm_medium", "lang", "session", "v"]
+
+MIMES = [
+    ("text/html", 50), ("image/jpeg", 10), ("image/png", 6), ("text/css", 5), ("application/javascript", 6),
+    ("application/json", 3), ("text/xml", 2), ("text/plain", 3), ("application/pdf", 2), ("font/woff2", 1),
+    ("video/mp4", 1), ("audio/mpeg", 1), ("warc/revisit", 6), ("unk", 2), ("application/x-garbage;charset=junk", 1)
+]
+STATUSES = [("200", 70), ("301", 8), ("302", 8), ("304", 1), ("404", 7), ("403", 1), ("500", 2), ("503", 1), ("-", 2)]
+COLUMNS = [(11, 85), (10, 5), (9, 10)]
+MALFORMED = ["garbage line without fields", "com,example)/ 2021 http://example.com/ text/html 200 X - - 1 2 f.warc.gz", "com,example)/\t20210318000104\thttp://example.com/ text/html 200 X - - 1 2 f.warc.gz", ""]
+
+
+def weighted(rng, table):
+    values, weights = zip(*table)
+    cum = []
+    total = 0
+    for w in weights:
+        total += w
+        cum.append(total)
+    return lambda: values[rng.choices(range(len(values)), cum_weights=cum)[0]]
+
+
+def hosts(rng, count):
+    names = set()
+    while len(names) < count:
+        parts = [rng.choice(TLDS), f"{rng.choice(WORDS)}{rng.randrange(count)}"]
+        if rng.random() < 0.4:
+            parts.append(rng.choice(["www", "m", "en", "static"]))
+        names.add(",".join(parts))
+    return sorted(names)
+
+
+def host_blocks(rng, count, lines, skew):
+    weights = [rng.paretovariate(skew) for _ in range(count)]
+    total = sum(weights)
+    blocks = [int(weight * lines / total) for weight in weights]
+    for i in rng.sample(range(count), lines - sum(blocks)):
+        blocks[i] += 1
+    return blocks
+
+
+def url_path(rng, queryheavy):
+    path = "/".join(rng.choice(SEGMENTS) for _ in range(min(int(rng.expovariate(0.5)), 9)))
+    query = ""
+    if rng.random() < queryheavy:
+        query = "&".join(f"{rng.choice(PARAMS)}={rng.randrange(1000)}" for _ in range(1 + min(int(rng.expovariate(0.6)), 9)))
+    return path, query
+
+
+def capture(rng, surthost, mime, status, columns, queryheavy):
+    path, query = url_path(rng, queryheavy)
+    surt = f"{surthost})/{path.lower()}" + (f"?{query.lower()}" if query else "")
+    host = ".".join(reversed(surthost.split(",")))
+    url = f"http://{host}/{path}" + (f"?{query}" if query else "")
+    dt = f"{rng.randint(1996, 2023)}{rng.randint(1, 12):02}{rng.randint(1, 28):02}{rng.randint(0, 23):02}{rng.randint(0, 59):02}{rng.randint(0, 59):02}"
+    digest = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ234567") for _ in range(32))
+    redirect = f"http://{host}/" if status in ("301", "302") and rng.random() < 0.5 else "-"
+    size = rng.randint(300, 2000000)
+    offset = rng.randint(0, 1000000000)
+    warc = f"CRAWL-{rng.randint(1, 50):05}.warc.gz"
+    fields = [surt, dt, url, mime, status, digest, redirect]
+    if columns == 11:
+        fields += ["-", str(size), str(offset), warc]
+    elif columns == 10:
+        fields += ["-", str(offset), warc]
+    else:
+        fields += [str(offset), warc]
+    return surt, " ".join(fields)
+
+
+def generate(out, lines, seed=0, hostcount=10000, skew=1.2, queryheavy=0.3, malformed=0.001):
+    rng = random.Random(seed)
+    mime = weighted(rng, MIMES)
+    status = weighted(rng, STATUSES)
+    columns = weighted(rng, COLUMNS)
+    names = hosts(rng, hostcount)
+    for surthost, block in zip(names, host_blocks(rng, len(names), lines, skew)):
+        records = sorted(capture(rng, surthost, mime(), status(), columns(), queryheavy) for _ in range(block))
+        for _, line in records:
+            if rng.random() < malformed:
+                out.write(f"{rng.choice(MALFORMED)}\n")
+            out.write(f"{line}\n")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate deterministic synthetic CDX data for benchmarks.")
+    ap.add_argument("-n", "--lines", type=int, default=1000000, help="Number of valid CDX lines (default: 1000000)")
+    ap.add_argument("-s", "--seed", type=int, default=0, help="Random seed (default: 0)")
+    ap.add_argument("-H", "--hosts", type=int, default=10000, help="Number of distinct hosts (default: 10000)")
+    ap.add_argument("-k", "--skew", type=float, default=1.2, help="Pareto shape of captures per host, lower is more skewed (default: 1.2)")
+    ap.add_argument("-q", "--query-heavy", type=float, default=0.3, help="Fraction of URLs with query strings (default: 0.3)")
+    ap.add_argument("-m", "--malformed", type=float, default=0.001, help="Fraction of extra malformed lines (default: 0.001)")
+    ap.add_argument("-o", "--out", default="-", help="Output file, gzipped if it ends with '.gz' (default: STDOUT)")
+    args = ap.parse_args()
+
+    if args.out == "-":
+        out = sys.stdout
+    elif args.out.endswith(".gz"):
+        out = gzip.open(args.out, "wt")
+    else:
+        out = open(args.out, "w")
+    with out:
+        generate(out, args.lines, seed=args.seed, hostcount=args.hosts, skew=args.skew, queryheavy=args.query_heavy, malformed=args.malformed)
+
+
+if __name__ == "__main__":
+    main()
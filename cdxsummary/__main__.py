@@ -1,139 +1,551 @@
 #!/usr/bin/env python3
 
 import argparse
-import bz2
 import fileinput
-import gzip
 import json
 import os
 import sys
 import re
 
-from internetarchive import get_session
-from requests import Session
-from rich.console import Console
+from functools import lru_cache
+from itertools import islice
 from urllib.parse import urlencode
 
 if not __package__:
     sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
 from cdxsummary import __NAME, __VERSION
-from cdxsummary.summarizer import ReportSummarizer
-from cdxsummary.analyzer import CDXAnalyzer
+from cdxsummary.cache import ReportCache, file_identity, response_identity
+from cdxsummary.columnar import ENGINES
+from cdxsummary.checkpoint import TrackedStream, load_checkpoint, save_checkpoint, skip_bytes
+from cdxsummary.console import errprint
+from cdxsummary.merger import HOSTSLACK, expand_report_paths, merge_parallel, merge_reports
+from cdxsummary.decompress import COMPRESSED, compression, open_compressed, open_decompressed, openhook
+from cdxsummary.filters import LineFilter, RemoteLines, bisect_offset, file_range, timestamp
+from cdxsummary.parallel import analyze_parallel
+from cdxsummary.parser import PARSERS
+from cdxsummary.plugins import DEFAULTS, ENTRYPOINTS, PLUGINS, STRATA, STRATUMSIZE, plugin_class
+from cdxsummary.reader import MappedCDXFile
 
 
 CDXAPI = os.getenv("CDXAPI", "https://web.archive.org/cdx/search")
+PETABOX = os.getenv("PETABOX", "https://archive.org/download")
 ITEMURL = re.compile("^https?://archive.org/(?:download|details)/(?P<id>[^/]+)/?$", re.IGNORECASE)
 URLRE = re.compile("^https?://.+", re.IGNORECASE)
+ITEMID = re.compile(r"^[A-Za-z0-9][\w.-]*$")
+CDXFILE = re.compile(r"\.cdx(\.\w+)?$", re.IGNORECASE)
 
-REQSESSION = Session()
-IASESSION = get_session()
-REQSESSION.headers.update({"User-Agent": f"{__NAME}/{__VERSION}"})
-IASESSION.headers.update({"User-Agent": f"{__NAME}/{__VERSION}"})
 
-errprint = Console(stderr=True, style="red", highlight=False).print
+
+@lru_cache(maxsize=None)
+def get_requests_session():
+    from requests import Session
+    session = Session()
+    session.headers.update({"User-Agent": f"{__NAME}/{__VERSION}"})
+    return session
+
+
+@lru_cache(maxsize=None)
+def get_ia_session():
+    from internetarchive import get_session
+    session = get_session()
+    session.headers.update({"User-Agent": f"{__NAME}/{__VERSION}"})
+    return session
 
 
 def argument_parser():
-    ap = argparse.ArgumentParser(prog=__NAME, description="Summarize web archive capture index (CDX) files.")
+    ap = argparse.ArgumentParser(prog=__NAME, description="Summarize web archive capture index (CDX) files.", epilog=f"Run '{__NAME} serve --help' to summarize inputs on request over HTTP, or '{__NAME} index --help' to build a side index for fast repeated summaries.")
+    ap.add_argument("-b", "--progress", action="store_true", help="Show a live progress bar with throughput on STDERR (periodic log lines, if STDERR is not a terminal)")
     ap.add_argument("-a", "--api", nargs="?", const="matchType=exact", metavar="QUERY", help="CDX API query parameters (default: 'matchType=exact'), treats the last argument as the lookup URL")
+    ap.add_argument("-c", "--concurrency", type=int, default=4, metavar="N", help="Number of CDX API pages or --batch inputs to download concurrently, and of downloaded --batch inputs kept on disk at a time (default: 4)")
+    ap.add_argument("-C", "--checkpoint", metavar="FILE", help="Periodically save the analysis state and input position (or completed CDX API pages) in the given file")
+    ap.add_argument("-D", "--cache", metavar="DIR", help="Cache raw reports in the given directory, keyed by input identity (local path, mtime, size, and inode or remote ETag/Last-Modified)")
+    ap.add_argument("-d", "--decoder", choices=["auto", "builtin", "external"], default="auto", help="Decompress in a background thread ('builtin') or with external tools like pigz/lbzip2/xz/zstd ('external'), 'auto' prefers external tools when available (default: 'auto')")
+    ap.add_argument("-e", "--engine", choices=ENGINES, default="record", help="Analysis engine, 'columnar' aggregates blocks of lines with NumPy (default: 'record')")
+    ap.add_argument("-E", "--checkpoint-every", type=int, default=1000000, metavar="N", help="Number of CDX lines between checkpoints (default: 1000000)")
+    ap.add_argument("-I", "--metrics-interval", type=float, default=10, metavar="SEC", help="Seconds between metrics file updates and progress log lines (default: 10)")
     ap.add_argument("-i", "--item", action="store_true", help="Treat the input argument as a Petabox item identifier instead of a file path")
+    ap.add_argument("-J", "--jobs", type=int, default=1, metavar="N", help="Number of worker processes to analyze local CDX files in parallel shards or --batch inputs in parallel (default: 1)")
     ap.add_argument("-j", "--json", action="store_true", help="Generate summary in JSON format")
+    ap.add_argument("-k", "--keep-hosts", action="store_true", help="Keep full host counts when merging reports to make top hosts exact (default: keep 10x top hosts)")
     ap.add_argument("-l", "--load", action="store_true", help="Load JSON report instead of CDX")
+    ap.add_argument("-M", "--metrics", metavar="FILE", help="Periodically write throughput, parse failure, and timing metrics to the given file as JSON (or Prometheus text format, if it ends with '.prom')")
+    ap.add_argument("-m", "--merge", action="store_true", help="Merge JSON reports from the input files, directories, or glob patterns (plain/gz)")
     ap.add_argument("-o", "--out", nargs="?", type=argparse.FileType("w"), default=sys.stdout, metavar="FILE", help="Write output to the given file (default: STDOUT)")
+    ap.add_argument("-P", "--precision", type=int, default=12, metavar="P", help="HyperLogLog precision (4-18) for distinct URL, host, and (with --dedup) digest estimates, 0 to disable (default: 12)")
+    ap.add_argument("-p", "--parser", choices=PARSERS, default="fast", help="CDX line parser engine, 'fast' falls back to 'regex' for irregular lines (default: 'fast')")
+    ap.add_argument("-R", "--resume", action="store_true", help="Resume from the checkpoint, which also folds lines appended to the input since a completed run")
     ap.add_argument("-r", "--report", action="store_true", help="Generate non-summarized JSON report")
     ap.add_argument("-s", "--samples", nargs="?", type=int, default=10, metavar="N", help="Number of sample memento URLs in summary (default: 10)")
     ap.add_argument("-t", "--tophosts", nargs="?", type=int, default=10, metavar="N", help="Number of hosts with maximum captures in summary (default: 10)")
+    ap.add_argument("-u", "--unordered", action="store_true", help="Analyze CDX API pages in the order of download completion (consecutive counts may be inexact at page boundaries)")
+    ap.add_argument("-Z", "--cache-stats", action="store_true", help="Show report cache statistics as JSON and exit")
+    ap.add_argument("-z", "--cache-size", type=int, default=256, metavar="MIB", help="Maximum size of the report cache in MiB, least recently used reports are evicted first (default: 256)")
+    ap.add_argument("--from", dest="start", type=timestamp("0"), metavar="TIMESTAMP", help="Only analyze captures at or after the given (partial) YYYYMMDDhhmmss timestamp")
+    ap.add_argument("--to", dest="end", type=timestamp("9"), metavar="TIMESTAMP", help="Only analyze captures at or before the given (partial) YYYYMMDDhhmmss timestamp")
+    ap.add_argument("--binary", action="store_true", help="Write the --report in a compact binary format instead of JSON, which --load and --merge detect automatically")
+    ap.add_argument("--plain-hosts", action="store_true", help="Leave the host table of binary reports uncompressed for faster writing")
+    ap.add_argument("--sample-seed", type=int, metavar="N", help="Seed the random samplers for reproducible samples (per worker process with --jobs)")
+    ap.add_argument("--strata", type=strata_kinds, metavar="KINDS", help=f"Also keep a separate sample of memento URLs per stratum of each comma-separated kind ({', '.join(STRATA)}), HTML pages per host and year, and OK captures per MIME group")
+    ap.add_argument("--stratum-samples", type=int, default=STRATUMSIZE, metavar="N", help=f"Number of sample memento URLs per stratum (default: {STRATUMSIZE})")
+    ap.add_argument("--dedup", action="store_true", help="Count duplicate payloads and revisit records by digest, with duplicate bytes per MIME type and host")
+    ap.add_argument("--dedup-memory", type=int, default=256, metavar="MIB", help="Memory budget in MiB for exact digest tracking, beyond which a Bloom filter of the same size is used with a reported false positive rate (default: 256)")
+    ap.add_argument("--by-warc", metavar="FILE", help="Also write per-WARC file capture counts, bytes, offset span, first and last datetimes, and MIME type mix to the given file as JSON (or CSV, if it ends with '.csv')")
+    ap.add_argument("--plugins", type=plugin_specs, metavar="NAMES", help=f"Comma-separated analyzer plugins to run in a single pass over the input, built-in ({', '.join(PLUGINS)}), installed '{ENTRYPOINTS}' entry points, or 'module:Class', 'none' for the overview only (default: {','.join(DEFAULTS)})")
+    ap.add_argument("--max-memory", type=int, metavar="MIB", help="Approximate memory budget in MiB for the analyzer state (per worker process with --jobs), near which top hosts are pruned to heavy hitters with an error bound, rare MIME types are collapsed into 'other/<group>' rows, and small strata are dropped, all recorded in the report as 'approximated'")
+    ap.add_argument("--profile-memory", action="store_true", help="Trace memory allocations with tracemalloc and show the peak traced memory, the peak size of each analyzer structure next to its --max-memory estimate, and the largest allocation sites when done")
+    ap.add_argument("--batch", metavar="FILE", help="Summarize each CDX file path, URL, or IA item ID listed one per line in the given file ('-' for STDIN) separately, with pooled connections, concurrent downloads, and --jobs analysis workers, writing a JSON summary (or --report) per input as JSON lines to --out, and continuing past failed inputs")
+    ap.add_argument("--batch-dir", metavar="DIR", help="With --batch, write the JSON summary (or report) of each input to a file named after it in the given directory instead")
+    ap.add_argument("--raw", action="store_true", help="Write JSON output without pretty-printing and highlighting it with rich, even on a terminal (always, if the output is not a terminal)")
+    ap.add_argument("--index", metavar="FILE", help=f"Summarize from a side index built with '{__NAME} index' instead of CDX input, reading only the blocks partially covered by --prefix, --from, and --to")
+    ap.add_argument("--prefix", metavar="SURT", help="Only analyze captures with SURT URL keys starting with the given prefix, seeks to it in sorted plain local files and remote files with HTTP Range support and stops past it")
     ap.add_argument("-v", "--version", action="version", version=f"{__NAME} {__VERSION}", help="Show version number")
-    ap.add_argument("input", nargs="?", help="CDX file path/URL (plain/gz/bz2) or an IA item ID to process (reads from the STDIN, if empty or '-')")
+    ap.add_argument("input", nargs="*", help="CDX file path/URL (plain/gz/bz2/xz/zst) or an IA item ID to process (reads from the STDIN, if empty or '-'), multiple local files are processed as one concatenated CDX")
     return ap
 
 
+def strata_kinds(value):
+    kinds = [kind.strip() for kind in value.split(",") if kind.strip()]
+    unknown = [kind for kind in kinds if kind not in STRATA]
+    if not kinds or unknown:
+        raise argparse.ArgumentTypeError(f"Invalid strata (comma-separated {', '.join(STRATA)} expected): '{value}'")
+    return list(dict.fromkeys(kinds))
+
+
+def plugin_specs(value):
+    specs = [spec.strip() for spec in value.split(",") if spec.strip()]
+    if specs == ["none"]:
+        return []
+    if not specs:
+        raise argparse.ArgumentTypeError(f"Invalid plugins (comma-separated names expected): '{value}'")
+    for spec in specs:
+        try:
+            plugin_class(spec)
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e))
+    return list(dict.fromkeys(specs))
+
+
 def get_input_url(args):
-    if not args.input:
+    return entry_url(args.input, item=args.item)
+
+
+def entry_url(entry, item=False):
+    if not entry:
         return
-    m = ITEMURL.match(args.input)
+    m = ITEMURL.match(entry)
     if m:
         itemid = m.groupdict().get("id")
-        return f"https://archive.org/download/{itemid}/{itemid}.cdx.gz"
+        return f"{PETABOX}/{itemid}/{itemid}.cdx.gz"
+
+    if item:
+        return f"{PETABOX}/{entry}/{entry}.cdx.gz"
+
+    if URLRE.match(entry):
+        return entry
+
+
+def get_api_url(args):
+    bounds = {"from": args.start, "to": args.end}
+    return f"{CDXAPI}?{args.api}&{urlencode({'url': args.input, **{k: v for k, v in bounds.items() if v}})}"
+
+
+def get_filters(args):
+    return {k: v for k, v in (("prefix", args.prefix), ("start", args.start), ("end", args.end)) if v}
+
+
+def get_sampling(args):
+    sampling = {"seed": args.sample_seed} if args.sample_seed is not None else {}
+    if args.strata:
+        sampling.update(strata=args.strata, stratumsize=args.stratum_samples)
+    return sampling
+
+
+def get_dedup(args):
+    return args.dedup_memory * 1024 * 1024 if args.dedup else None
+
+
+def get_max_memory(args):
+    return args.max_memory * 1024 * 1024 if args.max_memory else None
+
+
+def filter_label(args):
+    return "".join(f" {k}={v}" for k, v in get_filters(args).items())
+
+
+def get_line_filter(analyzer, args):
+    ordered = len(args.files) <= 1 and not args.unordered
+    return LineFilter(parser=args.parser, ordered=ordered, **get_filters(args)).attach(analyzer)
+
+
+def seek_offset(args):
+    if not args.prefix:
+        return 0
+    prefix = args.prefix.encode()
+    input_url = get_input_url(args)
+    try:
+        if input_url and not input_url.endswith(COMPRESSED):
+            lines = RemoteLines(get_session(input_url), input_url)
+            offset = bisect_offset(lines, lines.size(), prefix)
+        elif not input_url and len(args.files) == 1 and not args.files[0].endswith(COMPRESSED) and os.path.isfile(args.files[0]):
+            offset = file_range(args.files[0], prefix)[0]
+        else:
+            return 0
+    except ValueError as e:
+        errprint(f"Scanning from the start: {e}")
+        return 0
+    errprint(f"Seeking to SURT prefix [cyan]{args.prefix}[/cyan] at byte offset [cyan]{offset}[/cyan]")
+    return offset
+
+
+def get_page_fetcher(url, concurrency=1, ordered=True):
+    from requests.adapters import HTTPAdapter
+    from cdxsummary.fetcher import PageFetcher
+    session = get_requests_session()
+    session.mount("http://", HTTPAdapter(pool_maxsize=concurrency))
+    session.mount("https://", HTTPAdapter(pool_maxsize=concurrency))
+    return PageFetcher(session, url, concurrency=concurrency, ordered=ordered, logger=errprint)
+
+
+def get_stream_from_api(url, concurrency=1):
+    for _, lines in get_page_fetcher(url, concurrency=concurrency)():
+        yield from lines
+
+
+def analyze_api(analyzer, args):
+    url = get_api_url(args)
+    source = url + filter_label(args)
+    checkpoint = load_checkpoint(args.checkpoint, source) if args.checkpoint and args.resume else {}
+    done = set(checkpoint.get("done", []))
+    if checkpoint:
+        errprint(f"Resuming from checkpoint with [cyan]{len(done)}[/cyan] completed pages: [magenta]{args.checkpoint}[/magenta]")
+        analyzer.merge(checkpoint["state"])
+    fetcher = get_page_fetcher(url, concurrency=args.concurrency, ordered=not args.unordered)
+    for page, lines in fetcher(skip=done):
+        analyzer(lines)
+        done.add(page)
+        if args.checkpoint:
+            save_checkpoint(args.checkpoint, source, analyzer.partial(), done=sorted(done))
+    if args.checkpoint and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    return analyzer._report()
+
+
+def get_session(url):
+    return get_ia_session() if "archive.org/download/" in url else get_requests_session()
 
-    if args.item:
-        itemid = args.input
-        return f"https://archive.org/download/{itemid}/{itemid}.cdx.gz"
 
-    if URLRE.match(args.input):
-        return args.input
+def pool_connections(session, size):
+    from requests.adapters import HTTPAdapter
+    for prefix in ("http://", "https://"):
+        session.mount(prefix, HTTPAdapter(pool_maxsize=size, max_retries=session.get_adapter(prefix).max_retries))
 
 
-def get_stream_from_api(url):
-    pages = int(REQSESSION.get(f"{url}&showNumPages=true").text)
-    for page in range(pages):
-        pageurl = f"{url}&page={page}"
-        errprint(f"Downloading [[cyan]{page + 1}/{pages}[/cyan]]: [magenta]{pageurl}[/magenta]")
-        r = REQSESSION.get(pageurl, stream=True)
-        if r.ok:
-            r.raw.decode_content = True
-            for line in r.raw:
-                yield line
+def request_url(url, headers={}):
+    return get_session(url).get(url, stream=True, headers=headers)
 
 
-def get_stream_from_url(url):
+def get_stream_from_url(url, offset=0, decoder="auto"):
     errprint(f"Downloading remote file: [magenta]{url}[/magenta]")
-    session = IASESSION if "archive.org/download/" in url else REQSESSION
-    r = session.get(url, stream=True)
+    headers = {"Range": f"bytes={offset}-"} if offset and not url.endswith(COMPRESSED) else {}
+    return get_stream_from_response(request_url(url, headers=headers), url, offset=offset, decoder=decoder)
+
+
+def get_stream_from_response(r, url, offset=0, decoder="auto"):
+    if r.status_code == 416:
+        return iter([])
     if r.ok:
         r.raw.decode_content = True
         stream = r.raw
-        if url.endswith(".gz"):
-            stream = gzip.GzipFile(fileobj=r.raw, mode="rb")
-        if url.endswith(".bz2"):
-            stream = bz2.BZ2File(fileobj=r.raw, mode="rb")
+        ext = compression(url)
+        if ext:
+            stream = open_decompressed(r.raw, ext, decoder=decoder)
+        if offset and r.status_code != 206:
+            return skip_bytes(stream, offset)
         return stream
-    raise Exception(f"{r.status_code} {r.reason}: {url}")
+    from cdxsummary.fetcher import UpstreamError
+    raise UpstreamError(f"{r.status_code} {r.reason}: {url}", r.status_code)
 
 
-def get_stream_from_file(file):
-    if not file or file == "-":
+def get_stream_from_file(files, offset=0, decoder="auto"):
+    if not files or files == ["-"]:
         errprint(f"Summarizing piped data: [magenta]STDIN[/magenta]")
     else:
-        errprint(f"Summarizing local file: [magenta]{file}[/magenta]")
-    return fileinput.input(files=file, mode="rb", openhook=fileinput.hook_compressed)
+        errprint(f"Summarizing local file: [magenta]{', '.join(files)}[/magenta]")
+    if len(files) == 1 and files[0] != "-" and not files[0].endswith(COMPRESSED) and os.path.isfile(files[0]):
+        return MappedCDXFile(files[0], start=offset)
+    if len(files) == 1 and files[0].endswith(COMPRESSED) and os.path.isfile(files[0]):
+        stream = open_compressed(files[0], decoder=decoder)
+        return skip_bytes(stream, offset) if offset else stream
+    stream = fileinput.input(files=files, mode="rb", openhook=openhook(decoder))
+    return skip_bytes(stream, offset) if offset else stream
 
 
 def get_input_stream(args):
     if args.api and args.input:
-        url = f"{CDXAPI}?{args.api}&{urlencode({'url': args.input})}"
-        return get_stream_from_api(url)
+        return get_stream_from_api(get_api_url(args), concurrency=args.concurrency)
+    input_url = get_input_url(args)
+    offset = 0 if args.load else seek_offset(args)
+    if input_url:
+        return get_stream_from_url(input_url, offset=offset, decoder=args.decoder)
+    return get_stream_from_file(args.files, offset=offset, decoder=args.decoder)
+
+
+def analyze_checkpointed(analyzer, args):
+    source = (get_input_url(args) or " ".join(args.files) or "-") + filter_label(args)
+    checkpoint = load_checkpoint(args.checkpoint, source) if args.resume else {}
+    if checkpoint:
+        errprint(f"Resuming from checkpoint at line [cyan]{checkpoint['lines']}[/cyan]: [magenta]{args.checkpoint}[/magenta]")
+        analyzer.merge(checkpoint["state"])
+    offset = checkpoint["offset"] if checkpoint else seek_offset(args)
     input_url = get_input_url(args)
+    stream = get_stream_from_url(input_url, offset=offset, decoder=args.decoder) if input_url else get_stream_from_file(args.files, offset=offset, decoder=args.decoder)
+    tracked = TrackedStream(stream, offset=offset, lines=checkpoint.get("lines", 0))
+    lines = iter(tracked)
+    while True:
+        before = tracked.lines
+        analyzer.update(islice(lines, args.checkpoint_every))
+        save_checkpoint(args.checkpoint, source, analyzer.partial(), offset=tracked.offset, lines=tracked.lines)
+        if tracked.lines - before < args.checkpoint_every:
+            break
+    return tracked, analyzer._report()
+
+
+def analyze_cached(analyzer, cache, args, maxhosts=None):
+    input_url = get_input_url(args)
+    source = input_url or [os.path.realpath(file) for file in args.files]
+    key = cache.key(source, precision=args.precision, **get_filters(args), **get_sampling(args), **({"dedup": get_dedup(args)} if args.dedup else {}), **({"bywarc": True} if args.by_warc else {}), **({"plugins": args.plugins} if args.plugins is not None else {}), **({"maxmemory": get_max_memory(args)} if args.max_memory else {}))
+    samples = args.samples or 0
     if input_url:
-        return get_stream_from_url(input_url)
-    return get_stream_from_file(args.input)
+        entry = cache.lookup(key, samples=samples, tophosts=maxhosts)
+        offset = seek_offset(args)
+        skip = {"Range": f"bytes={offset}-"} if offset else {}
+        errprint(f"Downloading remote file: [magenta]{input_url}[/magenta]")
+        r = request_url(input_url, headers={**cache.validators(entry), **skip})
+        identity = response_identity(r)
+        if entry and (r.status_code == 304 or r.ok and identity["etag"] and identity == entry["identity"]):
+            r.close()
+            report = cache.get(key, samples=samples, revalidated=r.status_code == 304)
+            if report:
+                errprint(f"Serving cached report: [magenta]{input_url}[/magenta]")
+                return None, analyzer.load_report(report)
+            r = request_url(input_url, headers=skip)
+            identity = response_identity(r)
+        cache.miss()
+        input_stream = get_stream_from_response(r, input_url, offset=offset, decoder=args.decoder)
+        report = analyzer(input_stream)
+    else:
+        identity = file_identity(args.files)
+        if cache.lookup(key, samples=samples, tophosts=maxhosts, identity=identity):
+            report = cache.get(key, samples=samples)
+            if report:
+                errprint(f"Serving cached report: [magenta]{', '.join(args.files)}[/magenta]")
+                return None, analyzer.load_report(report)
+        cache.miss()
+        if is_parallelizable(args):
+            errprint(f"Summarizing local file with {args.jobs} jobs: [magenta]{', '.join(args.files)}[/magenta]")
+            input_stream = None
+            report = analyze_parallel(analyzer, args.files, args.jobs, samplesize=args.samples, parser=args.parser, precision=args.precision, decoder=args.decoder, engine=args.engine, filters=get_filters(args), sampling=get_sampling(args), dedup=get_dedup(args), bywarc=bool(args.by_warc), plugins=args.plugins, maxmemory=get_max_memory(args))
+        else:
+            input_stream = get_stream_from_file(args.files, offset=seek_offset(args), decoder=args.decoder)
+            report = analyzer(input_stream)
+    cache.put(key, source, identity, report, samplesize=samples, tophosts=maxhosts)
+    return input_stream, report
+
+
+def analyze_index(analyzer, args):
+    from cdxsummary.indexer import CDXIndex
+    errprint(f"Summarizing from index: [magenta]{args.index}[/magenta]")
+    index = CDXIndex(args.index)
+    try:
+        report = index.query(analyzer, prefix=args.prefix, start=args.start, end=args.end, parser=args.parser)
+        errprint(f"Merged [cyan]{index.nodes}[/cyan] pre-aggregated nodes and scanned [cyan]{index.edges}[/cyan] edge blocks")
+        return report
+    finally:
+        index.close()
+
+
+def input_size(args):
+    if get_input_url(args) or args.api or not args.files or "-" in args.files:
+        return None
+    try:
+        return sum(os.path.getsize(file) for file in args.files)
+    except OSError:
+        return None
+
+
+def get_metrics(analyzer, args):
+    from cdxsummary.metrics import Metrics
+    metrics = Metrics(source=get_input_url(args) or " ".join(args.files) or args.index or "-", total=input_size(args), outfile=args.metrics, interval=args.metrics_interval, progress=args.progress)
+    metrics.attach(analyzer, sample_parse=args.engine == "record")
+    return metrics
+
+
+def private_item_hint(error):
+    if str(error).startswith("403") and "archive.org/download/" in str(error) and not get_ia_session().cookies:
+        errprint("\nIf you have access to this private Internet Archive file, configure your credentials using the 'ia' CLI tool and try again.\n[white]Documentation:[/white] [magenta]https://archive.org/services/docs/api/internetarchive/quickstart.html#configuring[/magenta]")
+        return True
+    return False
+
+
+def is_item_id(entry):
+    return bool(ITEMID.match(entry) and not CDXFILE.search(entry) and not os.path.exists(entry))
+
+
+def analyze_batch(args):
+    from cdxsummary.batch import BatchRunner, batch_name, read_batch
+    inputs = []
+    for entry in read_batch(args.batch):
+        url = entry_url(entry, item=args.item or is_item_id(entry))
+        inputs.append((entry, url, None if url else entry))
+    for session in {id(session): session for session in (get_session(url) for _, url, _ in inputs if url)}.values():
+        pool_connections(session, args.concurrency)
+
+    key = "report" if args.report else "summary"
+    def write(entry, payload, error):
+        if args.batch_dir:
+            if payload is not None:
+                path = os.path.join(args.batch_dir, batch_name(entry))
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, "w") as f:
+                    f.write(payload + "\n")
+                os.replace(tmp, path)
+            return
+        if payload is None:
+            args.out.write(json.dumps({"input": entry, "error": error}) + "\n")
+        else:
+            args.out.write(f"{{\"input\": {json.dumps(entry)}, \"{key}\": {payload}}}\n")
+        args.out.flush()
+
+    if args.batch_dir:
+        os.makedirs(args.batch_dir, exist_ok=True)
+    options = dict(engine=args.engine, decoder=args.decoder, filters=get_filters(args), summarize=not args.report, samplesize=args.samples, maxhosts=None if args.report else args.tophosts, parser=args.parser, precision=args.precision, dedup=get_dedup(args), plugins=args.plugins, maxmemory=get_max_memory(args), **get_sampling(args))
+    errprint(f"Summarizing [cyan]{len(inputs)}[/cyan] batch inputs with {args.concurrency} downloads and {args.jobs} analysis jobs: [magenta]{args.batch}[/magenta]")
+    runner = BatchRunner(get_session, concurrency=args.concurrency, jobs=args.jobs, options=options)
+    done = runner(inputs, write)
+    errprint(f"Summarized [cyan]{done}[/cyan] of [cyan]{len(inputs)}[/cyan] batch inputs")
+    for _, error in runner.failed:
+        if private_item_hint(error):
+            break
+    return not runner.failed
+
+
+def is_cacheable(args):
+    return args.files and not (args.load or args.api or args.merge or args.checkpoint or "-" in args.files)
+
+
+def is_parallelizable(args):
+    return args.jobs > 1 and args.files and not (args.load or args.api or get_input_url(args) or "-" in args.files)
 
 
 def main():
+    if sys.argv[1:2] == ["serve"]:
+        from cdxsummary.server import main as serve
+        return serve(sys.argv[2:])
+    if sys.argv[1:2] == ["index"]:
+        from cdxsummary.indexer import main as index
+        return index(sys.argv[2:])
+
     ap = argument_parser()
     args = ap.parse_args()
+    args.files = args.input
+    args.input = args.input[-1] if args.input else None
 
     if args.api and args.api != "matchType=exact" and not args.input:
         args.input = args.api
         args.api = "matchType=exact"
 
-    if os.isatty(sys.stdin.fileno()) and not args.input:
+    cache = ReportCache(args.cache, maxsize=args.cache_size * 1024 * 1024) if args.cache else None
+    if args.cache_stats:
+        if not cache:
+            ap.error("--cache-stats requires --cache DIR")
+        print(json.dumps(cache.stats(), indent=2))
+        sys.exit()
+
+    if args.index and (args.load or args.merge or args.input):
+        ap.error("--index summarizes the indexed CDX file and cannot be used with --load, --merge, or input arguments")
+    if get_filters(args) and (args.load or args.merge):
+        ap.error("--from, --to, and --prefix filter CDX lines and cannot be used with --load or --merge")
+    if (args.strata or args.dedup or args.by_warc) and args.index:
+        ap.error("--strata, --dedup, and --by-warc cannot be used with --index, which keeps no stratified samples, digests, or WARC files")
+    if args.dedup_memory < 1:
+        ap.error("--dedup-memory must be positive")
+    if args.max_memory is not None and args.max_memory < 1:
+        ap.error("--max-memory must be positive")
+    if args.profile_memory and args.batch:
+        ap.error("--profile-memory traces the analyzer of a single summary and cannot be used with --batch")
+    if args.stratum_samples < 1:
+        ap.error("--stratum-samples must be positive")
+    if args.binary and not args.report:
+        ap.error("--binary requires --report")
+    if args.binary and args.out.isatty():
+        ap.error("refusing to write a binary report to a terminal, use --out FILE or redirect the output")
+    if args.start and args.end and args.start > args.end:
+        ap.error("--from timestamp is after the --to timestamp")
+    if args.batch_dir and not args.batch:
+        ap.error("--batch-dir requires --batch FILE")
+    if args.batch and (args.input or args.api or args.load or args.merge or args.index or args.checkpoint or args.cache or args.by_warc or args.binary or args.progress or args.metrics):
+        ap.error("--batch summarizes the listed inputs separately and cannot be used with input arguments, --api, --load, --merge, --index, --checkpoint, --cache, --by-warc, --binary, --progress, or --metrics")
+
+    if args.batch:
+        sys.exit(0 if analyze_batch(args) else 1)
+
+    if os.isatty(sys.stdin.fileno()) and not args.input and not args.index:
         ap.print_help(file=sys.stderr)
         sys.exit()
 
+    metrics = None
+    profiler = None
     try:
-        input_stream = get_input_stream(args)
+        if args.profile_memory:
+            from cdxsummary.memory import MemoryProfiler
+            profiler = MemoryProfiler()
         maxhosts = None if args.report else args.tophosts
-        cdxanalizer = CDXAnalyzer(samplesize=args.samples, maxhosts=maxhosts, outfile=args.out)
-        if args.load:
-            report = cdxanalizer.load(b"".join(input_stream))
+        cdxanalizer = ENGINES[args.engine](samplesize=args.samples, maxhosts=maxhosts, outfile=args.out, parser=args.parser, precision=args.precision, dedup=get_dedup(args), bywarc=bool(args.by_warc), plugins=args.plugins, maxmemory=get_max_memory(args), **get_sampling(args))
+        if profiler:
+            profiler.attach(cdxanalizer)
+        if get_filters(args) and not args.index:
+            get_line_filter(cdxanalizer, args)
+        if args.progress or args.metrics:
+            metrics = get_metrics(cdxanalizer, args)
+        if args.index:
+            input_stream = None
+            report = analyze_index(cdxanalizer, args)
+        elif args.merge:
+            input_stream = None
+            paths = expand_report_paths(args.files)
+            hostlimit = None if args.keep_hosts or not args.tophosts else args.tophosts * HOSTSLACK
+            if args.jobs > 1:
+                report = merge_parallel(cdxanalizer, paths, args.jobs, samplesize=args.samples, hostlimit=hostlimit, precision=args.precision, sampling=get_sampling(args), plugins=args.plugins, maxmemory=get_max_memory(args))
+            else:
+                report = merge_reports(cdxanalizer, paths, hostlimit=hostlimit)
+        elif args.api and args.input and not args.load:
+            input_stream = None
+            report = analyze_api(cdxanalizer, args)
+        elif cache and is_cacheable(args):
+            input_stream, report = analyze_cached(cdxanalizer, cache, args, maxhosts=maxhosts)
+        elif args.checkpoint and not args.load:
+            input_stream, report = analyze_checkpointed(cdxanalizer, args)
+        elif is_parallelizable(args):
+            errprint(f"Summarizing local file with {args.jobs} jobs: [magenta]{', '.join(args.files)}[/magenta]")
+            input_stream = None
+            report = analyze_parallel(cdxanalizer, args.files, args.jobs, samplesize=args.samples, parser=args.parser, precision=args.precision, decoder=args.decoder, engine=args.engine, filters=get_filters(args), sampling=get_sampling(args), dedup=get_dedup(args), bywarc=bool(args.by_warc), plugins=args.plugins, maxmemory=get_max_memory(args))
+        elif args.load:
+            from cdxsummary.binary import load_report
+            input_stream = get_input_stream(args)
+            report = cdxanalizer.load_report(load_report(input_stream))
         else:
+            input_stream = get_input_stream(args)
             report = cdxanalizer(input_stream)
+        if metrics:
+            metrics.close()
+        if profiler:
+            profiler.close(cdxanalizer)
     except (OSError, Exception) as e:
+        if metrics:
+            metrics.close(done=False)
         errprint(e)
-        if str(e).startswith("403") and "archive.org/download/" in str(e) and not IASESSION.cookies:
-            errprint("\nIf you have access to this private Internet Archive file, configure your credentials using the 'ia' CLI tool and try again.\n[white]Documentation:[/white] [magenta]https://archive.org/services/docs/api/internetarchive/quickstart.html#configuring[/magenta]")
+        private_item_hint(e)
         sys.exit(1)
 
     try:
@@ -141,12 +553,19 @@ def main():
     except:
         pass
 
-    if args.report:
-        cdxanalizer.print_report_json()
+    if args.by_warc:
+        from cdxsummary.warcs import write_table
+        write_table(report.get("warcs", {}), args.by_warc)
+
+    if args.report and args.binary:
+        cdxanalizer.write_report_binary(compress=not args.plain_hosts)
+    elif args.report:
+        cdxanalizer.print_report_json(raw=args.raw)
     else:
+        from cdxsummary.summarizer import ReportSummarizer
         rs = ReportSummarizer(report)
         if args.json:
-            rs.print_summary_json()
+            rs.print_summary_json(raw=args.raw)
         else:
             rs.print_summary()
 
@@ -1,16 +1,24 @@
 import os
 import sys
 
-from collections import defaultdict, Counter
+from itertools import chain, islice
 from json import dumps, loads
-from rich.console import Console
-from rich.json import JSON
 
 if not __package__:
     sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
-from cdxsummary.parser import CDXRecord
-from cdxsummary.sampler import BaseSampler, DynamicRandomStreamSampler
+from cdxsummary.console import print_json
+from cdxsummary.dedup import BUDGET
+from cdxsummary.parser import PARSERS
+from cdxsummary.plugins import DEFAULTS, PLUGINS, STRATUMSIZE, plugin_class
+from cdxsummary.sampler import BaseSampler, ReservoirSampler
+from cdxsummary.sketch import HyperLogLog
+
+
+SKETCHES = ("urls", "hosts", "digests")
+CHECKLINES = 65536
+HIGHWATER = 0.9
+LOWWATER = 0.7
 
 
 class CDXAnalyzer():
@@ -18,30 +26,80 @@ class CDXAnalyzer():
         return cdxrec.status == "200" and cdxrec.mime == "text/html" and not cdxrec.surt.endswith("/robots.txt")
 
 
+    def _ok_candidate(self, cdxrec):
+        return cdxrec.status == "200" and not cdxrec.surt.endswith("/robots.txt")
+
+
     def _sample_parts(self, cdxrec):
         return (cdxrec.datetime, cdxrec.url.replace(":80/", "", 1))
 
 
+    def _host_name(self, host):
+        return ".".join(reversed(host.split(",")))
+
+
     def _top_hosts(self, th):
-        return {".".join(reversed(host.split(","))): count for host, count in th}
+        return {self._host_name(host): count for host, count in th}
 
 
-    def __init__(self, samplesize=0, urlsampler=None, maxhosts=None, outfile=sys.stdout):
+    def __init__(self, samplesize=0, urlsampler=None, maxhosts=None, outfile=sys.stdout, parser="fast", precision=12, seed=None, strata=None, stratumsize=STRATUMSIZE, dedup=None, bywarc=False, plugins=None, maxmemory=None):
+        self._parse = PARSERS[parser]
+        self._sketches = {key: HyperLogLog(precision) for key in SKETCHES if key != "digests" or dedup} if precision else {}
         self._sampler = urlsampler
         if not self._sampler:
-            self._sampler = DynamicRandomStreamSampler(size=samplesize, valid=self._sample_candidate, transform=self._sample_parts) if samplesize else BaseSampler()
+            self._sampler = ReservoirSampler(size=samplesize, valid=self._sample_candidate, transform=self._sample_parts, seed=seed) if samplesize else BaseSampler()
+        self._seed = seed
+        self._stratakinds = strata or []
+        self._stratumsize = stratumsize
+        self._dedupbudget = dedup or BUDGET
         self._maxhosts = maxhosts
+        self._maxmemory = maxmemory
+        self._approximated = {}
+        self._profiler = None
+        self._adopt = plugins is None
+        self._plugins = {}
+        for plugin in [*(DEFAULTS if plugins is None else plugins), *(["strata"] if strata else []), *(["dedup"] if dedup else []), *(["warcs"] if bywarc else [])]:
+            self._plugin(plugin)
         self._captures = 0
+        self._invalid = 0
         self._urls = 0
         self._hosts = 0
         self._bytes = 0
         self._first = "9" * 14
         self._last = "0" * 14
-        self._tophosts = Counter()
-        self._mimestatus = defaultdict(lambda: defaultdict(int))
-        self._pathquery = defaultdict(lambda: defaultdict(int))
-        self._yearmonth = defaultdict(lambda: defaultdict(int))
-        self._print = Console(file=outfile).print
+        self._head_surt = ""
+        self._head_host = ""
+        self._prev_surt = ""
+        self._prev_host = ""
+        self._outfile = outfile
+
+
+    def _plugin(self, spec):
+        plugin = plugin_class(spec)
+        if plugin.name not in self._plugins:
+            self._plugins[plugin.name] = plugin(self)
+            order = list(PLUGINS)
+            self._plugins = dict(sorted(self._plugins.items(), key=lambda item: order.index(item[0]) if item[0] in PLUGINS else len(order)))
+        return self._plugins[plugin.name]
+
+
+    def _adopt_plugins(self, report):
+        if not self._adopt:
+            return
+        for name, plugin in PLUGINS.items():
+            if name not in self._plugins and any(key in report for key in plugin.keys):
+                self._plugin(plugin)
+
+
+    def plugins(self):
+        return list(self._plugins.values())
+
+
+    def fields(self):
+        fields = {"surt", "datetime", "bytes", "host", *(["digest"] if "digests" in self._sketches else [])}
+        for plugin in self._plugins.values():
+            fields.update(plugin.fields)
+        return fields
 
 
     def _report(self):
@@ -52,58 +110,194 @@ class CDXAnalyzer():
             "bytes": self._bytes,
             "first": self._first.replace("9" * 14, ""),
             "last": self._last.replace("0" * 14, ""),
-            "tophosts": self._top_hosts(self._tophosts.most_common(self._maxhosts)),
-            "mimestatus": self._mimestatus,
-            "pathquery": self._pathquery,
-            "yearmonth": self._yearmonth,
-            "samples": list(self._sampler.samples())
+            **{key: value for plugin in self._plugins.values() for key, value in plugin.report().items()},
+            **({"approximated": self._approximated} if self._approximated else {}),
+            "distinct": {key: min(len(sketch), self._captures) for key, sketch in self._sketches.items()},
+            "sketches": self._dump_sketches()
         }
 
 
+    def _dump_sketches(self):
+        return {key: sketch.dumps() for key, sketch in self._sketches.items()}
+
+
+    def _merge_sketches(self, sketches):
+        for key in list(self._sketches):
+            if key in sketches:
+                self._sketches[key].merge(HyperLogLog.loads(sketches[key]))
+            else:
+                del self._sketches[key]
+
+
     def load(self, report_json):
-        report = loads(report_json)
+        return self.load_report(loads(report_json))
+
+
+    def load_report(self, report):
         self._captures = report["captures"]
         self._urls = report["urls"]
         self._hosts = report["hosts"]
         self._bytes = report["bytes"]
         self._first = report["first"]
         self._last = report["last"]
-        self._tophosts = Counter(report["tophosts"])
-        self._mimestatus = report["mimestatus"]
-        self._pathquery = report["pathquery"]
-        self._yearmonth = report["yearmonth"]
-        self._sampler._samples = [(dt, url) for dt, url in report["samples"]]
+        self._adopt_plugins(report)
+        for plugin in self._plugins.values():
+            if plugin.owns(report):
+                plugin.load(report)
+        self._approximated = {}
+        for name, info in report.get("approximated", {}).items():
+            self._approximate(name, info)
+        self._sketches = {key: HyperLogLog.loads(data) for key, data in report.get("sketches", {}).items()}
         return self._report()
 
 
-    def __call__(self, cdx):
-        prev_surt = ""
-        prev_host = ""
+    def partial(self):
+        return {
+            "captures": self._captures,
+            "urls": self._urls,
+            "hosts": self._hosts,
+            "bytes": self._bytes,
+            "first": self._first,
+            "last": self._last,
+            "head": [self._head_surt, self._head_host],
+            "tail": [self._prev_surt, self._prev_host],
+            **{key: value for plugin in self._plugins.values() for key, value in plugin.partial().items()},
+            **({"approximated": self._approximated} if self._approximated else {}),
+            "sketches": self._dump_sketches()
+        }
+
+
+    def merge(self, partial):
+        if not partial["captures"]:
+            return self._report()
+        head_surt, head_host = partial["head"]
+        self._captures += partial["captures"]
+        self._urls += partial["urls"] - (bool(head_surt) and self._prev_surt == head_surt)
+        self._hosts += partial["hosts"] - (bool(head_host) and self._prev_host == head_host)
+        self._bytes += partial["bytes"]
+        self._first = min(self._first, partial["first"])
+        self._last = max(self._last, partial["last"])
+        if not self._prev_surt:
+            self._head_surt, self._head_host = head_surt, head_host
+        self._prev_surt, self._prev_host = partial["tail"]
+        self._adopt_plugins(partial)
+        for plugin in self._plugins.values():
+            if plugin.owns(partial):
+                plugin.merge(partial)
+        for name, info in partial.get("approximated", {}).items():
+            self._approximate(name, info)
+        self._merge_sketches(partial.get("sketches", {}))
+        self._check_memory()
+        return self._report()
+
+
+    def merge_report(self, report, hostlimit=None):
+        self.merge({
+            **report,
+            "first": report["first"] or "9" * 14,
+            "last": report["last"] or "0" * 14,
+            "head": ["", ""],
+            "tail": ["", ""]
+        })
+        self.limit_hosts(hostlimit)
+        return self._report()
+
+
+    def limit_hosts(self, hostlimit):
+        for plugin in self._plugins.values():
+            info = plugin.limit_hosts(hostlimit)
+            if info:
+                self._approximate(plugin.name, info)
+
+
+    def memory(self):
+        return sum(plugin.memory() for plugin in self._plugins.values()) + sum(len(sketch._registers) for sketch in self._sketches.values())
+
+
+    def _approximate(self, name, info):
+        totals = self._approximated.setdefault(name, {})
+        for key, value in info.items():
+            totals[key] = totals.get(key, 0) + value
+
+
+    def _check_memory(self):
+        if self._profiler:
+            self._profiler.sample(self)
+        if not self._maxmemory:
+            return
+        used = self.memory()
+        if used <= self._maxmemory * HIGHWATER:
+            return
+        excess = used - self._maxmemory * LOWWATER
+        for plugin in sorted(self._plugins.values(), key=lambda plugin: -plugin.memory()):
+            size = plugin.memory()
+            info = plugin.shrink(max(0, int(size - excess)))
+            if info:
+                self._approximate(plugin.name, info)
+                excess -= size - plugin.memory()
+            if excess <= 0:
+                break
+
+
+    def update(self, cdx):
+        if not (self._maxmemory or self._profiler):
+            return self._update(cdx)
+        lines = iter(cdx)
+        for line in lines:
+            self._update(chain((line,), islice(lines, CHECKLINES - 1)))
+            self._check_memory()
+
+
+    def _update(self, cdx):
+        parse = self._parse
+        prev_surt = self._prev_surt
+        prev_host = self._prev_host
+        urls = self._sketches.get("urls")
+        hosts = self._sketches.get("hosts")
+        digests = self._sketches.get("digests")
+        updates = [plugin.update for plugin in self._plugins.values()]
         for line in cdx:
             try:
-                cr = CDXRecord(line.decode())
+                cr = parse(line)
             except:
+                self._invalid += 1
                 continue
             self._captures += 1
-            if prev_surt != cr.surt:
-                prev_surt = cr.surt
+            surt = cr.surt
+            if prev_surt != surt:
+                if not prev_surt:
+                    self._head_surt = surt
+                prev_surt = surt
                 self._urls += 1
-            if self._first > cr.datetime:
-                self._first = cr.datetime
-            if self._last < cr.datetime:
-                self._last = cr.datetime
+                if urls is not None:
+                    urls.add(surt.encode())
+            dt = cr.datetime
+            if self._first > dt:
+                self._first = dt
+            if self._last < dt:
+                self._last = dt
             try:
                 self._bytes += int(cr.bytes)
             except ValueError:
                 pass
-            self._tophosts[cr.host] += 1
-            if prev_host != cr.host:
-                prev_host = cr.host
+            host = cr.host
+            if prev_host != host:
+                if not prev_host:
+                    self._head_host = host
+                prev_host = host
                 self._hosts += 1
-            self._pathquery[f"P{cr.pathlen}"][f"Q{cr.querylen}"] += 1
-            self._yearmonth[cr.year][cr.month] += 1
-            self._mimestatus[cr.mime][cr.status] += 1
-            self._sampler(cr)
+                if hosts is not None:
+                    hosts.add(host.encode())
+            if digests is not None:
+                digests.add(cr.rawdigest)
+            for update in updates:
+                update(cr)
+        self._prev_surt = prev_surt
+        self._prev_host = prev_host
+
+
+    def __call__(self, cdx):
+        self.update(cdx)
         return self._report()
 
 
@@ -111,5 +305,13 @@ class CDXAnalyzer():
         return dumps(self._report())
 
 
-    def print_report_json(self):
-        self._print(JSON.from_data(self._report()), soft_wrap=True)
+    def print_report_json(self, raw=False):
+        print_json(self._report(), outfile=self._outfile, raw=raw)
+
+
+    def write_report_binary(self, compress=True):
+        from cdxsummary.binary import dump_report
+        outfile = getattr(self._outfile, "buffer", self._outfile)
+        self._outfile.flush()
+        dump_report(self._report(), outfile, compress=compress)
+        outfile.flush()
@@ -0,0 +1,111 @@
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from hashlib import blake2b
+from threading import BoundedSemaphore
+
+if not __package__:
+    sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from cdxsummary.columnar import ENGINES
+from cdxsummary.console import errprint
+from cdxsummary.decompress import compression, open_compressed
+from cdxsummary.filters import LineFilter
+from cdxsummary.reader import MappedCDXFile
+
+
+SPOOLCHUNK = 1024 * 1024
+UNSAFENAME = re.compile(r"[^\w.-]+")
+
+
+def read_batch(path):
+    f = sys.stdin if path == "-" else open(path)
+    try:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def batch_name(entry):
+    suffix = blake2b(entry.encode(), digest_size=4).hexdigest()
+    return f"{UNSAFENAME.sub('_', entry).strip('_')}.{suffix}.json"
+
+
+def analyze_file(path, engine="record", decoder="auto", filters=None, summarize=False, **options):
+    analyzer = ENGINES[engine](**options)
+    if filters:
+        LineFilter(parser=options.get("parser", "fast"), **filters).attach(analyzer)
+    stream = open_compressed(path, decoder=decoder) if compression(path) else MappedCDXFile(path)
+    try:
+        report = analyzer(stream)
+    finally:
+        stream.close()
+    if summarize:
+        from cdxsummary.summarizer import ReportSummarizer
+        return str(ReportSummarizer(report))
+    return str(analyzer)
+
+
+class BatchRunner():
+    def __init__(self, session, concurrency=4, jobs=1, options={}, logger=errprint):
+        self._session = session
+        self._concurrency = max(1, concurrency)
+        self._jobs = max(1, jobs)
+        self._spooled = BoundedSemaphore(self._concurrency)
+        self._options = options
+        self._logger = logger
+        self._spool = None
+        self.failed = []
+
+
+    def _download(self, url):
+        self._logger(f"Downloading remote file: [magenta]{url}[/magenta]")
+        r = self._session(url).get(url, stream=True)
+        with r:
+            if not r.ok:
+                raise Exception(f"{r.status_code} {r.reason}: {url}")
+            r.raw.decode_content = True
+            fd, path = tempfile.mkstemp(suffix=compression(url) or ".cdx", dir=self._spool)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    shutil.copyfileobj(r.raw, f, SPOOLCHUNK)
+            except:
+                os.remove(path)
+                raise
+        return path
+
+
+    def _analyze(self, workers, url, path):
+        if not url:
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"No such local file: {path}")
+            return workers.submit(analyze_file, path, **self._options).result()
+        with self._spooled:
+            path = self._download(url)
+            try:
+                return workers.submit(analyze_file, path, **self._options).result()
+            finally:
+                os.remove(path)
+
+
+    def __call__(self, inputs, write):
+        done = 0
+        with tempfile.TemporaryDirectory(prefix="cdxsummary-batch-") as spool:
+            self._spool = spool
+            workers = ProcessPoolExecutor(max_workers=self._jobs) if self._jobs > 1 else ThreadPoolExecutor(max_workers=1)
+            with workers, ThreadPoolExecutor(max_workers=self._concurrency + self._jobs) as tasks:
+                futures = [(entry, tasks.submit(self._analyze, workers, url, path)) for entry, url, path in inputs]
+                for entry, future in futures:
+                    try:
+                        write(entry, future.result(), None)
+                        done += 1
+                    except Exception as e:
+                        self.failed.append((entry, str(e)))
+                        self._logger(f"Failed to summarize [magenta]{entry}[/magenta]: {e}")
+                        write(entry, None, str(e))
+        return done
@@ -0,0 +1,231 @@
+import json
+import sys
+import zlib
+
+from array import array
+from base64 import b64decode, b64encode
+
+
+MAGIC = b"CDXSUMB"
+VERSION = 1
+COMPRESSED = 1
+CHUNKSIZE = 64 * 1024
+HOSTCHUNK = 65536
+GRIDS = ("mimestatus", "pathquery", "yearmonth")
+SCALARS = ("captures", "urls", "hosts", "bytes", "sampled")
+KNOWN = {"first", "last", "tophosts", "samples", "distinct", "sketches", *GRIDS, *SCALARS}
+TYPECODES = {array(code).itemsize: code for code in "QLIHB"}
+
+
+def varint(n):
+    out = bytearray()
+    while n > 0x7f:
+        out.append(n & 0x7f | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def text(value):
+    data = value.encode()
+    return varint(len(data)) + data
+
+
+def count_array(counts):
+    top = max(counts, default=0)
+    width = next(width for width in (1, 2, 4, 8) if top < 1 << (8 * width))
+    packed = array(TYPECODES[width], counts)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return width, packed.tobytes()
+
+
+def host_chunks(tophosts, compress):
+    hosts = iter(tophosts.items())
+    while True:
+        chunk = [item for _, item in zip(range(HOSTCHUNK), hosts)]
+        if not chunk:
+            return
+        names, counts = zip(*chunk)
+        width, packed = count_array(counts)
+        payload = packed + "\n".join(names).encode()
+        if compress:
+            payload = zlib.compress(payload)
+        yield varint(len(chunk)) + bytes([width]) + varint(len(payload)) + payload
+
+
+def dump_report(report, outfile, compress=True):
+    strings = {}
+    def ref(value):
+        return varint(strings.setdefault(value, len(strings)))
+
+    body = bytearray()
+    for key in SCALARS:
+        body += varint(report.get(key, 0))
+    body += text(report["first"]) + text(report["last"])
+    for key in GRIDS:
+        grid = report.get(key, {})
+        body += varint(len(grid))
+        for row, cols in grid.items():
+            body += ref(row) + varint(len(cols))
+            for col, count in cols.items():
+                body += ref(col) + varint(count)
+    distinct = report.get("distinct", {})
+    body += varint(len(distinct))
+    for key, count in distinct.items():
+        body += ref(key) + varint(count)
+    sketches = report.get("sketches", {})
+    body += varint(len(sketches))
+    for key, sketch in sketches.items():
+        precision, _, registers = sketch.partition(":")
+        registers = b64decode(registers)
+        body += ref(key) + varint(int(precision)) + varint(len(registers)) + registers
+    samples = report.get("samples", [])
+    body += varint(len(samples))
+    for dt, url in samples:
+        body += text(dt) + text(url)
+    extra = {key: value for key, value in report.items() if key not in KNOWN}
+    extra = json.dumps(extra, separators=(",", ":")).encode() if extra else b""
+    body += varint(len(extra)) + extra
+
+    outfile.write(MAGIC + varint(VERSION) + varint(COMPRESSED if compress else 0))
+    outfile.write(varint(len(strings)) + b"".join(text(value) for value in strings))
+    outfile.write(body)
+    tophosts = report.get("tophosts", {})
+    outfile.write(varint(len(tophosts)))
+    for chunk in host_chunks(tophosts, compress):
+        outfile.write(chunk)
+    outfile.write(varint(0))
+
+
+class StreamReader():
+    def __init__(self, stream):
+        if hasattr(stream, "read"):
+            self._read = stream.read
+        else:
+            chunks = iter(stream)
+            self._read = lambda size: next(chunks, b"")
+        self._buffer = b""
+        self._pos = 0
+
+
+    def _fill(self, size):
+        available = len(self._buffer) - self._pos
+        if available >= size:
+            return
+        chunks = [self._buffer[self._pos:]]
+        while available < size:
+            chunk = self._read(max(CHUNKSIZE, size - available))
+            if not chunk:
+                raise ValueError("Truncated binary report")
+            chunks.append(chunk)
+            available += len(chunk)
+        self._buffer = b"".join(chunks)
+        self._pos = 0
+
+
+    def peek(self, size):
+        try:
+            self._fill(size)
+        except ValueError:
+            pass
+        return self._buffer[self._pos:self._pos + size]
+
+
+    def bytes(self, size):
+        self._fill(size)
+        data = self._buffer[self._pos:self._pos + size]
+        self._pos += size
+        return data
+
+
+    def rest(self):
+        data = [self._buffer[self._pos:]]
+        self._buffer, self._pos = b"", 0
+        while True:
+            chunk = self._read(CHUNKSIZE)
+            if not chunk:
+                return b"".join(data)
+            data.append(chunk)
+
+
+    def varint(self):
+        result = shift = 0
+        while True:
+            if self._pos >= len(self._buffer):
+                self._fill(1)
+            byte = self._buffer[self._pos]
+            self._pos += 1
+            result |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+
+    def text(self):
+        return self.bytes(self.varint()).decode()
+
+
+def read_hosts(reader, compressed):
+    tophosts = {}
+    while True:
+        count = reader.varint()
+        if not count:
+            return tophosts
+        width = reader.bytes(1)[0]
+        payload = reader.bytes(reader.varint())
+        if compressed:
+            payload = zlib.decompress(payload)
+        counts = array(TYPECODES[width])
+        counts.frombytes(payload[:count * width])
+        if sys.byteorder == "big":
+            counts.byteswap()
+        tophosts.update(zip(payload[count * width:].decode().split("\n"), counts))
+
+
+def read_pairs(reader, strings, value):
+    pairs = {}
+    for _ in range(reader.varint()):
+        key = strings[reader.varint()]
+        pairs[key] = value()
+    return pairs
+
+
+def load_binary(reader):
+    if reader.bytes(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a binary CDX summary report")
+    version = reader.varint()
+    if version > VERSION:
+        raise ValueError(f"Unsupported binary report version {version}, upgrade to read it")
+    flags = reader.varint()
+    strings = [reader.text() for _ in range(reader.varint())]
+    report = {key: reader.varint() for key in SCALARS}
+    report["first"] = reader.text()
+    report["last"] = reader.text()
+    for key in GRIDS:
+        report[key] = read_pairs(reader, strings, lambda: read_pairs(reader, strings, reader.varint))
+    report["distinct"] = read_pairs(reader, strings, reader.varint)
+    sketches = {}
+    for _ in range(reader.varint()):
+        key = strings[reader.varint()]
+        precision = reader.varint()
+        sketches[key] = f"{precision}:{b64encode(reader.bytes(reader.varint())).decode()}"
+    report["samples"] = [(reader.text(), reader.text()) for _ in range(reader.varint())]
+    extra = reader.bytes(reader.varint())
+    if extra:
+        report.update(json.loads(extra))
+    reader.varint()
+    report["tophosts"] = read_hosts(reader, flags & COMPRESSED)
+    report["sketches"] = sketches
+    return report
+
+
+def is_binary(head):
+    return head.startswith(MAGIC)
+
+
+def load_report(stream):
+    reader = StreamReader(stream)
+    if is_binary(reader.peek(len(MAGIC))):
+        return load_binary(reader)
+    return json.loads(reader.rest())
@@ -0,0 +1,198 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+
+from contextlib import contextmanager
+from random import Random
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+INDEX = "index.json"
+LOCK = "index.lock"
+MAXSIZE = 256 * 1024 * 1024
+STATS = ("hits", "misses", "revalidated", "evictions")
+
+
+def file_identity(paths):
+    identity = []
+    for path in paths:
+        st = os.stat(path)
+        identity.append([os.path.realpath(path), st.st_mtime_ns, st.st_size, st.st_ino])
+    return identity
+
+
+def response_identity(r):
+    return {
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+        "size": r.headers.get("Content-Length")
+    }
+
+
+class ReportCache():
+    def __init__(self, directory, maxsize=MAXSIZE):
+        os.makedirs(directory, exist_ok=True)
+        self._dir = directory
+        self._maxsize = maxsize
+        self._index = self._load_index()
+
+
+    def _path(self, name):
+        return os.path.join(self._dir, name)
+
+
+    def _load_index(self):
+        try:
+            with open(self._path(INDEX)) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        index.setdefault("entries", {})
+        index.setdefault("stats", {})
+        for stat in STATS:
+            index["stats"].setdefault(stat, 0)
+        return index
+
+
+    def _save_index(self):
+        tmp = self._path(f"{INDEX}.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self._path(INDEX))
+
+
+    @contextmanager
+    def _locked(self):
+        with open(self._path(LOCK), "a") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._index = self._load_index()
+                yield self._index
+                self._save_index()
+            finally:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+    def _count(self, stat):
+        with self._locked() as index:
+            index["stats"][stat] += 1
+
+
+    def key(self, source, **params):
+        return hashlib.sha256(json.dumps([source, params], sort_keys=True).encode()).hexdigest()
+
+
+    def lookup(self, key, samples=0, tophosts=None, identity=None):
+        self._index = self._load_index()
+        entry = self._index["entries"].get(key)
+        if not entry or identity is not None and entry["identity"] != identity:
+            return None
+        if samples > entry["samples"] and entry["samples"] >= entry["samplesize"]:
+            return None
+        if entry["tophosts"] is not None and entry["hostcount"] >= entry["tophosts"] and (tophosts is None or tophosts > entry["tophosts"]):
+            return None
+        return entry
+
+
+    def validators(self, entry):
+        headers = {}
+        if entry and entry["identity"].get("etag"):
+            headers["If-None-Match"] = entry["identity"]["etag"]
+        elif entry and entry["identity"].get("last_modified"):
+            headers["If-Modified-Since"] = entry["identity"]["last_modified"]
+        return headers
+
+
+    def get(self, key, samples=0, revalidated=False):
+        entry = self._index["entries"].get(key)
+        try:
+            with gzip.open(self._path(entry["file"]), "rt") as f:
+                report = json.load(f)
+        except (OSError, ValueError, TypeError):
+            self.discard(key)
+            return None
+        if "samples" in report and len(report["samples"]) > samples:
+            picked = sorted(Random(key).sample(range(len(report["samples"])), samples))
+            report["samples"] = [report["samples"][i] for i in picked]
+        with self._locked() as index:
+            if key in index["entries"]:
+                index["entries"][key]["atime"] = time.time()
+            index["stats"]["revalidated" if revalidated else "hits"] += 1
+        return report
+
+
+    def miss(self):
+        self._count("misses")
+
+
+    def put(self, key, source, identity, report, samplesize=0, tophosts=None):
+        name = f"{key}.json.gz"
+        tmp = self._path(f"{name}.{os.getpid()}.tmp")
+        with gzip.open(tmp, "wt") as f:
+            json.dump(report, f)
+        os.replace(tmp, self._path(name))
+        entry = {
+            "source": source,
+            "identity": identity,
+            "file": name,
+            "size": os.path.getsize(self._path(name)),
+            "atime": time.time(),
+            "samples": len(report.get("samples", [])),
+            "samplesize": samplesize,
+            "tophosts": tophosts,
+            "hostcount": len(report.get("tophosts", {}))
+        }
+        with self._locked() as index:
+            index["entries"][key] = entry
+            self._evict(index)
+
+
+    def _remove(self, index, key):
+        entry = index["entries"].pop(key, None)
+        if entry:
+            try:
+                os.remove(self._path(entry["file"]))
+            except FileNotFoundError:
+                pass
+
+
+    def _evict(self, index):
+        entries = index["entries"]
+        total = sum(entry["size"] for entry in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]["atime"]):
+            if total <= self._maxsize:
+                break
+            total -= entries[key]["size"]
+            self._remove(index, key)
+            index["stats"]["evictions"] += 1
+
+
+    def discard(self, key):
+        with self._locked() as index:
+            self._remove(index, key)
+
+
+    def evict(self):
+        with self._locked() as index:
+            self._evict(index)
+
+
+    def stats(self):
+        self._index = self._load_index()
+        entries = self._index["entries"].values()
+        lookups = self._index["stats"]["hits"] + self._index["stats"]["revalidated"] + self._index["stats"]["misses"]
+        return {
+            **self._index["stats"],
+            "hit_ratio": round((lookups - self._index["stats"]["misses"]) / lookups, 4) if lookups else None,
+            "entries": len(entries),
+            "bytes": sum(entry["size"] for entry in entries),
+            "maxsize": self._maxsize
+        }
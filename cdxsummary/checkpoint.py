@@ -0,0 +1,47 @@
+import json
+import os
+
+
+class TrackedStream():
+    def __init__(self, stream, offset=0, lines=0):
+        self._stream = stream
+        self.offset = offset
+        self.lines = lines
+
+
+    def __iter__(self):
+        for line in self._stream:
+            self.offset += len(line)
+            self.lines += 1
+            yield line
+
+
+    def close(self):
+        self._stream.close()
+
+
+def skip_bytes(stream, offset):
+    skipped = 0
+    for line in stream:
+        if skipped >= offset:
+            yield line
+        else:
+            skipped += len(line)
+
+
+def load_checkpoint(path, source):
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return {}
+    if checkpoint.get("source") != source:
+        raise ValueError(f"Checkpoint '{path}' belongs to a different input: {checkpoint.get('source')}")
+    return checkpoint
+
+
+def save_checkpoint(path, source, state, **position):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"source": source, **position, "state": state}, f)
+    os.replace(tmp, path)
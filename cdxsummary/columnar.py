@@ -0,0 +1,358 @@
+import os
+import sys
+
+from functools import partial
+from hashlib import blake2b
+from itertools import chain, compress, count, islice, repeat
+from operator import attrgetter, methodcaller
+
+if not __package__:
+    sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from cdxsummary.analyzer import CDXAnalyzer
+from cdxsummary.parser import optional_fields
+from cdxsummary.plugins import PLUGINS, StrataPlugin
+from cdxsummary.sampler import BaseSampler, DynamicRandomStreamSampler, ReservoirSampler
+
+
+BLOCKSIZE = 1 << 16
+SPACE, NEWLINE, SLASH, QMARK, AMP, HYPHEN, CLOSE, TILDE = b" \n/?&-)~"
+HASH = partial(blake2b, digest_size=8)
+DIGEST = methodcaller("digest")
+TALLIES = {
+    "tophosts": attrgetter("host"),
+    "mimestatus": attrgetter("mime", "status"),
+    "pathquery": lambda cdxrec: (f"P{cdxrec.pathlen}", f"Q{cdxrec.querylen}"),
+    "yearmonth": attrgetter("year", "month")
+}
+
+np = None
+
+
+def load_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ValueError("The 'columnar' engine requires NumPy, install it using 'pip install numpy'")
+        np = numpy
+    return np
+
+
+def slices(data, starts, ends):
+    return [data[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+
+
+def digit_values(buf, starts, ends, width):
+    lengths = ends - starts
+    offsets = np.arange(width)
+    window = buf[np.minimum(starts[:, None] + offsets, len(buf) - 1)].astype(np.int64) - 48
+    inside = offsets < lengths[:, None]
+    valid = (lengths > 0) & (lengths <= width) & np.all(~inside | ((window >= 0) & (window <= 9)), axis=1)
+    scale = 10 ** np.clip(lengths[:, None] - 1 - offsets, 0, None)
+    return np.where(inside, window * scale, 0).sum(axis=1), valid
+
+
+def segment_lengths(buf, starts, ends, sep):
+    first, last = starts.copy(), ends.copy()
+    run = np.flatnonzero(first < last)
+    while len(run):
+        run = run[buf[first[run]] == sep]
+        first[run] += 1
+        run = run[first[run] < last[run]]
+    run = np.flatnonzero(first < last)
+    while len(run):
+        run = run[buf[last[run] - 1] == sep]
+        last[run] -= 1
+        run = run[first[run] < last[run]]
+    seps = np.flatnonzero(buf == sep)
+    inner = np.searchsorted(seps, last) - np.searchsorted(seps, first)
+    return np.where(first < last, inner + 1, 0)
+
+
+def bit_length(values):
+    values = values.copy()
+    bits = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = values >= np.uint64(1 << shift)
+        bits += high * shift
+        values[high] >>= np.uint64(shift)
+    return bits + (values > 0)
+
+
+def sketch_update(sketch, values):
+    if sketch is None or not values:
+        return
+    hashes = np.frombuffer(b"".join(map(DIGEST, map(HASH, values))), dtype=">u8").astype(np.uint64)
+    index = (hashes >> np.uint64(sketch._width)).astype(np.int64)
+    rank = sketch._width - bit_length(hashes & np.uint64(sketch._mask)) + 1
+    np.maximum.at(np.frombuffer(sketch._registers, dtype=np.uint8), index, rank.astype(np.uint8))
+
+
+def intern(values):
+    index = {}
+    ids = np.fromiter(map(index.setdefault, values, count()), dtype=np.int64, count=len(values))
+    return index, ids
+
+
+def tally(keys, rows):
+    values, first, counts = np.unique(keys, return_index=True, return_counts=True)
+    return zip(values.tolist(), rows[first].tolist(), counts.tolist())
+
+
+def extra_bytes(tokens):
+    try:
+        return optional_fields(tokens)[2]
+    except ValueError:
+        return None
+
+
+class ColumnarCDXAnalyzer(CDXAnalyzer):
+    def __init__(self, *args, blocksize=BLOCKSIZE, **kwargs):
+        load_numpy()
+        super().__init__(*args, **kwargs)
+        self._blocksize = blocksize
+        self._sample_all = type(self._sampler) is not BaseSampler
+        self._sample_html = isinstance(self._sampler, (DynamicRandomStreamSampler, ReservoirSampler)) and self._sampler._valid == self._sample_candidate and type(self)._sample_candidate is CDXAnalyzer._sample_candidate
+        self._strata_ok = all(getattr(type(self), name) is getattr(CDXAnalyzer, name) for name in ("_sample_candidate", "_ok_candidate"))
+
+
+    def _tallied(self):
+        return [name for name in TALLIES if type(self._plugins.get(name)) is PLUGINS[name]]
+
+
+    def _sampled(self):
+        return type(self._plugins.get("samples")) is PLUGINS["samples"]
+
+
+    def _record_passes(self, tallies):
+        return [plugin for name, plugin in self._plugins.items() if name not in tallies and not (name == "samples" and self._sampled())]
+
+
+    def _split_block(self, raw):
+        data = b"\n".join(raw) + b"\n"
+        buf = np.frombuffer(data, dtype=np.uint8)
+        lengths = np.fromiter(map(len, raw), dtype=np.int64, count=len(raw))
+        ends = np.cumsum(lengths + 1) - 1
+        starts = ends - lengths
+        space = buf == SPACE
+        newline = buf == NEWLINE
+        loose = ((buf < SPACE) & ~newline) | (buf > TILDE)
+        loose[:-1] |= space[:-1] & (space[1:] | newline[1:])
+        loose[1:] |= newline[:-1] & space[1:]
+        loose[0] |= space[0]
+        spaces = np.flatnonzero(space)
+        first = np.searchsorted(spaces, starts)
+        fields = np.searchsorted(spaces, ends) - first + 1
+        candidate = fields > 6
+        candidate[np.searchsorted(ends, np.flatnonzero(loose))] = False
+        rows = np.flatnonzero(candidate)
+        first, fields = first[rows, None], fields[rows]
+        seps = spaces[np.minimum(first + np.arange(10), first + fields[:, None] - 2)]
+        return data, buf, rows, starts[rows], ends[rows], fields, seps
+
+
+    def _columns(self, data, buf, rows, starts, ends, fields, seps, needed):
+        surtend, dtend, urlend, mimeend, statusend, digestend = seps[:, :6].T
+        closes = np.append(np.flatnonzero(buf == CLOSE), len(buf))
+        hostend = closes[np.searchsorted(closes, starts)]
+        ok = (hostend > starts) & (hostend < surtend) & (buf[surtend - 1] != QMARK)
+        stamps, valid = digit_values(buf, surtend + 1, dtend, 14)
+        ok &= valid & (dtend - surtend == 15)
+        codes, valid = digit_values(buf, mimeend + 1, statusend, 3)
+        dash = (statusend - mimeend == 2) & (buf[mimeend + 1] == HYPHEN)
+        ok &= (valid & (statusend - mimeend == 4)) | dash
+        codes = np.where(dash, 0, codes + 1)
+
+        shaped = (fields == 11) & (seps[:, 6] - digestend == 2) & (buf[digestend + 1] == HYPHEN)
+        shaped &= (seps[:, 7] - seps[:, 6] == 2) & (buf[seps[:, 6] + 1] == HYPHEN)
+        sizes, valid = digit_values(buf, seps[:, 7] + 1, seps[:, 8], 12)
+        shaped &= valid & digit_values(buf, seps[:, 8] + 1, seps[:, 9], 18)[1]
+        extra = 0
+        for i in np.flatnonzero(ok & ~shaped).tolist():
+            size = extra_bytes(data[digestend[i] + 1:ends[i]].split(b" "))
+            if size is None:
+                ok[i] = False
+            elif size.isdigit():
+                extra += int(size)
+
+        keep = np.flatnonzero(ok)
+        return {
+            "rows": rows[keep],
+            "surts": slices(data, starts[keep], surtend[keep]),
+            "hosts": slices(data, starts[keep], hostend[keep]),
+            "mimes": slices(data, urlend[keep] + 1, mimeend[keep]) if "mime" in needed else None,
+            "digests": slices(data, statusend[keep] + 1, digestend[keep]) if "digests" in self._sketches else None,
+            "stamps": stamps[keep],
+            "codes": codes[keep],
+            "bytes": int(sizes[keep].sum(where=shaped[keep])) + extra,
+            "pathat": hostend[keep] + 1,
+            "surtend": surtend[keep]
+        }
+
+
+    def _add_columns(self, buf, cols, raw, tallies):
+        rows = cols["rows"]
+        n = len(rows)
+        self._captures += n
+        self._bytes += cols["bytes"]
+
+        stamps = cols["stamps"]
+        first, last = f"{stamps.min():014d}", f"{stamps.max():014d}"
+        if self._first > first:
+            self._first = first
+        if self._last < last:
+            self._last = last
+        if "yearmonth" in tallies:
+            for key, row, c in tally(stamps // 10 ** 8, rows):
+                tallies["yearmonth"][(f"{key // 100:04d}", f"{key % 100:02d}")] = [row, c]
+
+        if "tophosts" in tallies:
+            index, ids = intern(cols["hosts"])
+            hosts = {i: host.decode() for host, i in index.items()}
+            for key, row, c in tally(ids, rows):
+                tallies["tophosts"][hosts[key]] = [row, c]
+
+        if cols["mimes"] is not None:
+            index, ids = intern(cols["mimes"])
+        if "mimestatus" in tallies:
+            mimes = {i: mime.decode() for mime, i in index.items()}
+            for key, row, c in tally(ids * 1001 + cols["codes"], rows):
+                code = key % 1001
+                tallies["mimestatus"][(mimes[key // 1001], "-" if not code else f"{code - 1:03d}")] = [row, c]
+
+        if "pathquery" in tallies:
+            pathat, surtend = cols["pathat"], cols["surtend"]
+            qmarks = np.append(np.flatnonzero(buf == QMARK), len(buf))
+            queryat = np.minimum(qmarks[np.searchsorted(qmarks, pathat)], surtend)
+            pathlen = segment_lengths(buf, pathat, queryat, SLASH)
+            querylen = segment_lengths(buf, np.minimum(queryat + 1, surtend), surtend, AMP)
+            width = int(querylen.max()) + 1
+            for key, row, c in tally(pathlen * width + querylen, rows):
+                tallies["pathquery"][(f"P{key // width}", f"Q{key % width}")] = [row, c]
+
+        sketch_update(self._sketches.get("digests"), cols["digests"])
+        html = None
+        if self._sampled() and self._sample_html:
+            candidates = (cols["codes"] == 201) & (ids == index.get(b"text/html", -1))
+            candidates &= ~np.fromiter(map(bytes.endswith, cols["surts"], repeat(b"/robots.txt")), dtype=bool, count=n)
+            html = candidates.tolist()
+        return html, (cols["codes"] == 201).tolist()
+
+
+    def _feed(self, raw, rows, html, ok, records, tallies):
+        if not rows and not records:
+            return
+        if records:
+            candidate = self._sample_html and self._sample_candidate
+            fallback = ((i, bool(candidate and candidate(cr)), True) for i, cr in records.items())
+            merged = sorted(chain(zip(rows, html or repeat(False), ok), fallback))
+            rows, html, ok = ([row[k] for row in merged] for k in range(3))
+        load = lambda i: records[i] if i in records else self._parse(raw[i])
+        sampled = self._sampled()
+        if sampled and self._sample_html:
+            self._sampler.extend(compress(rows, html), load)
+        elif sampled and self._sample_all:
+            for i in rows:
+                self._sampler(load(i))
+        passes = self._record_passes(tallies)
+        if passes:
+            strata_only = self._strata_ok and all(type(plugin) is StrataPlugin for plugin in passes)
+            updates = [plugin.update for plugin in passes]
+            for i in compress(rows, ok) if strata_only else rows:
+                cr = load(i)
+                for update in updates:
+                    update(cr)
+
+
+    def _add_record(self, cr, row, tallies, digests):
+        self._captures += 1
+        dt = cr.datetime
+        if self._first > dt:
+            self._first = dt
+        if self._last < dt:
+            self._last = dt
+        try:
+            self._bytes += int(cr.bytes)
+        except ValueError:
+            pass
+        for name, counts in tallies.items():
+            key = TALLIES[name](cr)
+            first, c = counts.get(key, (row, 0))
+            counts[key] = [min(first, row), c + 1]
+        digests.append(cr.rawdigest)
+
+
+    def _fold(self, tallies):
+        first = lambda item: item[1][0]
+        for name, counts in tallies.items():
+            add = self._plugins[name].add
+            for key, (_, c) in sorted(counts.items(), key=first):
+                add(key, c)
+
+
+    def _consecutive(self, values, prev, sketch):
+        changed = [value for value, before in zip(values, [prev, *values[:-1]]) if value != before]
+        sketch_update(sketch, changed)
+        return len(changed)
+
+
+    def _update_block(self, raw):
+        data, buf, *split = self._split_block(raw)
+        surts, hosts, rows = [], [], []
+        html, ok, records = None, [], {}
+        tallies = {name: {} for name in self._tallied()}
+        if len(split[0]):
+            cols = self._columns(data, buf, *split, self.fields())
+            rows = cols["rows"].tolist()
+            if rows:
+                html, ok = self._add_columns(buf, cols, raw, tallies)
+                surts, hosts = cols["surts"], cols["hosts"]
+        columnar = rows
+        if len(rows) < len(raw):
+            fallback = np.ones(len(raw), dtype=bool)
+            fallback[rows] = False
+            ordered = dict(zip(rows, zip(surts, hosts)))
+            digests = []
+            for i in np.flatnonzero(fallback).tolist():
+                try:
+                    cr = self._parse(raw[i])
+                except:
+                    self._invalid += 1
+                    continue
+                self._add_record(cr, i, tallies, digests)
+                records[i] = cr
+                ordered[i] = (cr.surt.encode(), cr.host.encode())
+            sketch_update(self._sketches.get("digests"), digests)
+            ordered = [ordered[i] for i in sorted(ordered)]
+            surts, hosts = [surt for surt, _ in ordered], [host for _, host in ordered]
+        self._feed(raw, columnar, html, ok, records, tallies)
+        self._fold(tallies)
+        if not surts:
+            return
+        if not self._prev_surt:
+            self._head_surt = surts[0].decode()
+        if not self._prev_host:
+            self._head_host = hosts[0].decode()
+        self._urls += self._consecutive(surts, self._prev_surt.encode(), self._sketches.get("urls"))
+        self._hosts += self._consecutive(hosts, self._prev_host.encode(), self._sketches.get("hosts"))
+        self._prev_surt = surts[-1].decode()
+        self._prev_host = hosts[-1].decode()
+
+
+    def update(self, cdx):
+        lines = iter(cdx)
+        while True:
+            block = [line.rstrip(b"\n") for line in islice(lines, self._blocksize)]
+            if not block:
+                break
+            self._update_block(block)
+            if self._maxmemory or self._profiler:
+                self._check_memory()
+
+
+ENGINES = {
+    "record": CDXAnalyzer,
+    "columnar": ColumnarCDXAnalyzer
+}
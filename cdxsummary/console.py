@@ -0,0 +1,77 @@
+import json
+import re
+import sys
+
+from json.encoder import encode_basestring
+
+
+MARKUP = re.compile(r"\[/?[a-z#@][^\[\]]*\]")
+CHUNKLINES = 4096
+CONSTANTS = {True: "true", False: "false", None: "null"}
+
+_errconsole = None
+
+
+def errprint(msg):
+    global _errconsole
+    if not sys.stderr.isatty():
+        print(MARKUP.sub("", str(msg)), file=sys.stderr, flush=True)
+        return
+    if not _errconsole:
+        from rich.console import Console
+        _errconsole = Console(stderr=True, style="red", highlight=False)
+    _errconsole.print(msg)
+
+
+def json_scalar(value):
+    if isinstance(value, str):
+        return encode_basestring(value)
+    if value is None or value is True or value is False:
+        return CONSTANTS[value]
+    if isinstance(value, int):
+        return int.__repr__(value)
+    return json.dumps(value)
+
+
+def json_lines(value, indent=2, level=0):
+    if not value or not isinstance(value, (dict, list, tuple)):
+        yield json_scalar(value)
+        return
+    encode = encode_basestring
+    pad = "\n" + " " * (indent * (level + 1))
+    sep, comma = pad, "," + pad
+    keyed = isinstance(value, dict)
+    yield "{" if keyed else "["
+    for key, item in value.items() if keyed else ((None, item) for item in value):
+        head = f"{sep}{encode(key if type(key) is str else str(key))}: " if keyed else sep
+        if type(item) is int:
+            yield f"{head}{item}"
+        elif type(item) is str:
+            yield head + encode(item)
+        elif item and isinstance(item, (dict, list, tuple)):
+            yield head
+            yield from json_lines(item, indent, level + 1)
+        else:
+            yield head + json_scalar(item)
+        sep = comma
+    yield "\n" + " " * (indent * level) + ("}" if keyed else "]")
+
+
+def write_json(data, outfile=sys.stdout, indent=2):
+    chunk = []
+    for line in json_lines(data, indent):
+        chunk.append(line)
+        if len(chunk) >= CHUNKLINES:
+            outfile.write("".join(chunk))
+            chunk.clear()
+    chunk.append("\n")
+    outfile.write("".join(chunk))
+
+
+def print_json(data, outfile=sys.stdout, raw=False):
+    if raw or not outfile.isatty():
+        write_json(data, outfile)
+        return
+    from rich.console import Console
+    from rich.json import JSON
+    Console(file=outfile).print(JSON.from_data(data), soft_wrap=True)
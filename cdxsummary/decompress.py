@@ -0,0 +1,219 @@
+import bz2
+import io
+import lzma
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import zlib
+
+try:
+    from compression.zstd import ZstdDecompressor
+except ImportError:
+    try:
+        from zstandard import ZstdDecompressor as _ZstandardDecompressor
+        ZstdDecompressor = lambda: _ZstandardDecompressor().decompressobj()
+    except ImportError:
+        ZstdDecompressor = None
+
+
+COMPRESSED = (".gz", ".bz2", ".xz", ".zst")
+CHUNKSIZE = 1 << 20
+QUEUESIZE = 16
+PUTTIMEOUT = 0.1
+
+EXTERNAL = {
+    ".gz": [["pigz", "-dc"], ["gzip", "-dc"]],
+    ".bz2": [["lbzip2", "-dc"], ["pbzip2", "-dc"], ["bzip2", "-dc"]],
+    ".xz": [["xz", "-dc", "-T0"]],
+    ".zst": [["zstd", "-dc"]]
+}
+
+BUILTIN = {
+    ".gz": lambda: zlib.decompressobj(zlib.MAX_WBITS | 32),
+    ".bz2": bz2.BZ2Decompressor,
+    ".xz": lzma.LZMADecompressor,
+    ".zst": ZstdDecompressor
+}
+
+
+def compression(name):
+    return next((ext for ext in COMPRESSED if name.endswith(ext)), None)
+
+
+def source_position(source):
+    try:
+        return os.lseek(source.fileno(), 0, os.SEEK_CUR)
+    except (AttributeError, OSError, ValueError):
+        return source.tell()
+
+
+def external_decoder(ext):
+    for cmd in EXTERNAL.get(ext, []):
+        if shutil.which(cmd[0]):
+            return cmd
+
+
+class MultiMemberDecompressor():
+    def __init__(self, ext):
+        if not BUILTIN.get(ext):
+            raise ValueError(f"No built-in decompressor available for '{ext}' files, install the 'zstd' CLI tool or the 'zstandard' package")
+        self._new = BUILTIN[ext]
+        self._decompressor = self._new()
+        self._pending = False
+
+
+    def __call__(self, data):
+        out = []
+        while data:
+            self._pending = True
+            out.append(self._decompressor.decompress(data))
+            if not self._decompressor.eof:
+                break
+            self._pending = False
+            data = self._decompressor.unused_data
+            self._decompressor = self._new()
+        return b"".join(out)
+
+
+    def finish(self):
+        if self._pending:
+            raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+        return b""
+
+
+class QueueReader(io.RawIOBase):
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=PUTTIMEOUT)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+
+    def _pump(self, source, transform):
+        try:
+            for chunk in iter(lambda: source.read(CHUNKSIZE), b""):
+                chunk = transform(chunk)
+                if chunk and not self._put(chunk):
+                    return
+            chunk = getattr(transform, "finish", bytes)()
+            if chunk and not self._put(chunk):
+                return
+            self._put(None)
+        except Exception as e:
+            self._put(e)
+
+
+    def __init__(self, source, transform=lambda chunk: chunk, queuesize=QUEUESIZE):
+        self._source = source
+        self._queue = queue.Queue(maxsize=queuesize)
+        self._chunk = b""
+        self._pos = 0
+        self._eof = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._pump, args=(source, transform), daemon=True)
+        self._thread.start()
+
+
+    def readable(self):
+        return True
+
+
+    def readinto(self, b):
+        while self._pos >= len(self._chunk):
+            if self._eof:
+                return 0
+            item = self._queue.get()
+            if item is None:
+                self._eof = True
+                return 0
+            if isinstance(item, Exception):
+                raise item
+            self._chunk = memoryview(item)
+            self._pos = 0
+        n = min(len(b), len(self._chunk) - self._pos)
+        b[:n] = self._chunk[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+
+    def position(self):
+        return source_position(self._source)
+
+
+    def close(self):
+        self._stop.set()
+        self._source.close()
+        super().close()
+
+
+class ProcessReader(io.RawIOBase):
+    def _feed(self, source):
+        try:
+            for chunk in iter(lambda: source.read(CHUNKSIZE), b""):
+                self._proc.stdin.write(chunk)
+        except (BrokenPipeError, ValueError):
+            pass
+        finally:
+            try:
+                self._proc.stdin.close()
+            except BrokenPipeError:
+                pass
+
+
+    def __init__(self, source, cmd):
+        fileno = source.fileno() if isinstance(source, (io.FileIO, io.BufferedReader)) else None
+        self._source = source
+        self._proc = subprocess.Popen(cmd, stdin=fileno if fileno is not None else subprocess.PIPE, stdout=subprocess.PIPE)
+        if fileno is None:
+            threading.Thread(target=self._feed, args=(source,), daemon=True).start()
+
+
+    def readable(self):
+        return True
+
+
+    def position(self):
+        return source_position(self._source)
+
+
+    def readinto(self, b):
+        n = self._proc.stdout.readinto(b)
+        if not n and self._proc.wait():
+            raise OSError(f"Decompressor '{self._proc.args[0]}' exited with status {self._proc.returncode}")
+        return n
+
+
+    def close(self):
+        if self._proc.poll() is None:
+            self._proc.kill()
+            self._proc.wait()
+        self._proc.stdout.close()
+        self._source.close()
+        super().close()
+
+
+def open_decompressed(source, ext, decoder="auto"):
+    cmd = external_decoder(ext) if decoder != "builtin" else None
+    if decoder == "external" and not cmd:
+        raise ValueError(f"No external decompressor found for '{ext}' files")
+    if cmd:
+        raw = ProcessReader(source, cmd)
+    else:
+        raw = QueueReader(source, MultiMemberDecompressor(ext))
+    return io.BufferedReader(raw, buffer_size=CHUNKSIZE)
+
+
+def open_compressed(path, decoder="auto"):
+    ext = compression(path)
+    if not ext:
+        return open(path, "rb")
+    return open_decompressed(open(path, "rb"), ext, decoder=decoder)
+
+
+def openhook(decoder="auto"):
+    return lambda filename, mode, **kwargs: open_compressed(filename, decoder=decoder)
@@ -0,0 +1,286 @@
+import zlib
+
+from array import array
+from base64 import b64decode, b64encode
+from hashlib import blake2b
+from itertools import islice
+from math import exp, log
+
+
+BUDGET = 256 * 1024 * 1024
+ENTRYBYTES = 72
+HASHES = 7
+POPCOUNT = bytes(bin(i).count("1") for i in range(256))
+REVISIT = "warc/revisit"
+
+
+def digest_key(digest):
+    return int.from_bytes(blake2b(digest.encode(), digest_size=8).digest(), "little")
+
+
+def pack_keys(keys):
+    return b64encode(zlib.compress(array("Q", sorted(keys)).tobytes())).decode()
+
+
+def unpack_keys(data):
+    keys = array("Q")
+    keys.frombytes(zlib.decompress(b64decode(data)))
+    return keys
+
+
+class DigestSet():
+    def __init__(self, budget=BUDGET):
+        self._budget = budget
+        self._capacity = max(1, budget // ENTRYBYTES)
+        self._keys = set()
+        self._bits = None
+        self._mask = 0
+        self._count = 0
+
+
+    def _to_bloom(self):
+        size = 1 << max(3, (self._budget * 8).bit_length() - 1)
+        self._bits = bytearray(size >> 3)
+        self._mask = size - 1
+        keys, self._keys = self._keys, None
+        for key in keys:
+            self._set(key)
+
+
+    def _positions(self, key):
+        mask = self._mask
+        h1 = key & 0xffffffff
+        h2 = key >> 32 | 1
+        for i in range(HASHES):
+            pos = (h1 + i * h2) & mask
+            yield pos >> 3, 1 << (pos & 7)
+
+
+    def _set(self, key):
+        bits = self._bits
+        present = True
+        for byte, bit in self._positions(key):
+            if not bits[byte] & bit:
+                bits[byte] |= bit
+                present = False
+        return present
+
+
+    def add(self, key):
+        if self._bits is None:
+            if key in self._keys:
+                return True
+            self._keys.add(key)
+            self._count += 1
+            if self._count > self._capacity:
+                self._to_bloom()
+            return False
+        if self._set(key):
+            return True
+        self._count += 1
+        return False
+
+
+    def __contains__(self, key):
+        if self._bits is None:
+            return key in self._keys
+        bits = self._bits
+        return all(bits[byte] & bit for byte, bit in self._positions(key))
+
+
+    def __len__(self):
+        return self._count
+
+
+    def _cardinality(self):
+        ones = sum(self._bits.translate(POPCOUNT))
+        size = self._mask + 1
+        return round(-size / HASHES * log(1 - min(ones, size - 1) / size))
+
+
+    def error(self):
+        if self._bits is None:
+            return 0.0
+        return (1 - exp(-HASHES * self._count / (self._mask + 1))) ** HASHES
+
+
+    def memory(self):
+        return len(self._bits) if self._bits is not None else self._count * ENTRYBYTES
+
+
+    def merge(self, other):
+        if self._bits is None and other._bits is None:
+            overlap = len(self._keys & other._keys)
+            self._keys |= other._keys
+            self._count = len(self._keys)
+            if self._count > self._capacity:
+                self._to_bloom()
+            return overlap
+        if self._bits is None:
+            self._to_bloom()
+        if other._bits is None:
+            overlap = sum(self._set(key) for key in other._keys)
+            self._count += other._count - overlap
+            return overlap
+        if len(other._bits) != len(self._bits):
+            raise ValueError("Cannot merge digest filters of different sizes, use the same --dedup-memory")
+        before = self._count
+        self._bits = bytearray((int.from_bytes(self._bits, "little") | int.from_bytes(other._bits, "little")).to_bytes(len(self._bits), "little"))
+        self._count = max(before, other._count, self._cardinality())
+        return max(0, before + other._count - self._count)
+
+
+    def dumps(self):
+        if self._bits is None:
+            return f"exact:{self._count}:{pack_keys(self._keys)}"
+        return f"bloom:{self._count}:{b64encode(zlib.compress(bytes(self._bits))).decode()}"
+
+
+    @classmethod
+    def loads(cls, data, budget=BUDGET):
+        kind, count, payload = data.split(":", 2)
+        digests = cls(budget)
+        if kind == "exact":
+            digests._keys = set(unpack_keys(payload))
+        else:
+            digests._bits = bytearray(zlib.decompress(b64decode(payload)))
+            digests._mask = len(digests._bits) * 8 - 1
+            digests._keys = None
+        digests._count = int(count)
+        return digests
+
+
+class DedupAnalysis():
+    def __init__(self, budget=BUDGET):
+        self._budget = budget
+        self._digests = DigestSet(budget)
+        self._pending = {}
+        self._pendinglimit = max(1, budget // ENTRYBYTES // 4)
+        self._totals = {kind: [0, 0] for kind in ("unique", "duplicate", "revisit")}
+        self._resolved = 0
+        self._merged = 0
+        self._error = 0.0
+        self._estimated = [0, 0]
+        self._mimes = {}
+        self._hosts = {}
+
+
+    def __call__(self, cdxrec):
+        digest = cdxrec.digest
+        if digest == "-":
+            return
+        key = digest_key(digest)
+        size = cdxrec.bytes
+        size = int(size) if size.isdigit() else 0
+        mime = cdxrec.mime
+        if mime == REVISIT:
+            totals = self._totals["revisit"]
+            totals[0] += 1
+            totals[1] += size
+            if key in self._digests:
+                self._resolved += 1
+            elif key in self._pending or len(self._pending) < self._pendinglimit:
+                self._pending[key] = self._pending.get(key, 0) + 1
+            return
+        if self._digests.add(key):
+            totals = self._totals["duplicate"]
+            for counts, name in ((self._mimes, mime), (self._hosts, cdxrec.host)):
+                counts = counts.get(name) or counts.setdefault(name, [0, 0])
+                counts[0] += 1
+                counts[1] += size
+        else:
+            totals = self._totals["unique"]
+            if self._pending:
+                self._resolved += self._pending.pop(key, 0)
+        totals[0] += 1
+        totals[1] += size
+
+
+    def _resolve(self, pending, digests, unresolved):
+        for key, count in pending:
+            if key in digests:
+                self._resolved += count
+            else:
+                unresolved[key] = unresolved.get(key, 0) + count
+        return unresolved
+
+
+    def _largest(self, counts, limit=None):
+        return sorted(counts.items(), key=lambda item: -item[1][1])[:limit]
+
+
+    def memory(self):
+        return self._digests.memory() + (len(self._pending) + len(self._mimes) + len(self._hosts)) * ENTRYBYTES
+
+
+    def limit_hosts(self, hostlimit):
+        if not hostlimit or len(self._hosts) <= hostlimit:
+            return None
+        ranked = self._largest(self._hosts)
+        self._hosts = dict(ranked[:hostlimit])
+        return {"dropped": len(ranked) - hostlimit, "error": ranked[hostlimit][1][1]}
+
+
+    def report(self, maxhosts=None, hostname=lambda host: host):
+        digests = self._digests
+        return {
+            **{kind: {"captures": captures, "bytes": size} for kind, (captures, size) in self._totals.items()},
+            "resolved": self._resolved,
+            **({"estimated": {"captures": self._estimated[0], "bytes": self._estimated[1]}} if self._estimated[0] else {}),
+            "mimes": {mime: {"captures": captures, "bytes": size} for mime, (captures, size) in self._largest(self._mimes)},
+            "hosts": {hostname(host): {"captures": captures, "bytes": size} for host, (captures, size) in self._largest(self._hosts, maxhosts)},
+            "filter": {
+                "type": "exact" if digests._bits is None else "bloom",
+                "digests": len(digests),
+                "memory": digests.memory(),
+                "error": max(digests.error(), self._error),
+                "merged": self._merged
+            }
+        }
+
+
+    def partial(self):
+        return {
+            **self.report(),
+            "state": self._digests.dumps(),
+            "pending": list(self._pending.items())
+        }
+
+
+    def load(self, report):
+        self.merge(report)
+        self._merged = report["filter"]["merged"]
+
+
+    def merge(self, partial):
+        for kind in self._totals:
+            self._totals[kind][0] += partial[kind]["captures"]
+            self._totals[kind][1] += partial[kind]["bytes"]
+        self._resolved += partial["resolved"]
+        estimated = partial.get("estimated", {})
+        self._estimated[0] += estimated.get("captures", 0)
+        self._estimated[1] += estimated.get("bytes", 0)
+        for ours, theirs in ((self._mimes, partial["mimes"]), (self._hosts, partial["hosts"])):
+            for key, counts in theirs.items():
+                total = ours.setdefault(key, [0, 0])
+                total[0] += counts["captures"]
+                total[1] += counts["bytes"]
+        self._error = max(self._error, partial["filter"]["error"])
+        if "state" not in partial:
+            self._merged += 1
+            return
+        self._merged += partial["filter"]["merged"]
+        other = DigestSet.loads(partial["state"], self._budget)
+        pending = self._resolve(self._pending.items(), other, {})
+        pending = self._resolve(partial["pending"], self._digests, pending)
+        self._pending = dict(islice(pending.items(), self._pendinglimit))
+        overlap = self._digests.merge(other)
+        unique, duplicate = self._totals["unique"], self._totals["duplicate"]
+        if overlap and unique[0]:
+            size = round(unique[1] * overlap / unique[0])
+            unique[0] -= overlap
+            unique[1] -= size
+            duplicate[0] += overlap
+            duplicate[1] += size
+            self._estimated[0] += overlap
+            self._estimated[1] += size
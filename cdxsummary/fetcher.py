@@ -0,0 +1,93 @@
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from requests.exceptions import ChunkedEncodingError, ConnectionError, Timeout
+
+
+RETRYABLE = (ChunkedEncodingError, ConnectionError, Timeout)
+
+
+class UpstreamError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+    def __reduce__(self):
+        return type(self), (str(self), self.status)
+
+
+class PageFetchError(UpstreamError):
+    pass
+
+
+class PageFetcher():
+    def _log(self, msg):
+        if self._logger:
+            self._logger(msg)
+
+
+    def __init__(self, session, url, concurrency=4, retries=5, backoff=1.0, timeout=120, ordered=True, logger=None):
+        self._session = session
+        self._url = url
+        self._concurrency = max(1, concurrency)
+        self._retries = retries
+        self._backoff = backoff
+        self._timeout = timeout
+        self._ordered = ordered
+        self._logger = logger
+        self._pages = None
+
+
+    def _get(self, url):
+        for attempt in range(self._retries + 1):
+            try:
+                r = self._session.get(url, timeout=self._timeout)
+                if r.status_code < 500:
+                    return r
+                error = f"{r.status_code} {r.reason}: {url}"
+            except RETRYABLE as e:
+                error = e
+            if attempt < self._retries:
+                delay = self._backoff * 2 ** attempt
+                self._log(f"Retrying in [cyan]{delay:g}s[/cyan] ({error})")
+                time.sleep(delay)
+        raise PageFetchError(f"Giving up after {self._retries + 1} attempts: {error}")
+
+
+    def pages(self):
+        if self._pages is None:
+            r = self._get(f"{self._url}&showNumPages=true")
+            if not r.ok:
+                raise PageFetchError(f"{r.status_code} {r.reason}: {self._url}", r.status_code)
+            self._pages = int(r.text)
+        return self._pages
+
+
+    def _fetch(self, page):
+        pageurl = f"{self._url}&page={page}"
+        r = self._get(pageurl)
+        if not r.ok:
+            raise PageFetchError(f"{r.status_code} {r.reason}: {pageurl}", r.status_code)
+        self._log(f"Downloaded [[cyan]{page + 1}/{self._pages}[/cyan]]: [magenta]{pageurl}[/magenta]")
+        return page, r.content.splitlines()
+
+
+    def __call__(self, skip=()):
+        pending = [page for page in range(self.pages()) if page not in skip]
+        ahead = self._concurrency * 2
+        with ThreadPoolExecutor(max_workers=self._concurrency) as pool:
+            futures = [pool.submit(self._fetch, page) for page in pending[:ahead]]
+            queued = len(futures)
+            while futures:
+                if self._ordered:
+                    future = futures.pop(0)
+                else:
+                    future = next(iter(wait(futures, return_when=FIRST_COMPLETED).done))
+                    futures.remove(future)
+                page, lines = future.result()
+                if queued < len(pending):
+                    futures.append(pool.submit(self._fetch, pending[queued]))
+                    queued += 1
+                yield page, lines
+
@@ -0,0 +1,138 @@
+import argparse
+import os
+import sys
+
+if not __package__:
+    sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from cdxsummary.parser import PARSERS
+from cdxsummary.reader import MappedCDXFile
+
+
+PROBESIZE = 64 * 1024
+
+
+def timestamp(pad):
+    def bound(value):
+        if not value.isdigit() or len(value) > 14:
+            raise argparse.ArgumentTypeError(f"Invalid timestamp (1-14 digits of YYYYMMDDhhmmss expected): '{value}'")
+        return value + pad * (14 - len(value))
+    return bound
+
+
+def prefix_successor(prefix):
+    prefix = prefix.rstrip(b"\xff")
+    return prefix[:-1] + bytes([prefix[-1] + 1]) if prefix else None
+
+
+def bisect_offset(line_at, size, key):
+    lo, hi = 0, size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        found = line_at(mid)
+        if found is None or found[1] >= key:
+            hi = mid
+        else:
+            lo = found[0] + 1
+    found = line_at(lo)
+    return found[0] if found else size
+
+
+def prefix_range(line_at, size, prefix):
+    start = bisect_offset(line_at, size, prefix)
+    successor = prefix_successor(prefix)
+    return start, bisect_offset(line_at, size, successor) if successor else size
+
+
+def file_range(path, prefix):
+    mapped = MappedCDXFile(path)
+    try:
+        return prefix_range(mapped.line_at, len(mapped), prefix)
+    finally:
+        mapped.close()
+
+
+class RemoteLines():
+    def __init__(self, session, url, probesize=PROBESIZE):
+        self._session = session
+        self._url = url
+        self._probesize = probesize
+        self._window = (0, b"")
+        self._size = None
+
+
+    def _fetch(self, start, length):
+        r = self._session.get(self._url, headers={"Range": f"bytes={start}-{start + length - 1}"})
+        if r.status_code not in (206, 416) or "Content-Range" not in r.headers:
+            r.close()
+            raise ValueError(f"Byte ranges are not supported: {self._url}")
+        self._size = int(r.headers["Content-Range"].rpartition("/")[2])
+        self._window = (start, r.content if r.status_code == 206 else b"")
+
+
+    def size(self):
+        if self._size is None:
+            self._fetch(0, self._probesize)
+        return self._size
+
+
+    def __call__(self, pos):
+        if pos >= self.size():
+            return None
+        base = max(0, pos - 1)
+        length = self._probesize
+        wstart, data = self._window
+        if not wstart <= base < wstart + len(data):
+            self._fetch(base, length)
+        while True:
+            wstart, data = self._window
+            start = 0 if pos == 0 else data.find(b"\n", base - wstart) + 1 or None
+            end = data.find(b"\n", start) if start is not None else -1
+            if end >= 0:
+                return wstart + start, data[start:end]
+            if wstart + len(data) >= self._size:
+                return (wstart + start, data[start:]) if start is not None and start < len(data) else None
+            length *= 2
+            self._fetch(base, length)
+
+
+class LineFilter():
+    def __init__(self, prefix=None, start=None, end=None, ordered=True, parser="fast"):
+        self._prefix = prefix.encode() if prefix else b""
+        self._start = start.encode() if start else None
+        self._end = end.encode() if end else None
+        self._ordered = ordered
+        self._parse = PARSERS[parser]
+
+
+    def attach(self, analyzer):
+        update = analyzer.update
+        analyzer.update = lambda cdx: update(self(cdx))
+        return analyzer
+
+
+    def _datetime(self, line):
+        i = line.find(b" ")
+        dt = line[i + 1:i + 15]
+        if i > 0 and len(dt) == 14 and dt.isdigit():
+            return dt
+        try:
+            return self._parse(line).datetime.encode()
+        except:
+            return None
+
+
+    def __call__(self, lines):
+        prefix = self._prefix
+        start = self._start
+        end = self._end
+        for line in lines:
+            if prefix and not line.startswith(prefix):
+                if self._ordered and line > prefix and self._datetime(line):
+                    break
+                continue
+            if start or end:
+                dt = self._datetime(line)
+                if dt and (start and dt < start or end and dt > end):
+                    continue
+            yield line
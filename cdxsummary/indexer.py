@@ -0,0 +1,286 @@
+import argparse
+import gzip
+import io
+import json
+import os
+import sys
+import zlib
+
+from itertools import islice
+
+if not __package__:
+    sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from cdxsummary import __NAME, __VERSION
+from cdxsummary.columnar import ENGINES
+from cdxsummary.console import errprint
+from cdxsummary.decompress import COMPRESSED, compression, open_compressed
+from cdxsummary.filters import LineFilter
+from cdxsummary.parser import PARSERS
+from cdxsummary.reader import MappedCDXFile
+
+
+MAGIC = b"CDXSUMMARY-INDEX 1\n"
+TRAILER = 32
+INDEXEXT = ".cdxidx"
+BLOCKLINES = 10000
+FANOUT = 16
+SKIP, EDGE, FULL = range(3)
+FORMAT = f"{__NAME}-index"
+GENERATOR = f"{__NAME}/{__VERSION}"
+
+
+def index_paths(path):
+    base = path
+    ext = compression(base)
+    if ext:
+        base = base[:-len(ext)]
+    if base.endswith(".cdx"):
+        base = base[:-len(".cdx")]
+    return base + INDEXEXT, base + ".blocks.cdx.gz"
+
+
+def line_key(line):
+    return line.split(b" ", 1)[0].rstrip(b"\r\n").decode("latin-1")
+
+
+def blocks_of(lines, size):
+    lines = iter(lines)
+    while True:
+        block = list(islice(lines, size))
+        if not block:
+            return
+        yield block
+
+
+class IndexBuilder():
+    def __init__(self, out, fanout=FANOUT, samplesize=10, parser="fast", precision=12, engine="record", hostlimit=None):
+        self._out = out
+        self._fanout = fanout
+        self._samplesize = samplesize
+        self._parser = parser
+        self._precision = precision
+        self._engine = engine
+        self._hostlimit = hostlimit or None
+        self._blocks = []
+        self._nodes = []
+        self._pending = {}
+        self._lines = 0
+
+
+    def _analyzer(self):
+        return ENGINES[self._engine](samplesize=self._samplesize, parser=self._parser, precision=self._precision)
+
+
+    def _write(self, level, partial):
+        data = zlib.compress(json.dumps(partial, separators=(",", ":")).encode())
+        if level == len(self._nodes):
+            self._nodes.append([])
+        self._nodes[level].append([self._out.tell(), len(data)])
+        self._out.write(data)
+
+
+    def _add(self, level, partial):
+        self._write(level, partial)
+        analyzer, children = self._pending.pop(level + 1, None) or (self._analyzer(), 0)
+        analyzer.merge(partial)
+        analyzer.limit_hosts(self._hostlimit)
+        if children + 1 == self._fanout:
+            self._add(level + 1, analyzer.partial())
+        else:
+            self._pending[level + 1] = (analyzer, children + 1)
+
+
+    def add_block(self, lines, offset, length):
+        analyzer = self._analyzer()
+        analyzer.update(lines)
+        partial = analyzer.partial()
+        self._blocks.append([line_key(lines[0]), line_key(lines[-1]), offset, length, len(lines), partial["first"], partial["last"]])
+        self._lines += len(lines)
+        self._add(0, partial)
+
+
+    def finish(self, **header):
+        level = 1
+        while self._nodes and len(self._nodes[level - 1]) > 1:
+            if level in self._pending:
+                analyzer, _ = self._pending.pop(level)
+                self._add(level, analyzer.partial())
+            level += 1
+        data = zlib.compress(json.dumps({
+            "format": FORMAT,
+            "generator": GENERATOR,
+            **header,
+            "fanout": self._fanout,
+            "samplesize": self._samplesize,
+            "precision": self._precision,
+            "hostlimit": self._hostlimit,
+            "lines": self._lines,
+            "blocks": self._blocks,
+            "nodes": self._nodes
+        }, separators=(",", ":")).encode())
+        offset = self._out.tell()
+        self._out.write(data)
+        self._out.write(f"{offset:015d} {len(data):015d}\n".encode())
+        return len(self._blocks), self._lines
+
+
+def build_index(path, indexpath=None, blockspath=None, blocklines=BLOCKLINES, fanout=FANOUT, samplesize=10, parser="fast", precision=12, engine="record", hostlimit=None, decoder="auto"):
+    default_index, default_blocks = index_paths(path)
+    indexpath = indexpath or default_index
+    compressed = path.endswith(COMPRESSED)
+    datapath = (blockspath or default_blocks) if compressed else path
+    tmp = f"{indexpath}.{os.getpid()}.tmp"
+    blockstmp = f"{datapath}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as out:
+            out.write(MAGIC)
+            builder = IndexBuilder(out, fanout=fanout, samplesize=samplesize, parser=parser, precision=precision, engine=engine, hostlimit=hostlimit)
+            if compressed:
+                with open(blockstmp, "wb") as blocks:
+                    for lines in blocks_of(open_compressed(path, decoder=decoder), blocklines):
+                        offset = blocks.tell()
+                        blocks.write(gzip.compress(b"".join(lines)))
+                        builder.add_block(lines, offset, blocks.tell() - offset)
+                os.replace(blockstmp, datapath)
+            else:
+                mapped = MappedCDXFile(path)
+                offset = 0
+                for lines in blocks_of(mapped, blocklines):
+                    length = sum(map(len, lines))
+                    builder.add_block(lines, offset, length)
+                    offset += length
+                mapped.close()
+            st = os.stat(datapath)
+            counts = builder.finish(source=os.path.basename(path), data=os.path.relpath(datapath, os.path.dirname(os.path.abspath(indexpath))), compressed=compressed, identity=[st.st_mtime_ns, st.st_size], blocklines=blocklines)
+        os.replace(tmp, indexpath)
+    finally:
+        for leftover in (tmp, blockstmp):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    return indexpath, datapath, counts
+
+
+class CDXIndex():
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        if self._file.read(len(MAGIC)) != MAGIC:
+            self._file.close()
+            raise ValueError(f"Not a {FORMAT} file: {path}")
+        self._file.seek(-TRAILER, os.SEEK_END)
+        offset, length = map(int, self._file.read(TRAILER).split())
+        self._header = json.loads(self._read(offset, length))
+        self._data = os.path.join(os.path.dirname(os.path.abspath(path)), self._header["data"])
+        st = os.stat(self._data)
+        if [st.st_mtime_ns, st.st_size] != self._header["identity"]:
+            raise ValueError(f"Index is stale, the indexed data has changed since it was built: {self._data}")
+        self._datafile = None
+        self.nodes = 0
+        self.edges = 0
+
+
+    def _read(self, offset, length):
+        self._file.seek(offset)
+        return zlib.decompress(self._file.read(length))
+
+
+    def node(self, level, i):
+        self.nodes += 1
+        return json.loads(self._read(*self._header["nodes"][level][i]))
+
+
+    def block_lines(self, i):
+        _, _, offset, length, *_ = self._header["blocks"][i]
+        if not self._datafile:
+            self._datafile = open(self._data, "rb")
+        self._datafile.seek(offset)
+        data = self._datafile.read(length)
+        self.edges += 1
+        return io.BytesIO(gzip.decompress(data) if self._header["compressed"] else data)
+
+
+    def cover(self, start, end):
+        fanout = self._header["fanout"]
+        levels = len(self._header["nodes"])
+        count = len(self._header["blocks"])
+        while start < end:
+            level, span = 0, 1
+            while level + 1 < levels and not start % (span * fanout) and min(start + span * fanout, count) <= end:
+                level += 1
+                span *= fanout
+            yield level, start // span
+            start = min(start + span, count)
+
+
+    def _classify(self, block, prefix, start, end):
+        first, last, _, _, lines, earliest, latest = block
+        if not lines or start and latest < start or end and earliest > end:
+            return SKIP
+        if prefix:
+            key = prefix.split(" ", 1)[0]
+            if last < key or first > key and not first.startswith(key):
+                return SKIP
+            if key != prefix or not (first.startswith(key) and last.startswith(key)):
+                return EDGE
+        if start and earliest < start or end and latest > end:
+            return EDGE
+        return FULL
+
+
+    def query(self, analyzer, prefix=None, start=None, end=None, parser="fast"):
+        blocks = self._header["blocks"]
+        linefilter = LineFilter(prefix=prefix, start=start, end=end, parser=parser)
+        key = prefix.encode().decode("latin-1") if prefix else None
+        run = None
+        for i, block in enumerate(blocks + [None]):
+            kind = self._classify(block, key, start, end) if block else SKIP
+            if kind == FULL:
+                run = i if run is None else run
+                continue
+            if run is not None:
+                for level, j in self.cover(run, i):
+                    analyzer.merge(self.node(level, j))
+                run = None
+            if kind == EDGE:
+                analyzer.update(linefilter(self.block_lines(i)))
+        return analyzer._report()
+
+
+    def close(self):
+        if self._datafile:
+            self._datafile.close()
+        self._file.close()
+
+
+def argument_parser():
+    ap = argparse.ArgumentParser(prog=f"{__NAME} index", description="Build a side index of a sorted CDX file with block offsets and pre-aggregated block statistics to answer repeated summaries of the whole file, SURT prefixes, or time windows with '--index'.")
+    ap.add_argument("-b", "--blocks", metavar="FILE", help="Path of the block-compressed (ZipNum-style) copy written for compressed inputs (default: input base name with '.blocks.cdx.gz')")
+    ap.add_argument("-d", "--decoder", choices=["auto", "builtin", "external"], default="auto", help="Decompression method for compressed inputs (default: 'auto')")
+    ap.add_argument("-e", "--engine", choices=ENGINES, default="record", help="Analysis engine (default: 'record')")
+    ap.add_argument("-f", "--fanout", type=int, default=FANOUT, metavar="N", help=f"Number of child nodes pre-aggregated into each node of the index tree (default: {FANOUT})")
+    ap.add_argument("-n", "--lines", type=int, default=BLOCKLINES, metavar="N", help=f"Number of CDX lines per block (default: {BLOCKLINES})")
+    ap.add_argument("-o", "--out", metavar="FILE", help=f"Index file path (default: input base name with '{INDEXEXT}')")
+    ap.add_argument("-P", "--precision", type=int, default=12, metavar="P", help="HyperLogLog precision (4-18) of the pre-aggregated sketches, 0 to disable (default: 12)")
+    ap.add_argument("-p", "--parser", choices=PARSERS, default="fast", help="CDX line parser engine (default: 'fast')")
+    ap.add_argument("-s", "--samples", type=int, default=10, metavar="N", help="Number of sample memento URLs kept per block (default: 10)")
+    ap.add_argument("-t", "--tophosts", type=int, default=0, metavar="N", help="Number of host counts kept in nodes above the block level to bound the index size, recording the truncation in summaries as 'approximated' (default: 0, to keep all)")
+    ap.add_argument("input", help="Local CDX file (plain/gz/bz2/xz/zst), sorted by SURT")
+    return ap
+
+
+def main(argv=None):
+    ap = argument_parser()
+    args = ap.parse_args(argv)
+    if args.lines < 1 or args.fanout < 2:
+        ap.error("--lines must be positive and --fanout at least 2")
+    errprint(f"Indexing local file: [magenta]{args.input}[/magenta]")
+    try:
+        indexpath, datapath, (blocks, lines) = build_index(args.input, indexpath=args.out, blockspath=args.blocks, blocklines=args.lines, fanout=args.fanout, samplesize=args.samples, parser=args.parser, precision=args.precision, engine=args.engine, hostlimit=args.tophosts, decoder=args.decoder)
+    except (OSError, Exception) as e:
+        errprint(e)
+        sys.exit(1)
+    errprint(f"Indexed [cyan]{lines}[/cyan] lines in [cyan]{blocks}[/cyan] blocks of [magenta]{datapath}[/magenta]: [magenta]{indexpath}[/magenta]")
+
+
+if __name__ == "__main__":
+    main()
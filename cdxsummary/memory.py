@@ -0,0 +1,90 @@
+import os
+import sys
+import tracemalloc
+
+from time import monotonic
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+
+if not __package__:
+    sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from cdxsummary.console import errprint
+
+
+INTERVAL = 5.0
+SLOWDOWN = 10
+TOPSITES = 5
+OPAQUE = (type, ModuleType, FunctionType, MethodType, BuiltinFunctionType)
+
+
+def deep_size(obj, seen):
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, OPAQUE):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, "__dict__"):
+            stack.append(obj.__dict__)
+        elif hasattr(obj, "__slots__"):
+            stack.extend(getattr(obj, slot) for slot in obj.__slots__ if hasattr(obj, slot))
+    return size
+
+
+class MemoryProfiler():
+    def __init__(self, interval=INTERVAL, logger=errprint):
+        self._interval = interval
+        self._logger = logger
+        self._next = None
+        self._peak = 0
+        self._peaks = {}
+        self._estimates = {}
+        tracemalloc.start()
+
+
+    def attach(self, analyzer):
+        analyzer._profiler = self
+        return self
+
+
+    def _structures(self, analyzer):
+        for name, plugin in analyzer._plugins.items():
+            yield name, analyzer._sampler if name == "samples" else plugin, plugin.memory()
+        if analyzer._sketches:
+            yield "sketches", analyzer._sketches, sum(len(sketch._registers) for sketch in analyzer._sketches.values())
+
+
+    def sample(self, analyzer, force=False):
+        started = monotonic()
+        if not force and self._next is not None and started < self._next:
+            return
+        self._peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+        seen = {id(analyzer)}
+        for name, obj, estimate in self._structures(analyzer):
+            self._peaks[name] = max(self._peaks.get(name, 0), deep_size(obj, seen))
+            self._estimates[name] = max(self._estimates.get(name, 0), estimate)
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        self._next = monotonic() + max(self._interval, (monotonic() - started) * SLOWDOWN)
+
+
+    def close(self, analyzer):
+        from humanize import naturalsize
+        self.sample(analyzer, force=True)
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+        tracemalloc.stop()
+        size = lambda value: naturalsize(value, binary=True)
+        self._logger(f"Peak traced memory [cyan]{size(max(self._peak, peak))}[/cyan], [cyan]{size(current)}[/cyan] at exit")
+        for name, peak in sorted(self._peaks.items(), key=lambda item: -item[1]):
+            self._logger(f"  Peak [cyan]{name}[/cyan] size [cyan]{size(peak)}[/cyan] (budgeted as [cyan]{size(self._estimates[name])}[/cyan])")
+        for stat in snapshot.statistics("lineno")[:TOPSITES]:
+            frame = stat.traceback[0]
+            self._logger(f"  Allocated [cyan]{size(stat.size)}[/cyan] in [cyan]{stat.count:,}[/cyan] blocks at [magenta]{frame.filename}:{frame.lineno}[/magenta]")
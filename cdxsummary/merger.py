@@ -0,0 +1,59 @@
+import gzip
+import os
+import sys
+
+from glob import glob
+
+if not __package__:
+    sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from cdxsummary.analyzer import CDXAnalyzer
+from cdxsummary.binary import load_report
+from cdxsummary.parallel import shard_sampling
+
+
+REPORTEXTS = (".json", ".json.gz", ".cdxb", ".cdxb.gz")
+HOSTSLACK = 10
+
+
+def expand_report_paths(inputs):
+    for input in inputs:
+        if os.path.isdir(input):
+            for root, _, files in sorted(os.walk(input)):
+                for file in sorted(files):
+                    if file.endswith(REPORTEXTS):
+                        yield os.path.join(root, file)
+        elif os.path.exists(input):
+            yield input
+        else:
+            yield from sorted(glob(input, recursive=True))
+
+
+def read_report(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        return load_report(f)
+
+
+def merge_reports(analyzer, paths, hostlimit=None):
+    for path in paths:
+        analyzer.merge_report(read_report(path), hostlimit=hostlimit)
+    return analyzer._report()
+
+
+def _merge_chunk(paths, samplesize=0, hostlimit=None, precision=12, sampling=None, plugins=None, maxmemory=None):
+    analyzer = CDXAnalyzer(samplesize=samplesize, precision=precision, plugins=plugins, maxmemory=maxmemory, **(sampling or {}))
+    merge_reports(analyzer, paths, hostlimit=hostlimit)
+    return analyzer.partial()
+
+
+def merge_parallel(analyzer, paths, jobs, samplesize=0, hostlimit=None, precision=12, sampling=None, plugins=None, maxmemory=None):
+    from concurrent.futures import ProcessPoolExecutor
+    paths = list(paths)
+    chunks = [paths[i::jobs] for i in range(jobs) if paths[i::jobs]]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(_merge_chunk, chunk, samplesize=samplesize, hostlimit=hostlimit, precision=precision, sampling=shard_sampling(sampling, i), plugins=plugins, maxmemory=maxmemory) for i, chunk in enumerate(chunks)]
+        for future in futures:
+            analyzer.merge(future.result())
+            analyzer.limit_hosts(hostlimit)
+    return analyzer._report()
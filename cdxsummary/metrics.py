@@ -0,0 +1,212 @@
+import json
+import os
+import sys
+import time
+
+from itertools import islice
+
+if not __package__:
+    sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from cdxsummary.console import errprint
+
+
+BLOCKSIZE = 1024
+PARSESAMPLE = 64
+REFRESH = 0.25
+PREFIX = "cdxsummary"
+
+
+def input_position(stream):
+    for obj in (getattr(stream, "raw", None), stream):
+        if hasattr(obj, "position"):
+            return obj.position
+
+
+def prometheus_label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class Metrics():
+    def __init__(self, source="-", total=None, outfile=None, interval=10.0, progress=False):
+        self._source = source
+        self._total = total
+        self._outfile = outfile
+        self._interval = interval
+        self._progress = progress
+        self._analyzer = None
+        self._parse = None
+        self._bar = None
+        self._task = None
+        self._position = None
+        self._started = time.time()
+        self._clock = time.perf_counter()
+        self._lines = 0
+        self._bytes = 0
+        self._compressed = None
+        self._io = 0.0
+        self._active = 0.0
+        self._begin = None
+        self._overhead = 0.0
+        self._parsed = 0
+        self._parsetime = 0.0
+        self._rate = 0.0
+        self._done = False
+        self._last = (self._clock, 0)
+        self._written = self._clock
+        self._logged = self._clock
+        self._refreshed = self._clock
+
+
+    def attach(self, analyzer, sample_parse=True):
+        self._analyzer = analyzer
+        self._parse = analyzer._parse if sample_parse else None
+        update = analyzer.update
+        analyzer.update = lambda cdx: update(self.meter(cdx))
+        return analyzer
+
+
+    def meter(self, stream, blocksize=BLOCKSIZE):
+        self._position = input_position(stream)
+        lines = iter(stream)
+        blocks = 0
+        clock = time.perf_counter
+        self._begin = begin = clock()
+        while True:
+            start = clock()
+            block = list(islice(lines, blocksize))
+            now = clock()
+            self._io += now - start
+            if not block:
+                break
+            self._lines += len(block)
+            self._bytes += sum(map(len, block))
+            blocks += 1
+            if self._parse and not blocks % PARSESAMPLE:
+                self._sample_parse(block)
+            if now - self._refreshed >= REFRESH:
+                self._tick(now)
+                self._overhead += clock() - now
+            yield from block
+        now = clock()
+        self._active += now - begin
+        self._begin = None
+        self._tick(now)
+
+
+    def _sample_parse(self, block):
+        parse = self._parse
+        start = time.perf_counter()
+        for line in block:
+            try:
+                parse(line)
+            except:
+                pass
+        elapsed = time.perf_counter() - start
+        self._parsed += len(block)
+        self._parsetime += elapsed
+        self._overhead += elapsed
+
+
+    def _tick(self, now):
+        self._refreshed = now
+        if self._position:
+            self._compressed = self._position()
+        if now - self._last[0] >= 1:
+            self._rate = (self._lines - self._last[1]) / (now - self._last[0])
+            self._last = (now, self._lines)
+        if self._progress:
+            self._render()
+        if self._outfile and now - self._written >= self._interval:
+            self._written = now
+            self.write()
+
+
+    def _render(self):
+        done = self._compressed if self._compressed is not None else self._bytes
+        if not sys.stderr.isatty():
+            if self._refreshed - self._logged >= self._interval or self._done:
+                self._logged = self._refreshed
+                errprint(f"Analyzed {self._lines:,} lines ({self._rate:,.0f} lines/s), {self._bytes:,} bytes" + (f" of {self._total:,}" if self._total else ""))
+            return
+        if not self._bar:
+            from rich.console import Console
+            from rich.progress import BarColumn, Progress, TaskProgressColumn, TextColumn, TimeElapsedColumn, TimeRemainingColumn
+            self._bar = Progress(TextColumn("[cyan]{task.description}"), BarColumn(), TaskProgressColumn(), TextColumn("[magenta]{task.fields[lines]:,} lines[/magenta] ({task.fields[rate]:,.0f}/s)"), TimeElapsedColumn(), TimeRemainingColumn(), console=Console(stderr=True))
+            self._task = self._bar.add_task("Analyzing", total=self._total, lines=0, rate=0)
+            self._bar.start()
+        self._bar.update(self._task, completed=done, lines=self._lines, rate=self._rate)
+
+
+    def snapshot(self):
+        now = time.perf_counter()
+        elapsed = now - self._clock
+        active = self._active + (now - self._begin if self._begin else 0)
+        processing = max(0.0, active - self._io - self._overhead)
+        parse = min(processing, self._parsetime / self._parsed * self._lines) if self._parsed else None
+        return {
+            "source": self._source,
+            "started": round(self._started, 3),
+            "updated": round(time.time(), 3),
+            "elapsed": round(elapsed, 3),
+            "done": self._done,
+            "lines": self._lines,
+            "captures": self._analyzer._captures if self._analyzer else None,
+            "parse_failures": self._analyzer._invalid if self._analyzer else None,
+            "bytes": {
+                "decompressed": self._bytes,
+                "compressed": self._compressed,
+                "total": self._total
+            },
+            "lines_per_sec": round(self._lines / elapsed) if elapsed else None,
+            "recent_lines_per_sec": round(self._rate),
+            "seconds": {
+                "io": round(self._io, 3),
+                "parse": round(parse, 3) if parse is not None else None,
+                "aggregate": round(processing - parse, 3) if parse is not None else None,
+                "analyze": round(processing, 3)
+            }
+        }
+
+
+    def prometheus(self, snapshot):
+        label = f'source="{prometheus_label(snapshot["source"])}"'
+        metrics = [
+            ("lines_total", "counter", "CDX lines read", [("", snapshot["lines"])]),
+            ("captures_total", "counter", "CDX lines parsed and aggregated", [("", snapshot["captures"])]),
+            ("parse_failures_total", "counter", "CDX lines that failed to parse", [("", snapshot["parse_failures"])]),
+            ("bytes_read_total", "counter", "Bytes read from the input", [(f',kind="{kind}"', value) for kind, value in snapshot["bytes"].items() if kind != "total"]),
+            ("input_bytes", "gauge", "Size of the input in bytes", [("", snapshot["bytes"]["total"])]),
+            ("stage_seconds_total", "counter", "Time spent in I/O, parsing (estimated), and aggregation", [(f',stage="{stage}"', value) for stage, value in snapshot["seconds"].items() if stage != ("analyze" if snapshot["seconds"]["parse"] is not None else "parse")]),
+            ("lines_per_second", "gauge", "Lines read per second over the last second", [("", snapshot["recent_lines_per_sec"])]),
+            ("elapsed_seconds", "gauge", "Time since the analysis started", [("", snapshot["elapsed"])]),
+            ("last_update_timestamp_seconds", "gauge", "Time of the last metrics update", [("", snapshot["updated"])]),
+            ("done", "gauge", "Whether the analysis has finished", [("", int(snapshot["done"]))])
+        ]
+        lines = []
+        for name, kind, help, samples in metrics:
+            samples = [(extra, value) for extra, value in samples if value is not None]
+            if not samples:
+                continue
+            lines.append(f"# HELP {PREFIX}_{name} {help}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            lines.extend(f"{PREFIX}_{name}{{{label}{extra}}} {value}" for extra, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+    def write(self):
+        snapshot = self.snapshot()
+        data = self.prometheus(snapshot) if self._outfile.endswith(".prom") else json.dumps(snapshot, indent=2) + "\n"
+        tmp = f"{self._outfile}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(data)
+        os.replace(tmp, self._outfile)
+
+
+    def close(self, done=True):
+        self._done = done
+        self._tick(time.perf_counter())
+        if self._bar:
+            self._bar.stop()
+        if self._outfile:
+            self.write()
@@ -0,0 +1,32 @@
+from functools import lru_cache
+
+
+MIMECACHE = 1 << 16
+MIMEMAP = {
+    "html": "HTML",
+    "image": "Image",
+    "css": "CSS",
+    "javascript": "JavaScript",
+    "json": "JSON",
+    "xml": "XML",
+    "plain": "Text",
+    "pdf": "PDF",
+    "font": "Font",
+    "audio": "Audio",
+    "video": "Video",
+    "revisit": "Revisit",
+    "other": "Other"
+}
+
+
+@lru_cache(maxsize=MIMECACHE)
+def mime_group(mime):
+    group, _, subtype = mime.lower().partition("/")
+    known = MIMEMAP.get(subtype) or MIMEMAP.get(group)
+    if known:
+        return known
+    if subtype.startswith("xhtml"):
+        return "HTML"
+    if subtype.endswith("+xml") or subtype.startswith("xml-"):
+        return "XML"
+    return "Other"
@@ -0,0 +1,68 @@
+import os
+import sys
+
+if not __package__:
+    sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from cdxsummary.columnar import ENGINES
+from cdxsummary.decompress import COMPRESSED, open_compressed
+from cdxsummary.filters import LineFilter, prefix_range
+from cdxsummary.reader import MappedCDXFile
+
+
+MINSHARD = 4 * 1024 * 1024
+
+
+def line_aligned_ranges(path, parts, prefix=None):
+    mapped = MappedCDXFile(path)
+    try:
+        start, end = prefix_range(mapped.line_at, len(mapped), prefix.encode()) if prefix else (0, len(mapped))
+        return mapped.ranges(max(1, min(parts, (end - start) // MINSHARD)), start=start, end=end)
+    finally:
+        mapped.close()
+
+
+def read_range(path, start, end):
+    mapped = MappedCDXFile(path)
+    try:
+        yield from mapped.lines(start, end)
+    finally:
+        mapped.close()
+
+
+def shard_tasks(files, jobs, prefix=None):
+    for file in files:
+        if file.endswith(COMPRESSED):
+            yield (file, None, None)
+            continue
+        for start, end in line_aligned_ranges(file, jobs, prefix=prefix):
+            yield (file, start, end)
+
+
+def shard_sampling(sampling, i):
+    if sampling and sampling.get("seed") is not None:
+        return {**sampling, "seed": f"{sampling['seed']}/{i}"}
+    return sampling
+
+
+def analyze_shard(task, samplesize=0, parser="fast", precision=12, decoder="auto", engine="record", filters=None, sampling=None, dedup=None, bywarc=False, plugins=None, maxmemory=None):
+    file, start, end = task
+    if start is None:
+        stream = open_compressed(file, decoder=decoder)
+    else:
+        stream = read_range(file, start, end)
+    analyzer = ENGINES[engine](samplesize=samplesize, parser=parser, precision=precision, dedup=dedup, bywarc=bywarc, plugins=plugins, maxmemory=maxmemory, **(sampling or {}))
+    if filters:
+        LineFilter(parser=parser, **filters).attach(analyzer)
+    analyzer(stream)
+    return analyzer.partial()
+
+
+def analyze_parallel(analyzer, files, jobs, samplesize=0, parser="fast", precision=12, decoder="auto", engine="record", filters=None, sampling=None, dedup=None, bywarc=False, plugins=None, maxmemory=None):
+    from concurrent.futures import ProcessPoolExecutor
+    tasks = list(shard_tasks(files, jobs, prefix=filters and filters.get("prefix")))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(analyze_shard, task, samplesize=samplesize, parser=parser, precision=precision, decoder=decoder, engine=engine, filters=filters, sampling=shard_sampling(sampling, i), dedup=dedup, bywarc=bywarc, plugins=plugins, maxmemory=maxmemory) for i, task in enumerate(tasks)]
+        for future in futures:
+            analyzer.merge(future.result())
+    return analyzer._report()
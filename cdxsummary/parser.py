@@ -31,9 +31,234 @@ class CDXRecord():
             raise ValueError(f"Invalid CDX line: '{cdxline.strip()}'")
         for key, value in m.groupdict(default="").items():
             setattr(self, key, value)
-        self.pathlen = self._segment_length(self.path, '/')
-        self.querylen = self._segment_length(self.query, '&')
+
+
+    @property
+    def pathlen(self):
+        return self._segment_length(self.path, '/')
+
+
+    @property
+    def querylen(self):
+        return self._segment_length(self.query, '&')
+
+
+    @property
+    def rawdigest(self):
+        return self.digest.encode()
 
 
     def __str__(self):
-        return str(self.__dict__)
+        return str({key: getattr(self, key) for key in FIELDS})
+
+
+DIGITS = b"0123456789"
+HYPHEN = ord("-")
+UNSAFE = bytes(range(9, 14)) + bytes(range(28, 32)) + bytes(range(128, 256))
+MASKWS = bytes.maketrans(UNSAFE, b" " * len(UNSAFE))
+
+
+def optional_fields(tokens):
+    extra = [b""] * 5
+    i = 0
+    for token in tokens:
+        while i < 5:
+            if i < 2:
+                if token == b"-" or token.translate(None, DIGITS) == token:
+                    extra[i] = token
+                    break
+                if token[0] not in DIGITS:
+                    raise ValueError(f"Partial non-numeric field: '{token}'")
+            elif i < 4:
+                if token == b"-" or token.isdigit():
+                    extra[i] = token
+                    break
+                if token[0] in DIGITS or token[0] == HYPHEN:
+                    raise ValueError(f"Partial numeric field: '{token}'")
+            else:
+                extra[i] = token
+                break
+            i += 1
+        i += 1
+        if i >= 5:
+            break
+    return extra
+
+
+class FastCDXRecord():
+    __slots__ = ("_fields", "_hostend", "_queryat", "_extra")
+
+
+    def _segment_length(self, seg, sep):
+        seg = seg.strip(sep)
+        return seg.count(sep) + 1 if seg else 0
+
+
+    def __init__(self, cdxline):
+        line = cdxline.strip()
+        fields = line.split(b" ")
+        if line.translate(MASKWS) != line or b"" in fields:
+            raise ValueError(f"Irregular whitespace or non-ASCII characters in CDX line: '{line}'")
+        if len(fields) < 6:
+            raise ValueError(f"Invalid CDX line: '{line}'")
+        surt, dt, _, _, status, _ = fields[:6]
+        hostend = surt.find(b")")
+        queryat = surt.find(b"?", hostend + 1)
+        if hostend < 1 or queryat == len(surt) - 1:
+            raise ValueError(f"Invalid SURT: '{surt}'")
+        if len(dt) != 14 or not dt.isdigit():
+            raise ValueError(f"Invalid datetime: '{dt}'")
+        if status != b"-" and (len(status) != 3 or not status.isdigit()):
+            raise ValueError(f"Invalid status: '{status}'")
+        self._fields = fields
+        self._hostend = hostend
+        self._queryat = queryat
+        if len(fields) == 11 and fields[6] == b"-" and fields[7] == b"-" and fields[8].isdigit() and fields[9].isdigit():
+            self._extra = fields[6:]
+        else:
+            self._extra = optional_fields(fields[6:]) if len(fields) > 6 else None
+
+
+    def _extra_field(self, i):
+        return self._extra[i].decode() if self._extra else ""
+
+
+    @property
+    def surt(self):
+        return self._fields[0].decode()
+
+
+    @property
+    def host(self):
+        return self._fields[0][:self._hostend].decode()
+
+
+    @property
+    def path(self):
+        surt = self._fields[0]
+        return surt[self._hostend + 1:self._queryat if self._queryat > 0 else len(surt)].decode()
+
+
+    @property
+    def query(self):
+        return self._fields[0][self._queryat + 1:].decode() if self._queryat > 0 else ""
+
+
+    @property
+    def pathlen(self):
+        surt = self._fields[0]
+        return self._segment_length(surt[self._hostend + 1:self._queryat if self._queryat > 0 else len(surt)], b"/")
+
+
+    @property
+    def querylen(self):
+        return self._segment_length(self._fields[0][self._queryat + 1:], b"&") if self._queryat > 0 else 0
+
+
+    @property
+    def datetime(self):
+        return self._fields[1].decode()
+
+
+    @property
+    def year(self):
+        return self._fields[1][0:4].decode()
+
+
+    @property
+    def month(self):
+        return self._fields[1][4:6].decode()
+
+
+    @property
+    def day(self):
+        return self._fields[1][6:8].decode()
+
+
+    @property
+    def hour(self):
+        return self._fields[1][8:10].decode()
+
+
+    @property
+    def minute(self):
+        return self._fields[1][10:12].decode()
+
+
+    @property
+    def second(self):
+        return self._fields[1][12:14].decode()
+
+
+    @property
+    def url(self):
+        return self._fields[2].decode()
+
+
+    @property
+    def mime(self):
+        return self._fields[3].decode()
+
+
+    @property
+    def status(self):
+        return self._fields[4].decode()
+
+
+    @property
+    def digest(self):
+        return self._fields[5].decode()
+
+
+    @property
+    def rawdigest(self):
+        return self._fields[5]
+
+
+    @property
+    def redirect(self):
+        return self._extra_field(0)
+
+
+    @property
+    def metatags(self):
+        return self._extra_field(1)
+
+
+    @property
+    def bytes(self):
+        return self._extra_field(2)
+
+
+    @property
+    def offset(self):
+        return self._extra_field(3)
+
+
+    @property
+    def warcfile(self):
+        return self._extra_field(4)
+
+
+    def __str__(self):
+        return str({key: getattr(self, key) for key in FIELDS})
+
+
+FIELDS = list(CDXREC.groupindex) + ["pathlen", "querylen"]
+
+
+def parse_regex(line):
+    return CDXRecord(line.decode())
+
+
+def parse_fast(line):
+    try:
+        return FastCDXRecord(line)
+    except ValueError:
+        return CDXRecord(line.decode())
+
+
+PARSERS = {
+    "fast": parse_fast,
+    "regex": parse_regex
+}
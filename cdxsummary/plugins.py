@@ -0,0 +1,422 @@
+import os
+import sys
+
+from collections import Counter, defaultdict
+from importlib import import_module
+from operator import attrgetter
+
+if not __package__:
+    sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from cdxsummary.dedup import DedupAnalysis
+from cdxsummary.mimes import MIMEMAP, mime_group
+from cdxsummary.parser import FIELDS
+from cdxsummary.sampler import StratifiedSampler
+from cdxsummary.warcs import WARCStats
+
+
+ENTRYPOINTS = "cdxsummary.plugins"
+STRATA = ("host", "year", "mime")
+STRATUMSIZE = 3
+MINKEYS = 100
+HOSTBYTES = 120
+ROWBYTES = 320
+CELLBYTES = 40
+STRATUMBYTES = 700
+WARCBYTES = 800
+MIMEKEYS = {group: key for key, group in MIMEMAP.items()}
+
+
+def collapsed_mime(mime):
+    return f"other/{MIMEKEYS[mime_group(mime)]}"
+
+
+class AnalyzerPlugin():
+    name = None
+    keys = ()
+    fields = ()
+
+
+    def __init__(self, analyzer):
+        self._analyzer = analyzer
+
+
+    def owns(self, report):
+        return any(key in report for key in self.keys)
+
+
+    def update(self, cdxrec):
+        pass
+
+
+    def report(self):
+        return {}
+
+
+    def partial(self):
+        return self.report()
+
+
+    def merge(self, partial):
+        pass
+
+
+    def load(self, report):
+        self.merge(report)
+
+
+    def limit_hosts(self, hostlimit):
+        return None
+
+
+    def memory(self):
+        return 0
+
+
+    def shrink(self, budget):
+        return None
+
+
+class TopHostsPlugin(AnalyzerPlugin):
+    name = "tophosts"
+    keys = ("tophosts",)
+    fields = ("host",)
+
+
+    def __init__(self, analyzer):
+        super().__init__(analyzer)
+        self._counts = Counter()
+
+
+    def update(self, cdxrec):
+        self._counts[cdxrec.host] += 1
+
+
+    def add(self, host, count):
+        self._counts[host] += count
+
+
+    def report(self):
+        return {"tophosts": self._analyzer._top_hosts(self._counts.most_common(self._analyzer._maxhosts))}
+
+
+    def partial(self):
+        return {"tophosts": dict(self._counts)}
+
+
+    def merge(self, partial):
+        self._counts.update(partial["tophosts"])
+
+
+    def load(self, report):
+        self._counts = Counter(report["tophosts"])
+
+
+    def limit_hosts(self, hostlimit):
+        if not hostlimit or len(self._counts) <= hostlimit:
+            return None
+        ranked = self._counts.most_common()
+        self._counts = Counter(dict(ranked[:hostlimit]))
+        return {"dropped": len(ranked) - hostlimit, "error": ranked[hostlimit][1]}
+
+
+    def memory(self):
+        return len(self._counts) * HOSTBYTES
+
+
+    def shrink(self, budget):
+        keep = max(MINKEYS, budget // HOSTBYTES)
+        if len(self._counts) <= keep:
+            return None
+        ranked = self._counts.most_common()
+        self._counts = Counter(dict(ranked[:keep]))
+        return {"dropped": len(ranked) - keep, "error": ranked[keep][1]}
+
+
+class GridPlugin(AnalyzerPlugin):
+    def __init__(self, analyzer):
+        super().__init__(analyzer)
+        self._grid = defaultdict(lambda: defaultdict(int))
+
+
+    def add(self, key, count):
+        row, col = key
+        self._grid[row][col] += count
+
+
+    def report(self):
+        return {self.name: self._grid}
+
+
+    def partial(self):
+        return {self.name: {row: dict(cols) for row, cols in self._grid.items()}}
+
+
+    def merge(self, partial):
+        grid = self._grid
+        for row, cols in partial[self.name].items():
+            for col, count in cols.items():
+                grid[row][col] += count
+
+
+    def load(self, report):
+        self._grid = defaultdict(lambda: defaultdict(int))
+        self.merge(report)
+
+
+    def memory(self):
+        return len(self._grid) * ROWBYTES + sum(map(len, self._grid.values())) * CELLBYTES
+
+
+class MimeStatusPlugin(GridPlugin):
+    name = "mimestatus"
+    keys = ("mimestatus",)
+    fields = ("mime", "status")
+
+
+    def update(self, cdxrec):
+        self._grid[cdxrec.mime][cdxrec.status] += 1
+
+
+    def shrink(self, budget):
+        keep = max(MINKEYS, budget // ROWBYTES)
+        if len(self._grid) <= keep:
+            return None
+        ranked = sorted(self._grid.items(), key=lambda item: -sum(item[1].values()))
+        self._grid = defaultdict(lambda: defaultdict(int), ranked[:keep])
+        collapsed = captures = 0
+        for mime, cols in ranked[keep:]:
+            other = collapsed_mime(mime)
+            row = self._grid[other]
+            for col, count in cols.items():
+                row[col] += count
+            if other != mime:
+                collapsed += 1
+                captures += sum(cols.values())
+        return {"collapsed": collapsed, "captures": captures}
+
+
+class PathQueryPlugin(GridPlugin):
+    name = "pathquery"
+    keys = ("pathquery",)
+    fields = ("pathlen", "querylen")
+
+
+    def update(self, cdxrec):
+        self._grid[f"P{cdxrec.pathlen}"][f"Q{cdxrec.querylen}"] += 1
+
+
+class YearMonthPlugin(GridPlugin):
+    name = "yearmonth"
+    keys = ("yearmonth",)
+    fields = ("year", "month")
+
+
+    def update(self, cdxrec):
+        self._grid[cdxrec.year][cdxrec.month] += 1
+
+
+class SamplesPlugin(AnalyzerPlugin):
+    name = "samples"
+    keys = ("samples", "sampled")
+    fields = ("surt", "datetime", "url", "mime", "status")
+
+
+    @property
+    def update(self):
+        return self._analyzer._sampler
+
+
+    def report(self):
+        sampler = self._analyzer._sampler
+        return {"samples": list(sampler.samples()), "sampled": sampler.processed()}
+
+
+    def merge(self, partial):
+        samples = [(dt, url) for dt, url in partial.get("samples", [])]
+        self._analyzer._sampler.merge(samples, partial.get("sampled", len(samples)))
+
+
+    def load(self, report):
+        samples = [(dt, url) for dt, url in report.get("samples", [])]
+        self._analyzer._sampler.load(samples, report.get("sampled", len(samples)))
+
+
+class StrataPlugin(AnalyzerPlugin):
+    name = "strata"
+    keys = ("strata",)
+    fields = ("surt", "datetime", "url", "mime", "status", "host", "year")
+
+
+    def __init__(self, analyzer):
+        super().__init__(analyzer)
+        self._strata = {}
+        for kind in analyzer._stratakinds:
+            self.stratum(kind)
+
+
+    def _rules(self, kind):
+        if kind == "mime":
+            return lambda cdxrec: mime_group(cdxrec.mime), self._analyzer._ok_candidate
+        return attrgetter(kind), self._analyzer._sample_candidate
+
+
+    def stratum(self, kind):
+        if kind not in self._strata:
+            analyzer = self._analyzer
+            key, valid = self._rules(kind)
+            seed = None if analyzer._seed is None else f"{analyzer._seed}:{kind}"
+            self._strata[kind] = StratifiedSampler(key=key, size=analyzer._stratumsize, valid=valid, transform=analyzer._sample_parts, seed=seed)
+        return self._strata[kind]
+
+
+    def update(self, cdxrec):
+        for sampler in self._strata.values():
+            sampler(cdxrec)
+
+
+    def report(self):
+        if not self._strata:
+            return {}
+        strata = {kind: sampler.strata() for kind, sampler in self._strata.items()}
+        if "host" in strata:
+            strata["host"] = self._analyzer._top_hosts(strata["host"].items())
+        return {"strata": strata}
+
+
+    def partial(self):
+        return {"strata": {kind: sampler.strata() for kind, sampler in self._strata.items()}}
+
+
+    def merge(self, partial):
+        for kind, strata in partial["strata"].items():
+            self.stratum(kind).merge(strata)
+
+
+    def load(self, report):
+        for kind, strata in report["strata"].items():
+            self.stratum(kind).load(strata)
+
+
+    def memory(self):
+        return sum(map(len, self._strata.values())) * STRATUMBYTES
+
+
+    def shrink(self, budget):
+        if not self._strata:
+            return None
+        keep = max(MINKEYS, budget // STRATUMBYTES // len(self._strata))
+        dropped = sum(sampler.limit(keep) for sampler in self._strata.values())
+        return {"dropped": dropped} if dropped else None
+
+
+class DedupPlugin(AnalyzerPlugin):
+    name = "dedup"
+    keys = ("dedup",)
+    fields = ("digest", "bytes", "mime", "host")
+
+
+    def __init__(self, analyzer):
+        super().__init__(analyzer)
+        self._dedup = DedupAnalysis(analyzer._dedupbudget)
+
+
+    @property
+    def update(self):
+        return self._dedup
+
+
+    def report(self):
+        return {"dedup": self._dedup.report(self._analyzer._maxhosts, self._analyzer._host_name)}
+
+
+    def partial(self):
+        return {"dedup": self._dedup.partial()}
+
+
+    def merge(self, partial):
+        self._dedup.merge(partial["dedup"])
+
+
+    def load(self, report):
+        self._dedup = DedupAnalysis(self._analyzer._dedupbudget)
+        self._dedup.load(report["dedup"])
+
+
+    def limit_hosts(self, hostlimit):
+        return self._dedup.limit_hosts(hostlimit)
+
+
+    def memory(self):
+        return self._dedup.memory()
+
+
+class WARCsPlugin(AnalyzerPlugin):
+    name = "warcs"
+    keys = ("warcs",)
+    fields = ("warcfile", "bytes", "offset", "datetime", "mime")
+
+
+    def __init__(self, analyzer):
+        super().__init__(analyzer)
+        self._warcs = WARCStats()
+
+
+    @property
+    def update(self):
+        return self._warcs
+
+
+    def report(self):
+        return {"warcs": self._warcs.report()}
+
+
+    def merge(self, partial):
+        self._warcs.merge(partial["warcs"])
+
+
+    def load(self, report):
+        self._warcs = WARCStats()
+        self._warcs.merge(report["warcs"])
+
+
+    def memory(self):
+        return len(self._warcs) * WARCBYTES
+
+
+PLUGINS = {plugin.name: plugin for plugin in (TopHostsPlugin, MimeStatusPlugin, PathQueryPlugin, YearMonthPlugin, SamplesPlugin, StrataPlugin, DedupPlugin, WARCsPlugin)}
+DEFAULTS = ("tophosts", "mimestatus", "pathquery", "yearmonth", "samples")
+
+
+def installed_plugins():
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return {}
+    eps = entry_points()
+    eps = eps.select(group=ENTRYPOINTS) if hasattr(eps, "select") else eps.get(ENTRYPOINTS, [])
+    return {ep.name: ep for ep in eps}
+
+
+def plugin_class(spec):
+    if isinstance(spec, type):
+        plugin = spec
+    elif spec in PLUGINS:
+        return PLUGINS[spec]
+    else:
+        module, _, attr = spec.partition(":")
+        try:
+            if attr:
+                plugin = getattr(import_module(module), attr)
+            elif spec in installed_plugins():
+                plugin = installed_plugins()[spec].load()
+            else:
+                raise ValueError(f"Unknown analyzer plugin '{spec}', use one of {', '.join(PLUGINS)}, an installed '{ENTRYPOINTS}' entry point, or 'module:Class'")
+        except (ImportError, AttributeError) as e:
+            raise ValueError(f"Cannot load analyzer plugin '{spec}': {e}")
+    if not (isinstance(plugin, type) and issubclass(plugin, AnalyzerPlugin) and plugin.name):
+        raise ValueError(f"Analyzer plugin '{spec}' is not a named AnalyzerPlugin subclass")
+    unknown = set(plugin.fields) - set(FIELDS)
+    if unknown:
+        raise ValueError(f"Analyzer plugin '{plugin.name}' requires unknown CDX fields: {', '.join(sorted(unknown))}")
+    return plugin
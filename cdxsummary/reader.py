@@ -0,0 +1,71 @@
+import mmap
+import os
+
+
+class MappedCDXFile():
+    def __init__(self, path, start=0):
+        self._start = start
+        self._file = open(path, "rb")
+        self._size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self._size else None
+
+
+    def __len__(self):
+        return self._size
+
+
+    def split_points(self, parts, start=0, end=None):
+        end = self._size if end is None else end
+        if not self._map:
+            return [start, end]
+        offsets = [start]
+        for i in range(1, parts):
+            pos = max(start + (end - start) * i // parts, offsets[-1] + 1)
+            nl = self._map.find(b"\n", pos - 1, end)
+            if nl < 0 or nl + 1 >= end:
+                break
+            offsets.append(nl + 1)
+        return offsets + [end]
+
+
+    def ranges(self, parts, start=0, end=None):
+        offsets = self.split_points(parts, start=start, end=end)
+        return list(zip(offsets, offsets[1:]))
+
+
+    def line_at(self, pos):
+        if not self._map or pos >= self._size:
+            return None
+        start = 0 if pos == 0 else self._map.find(b"\n", pos - 1) + 1
+        if pos and not start or start >= self._size:
+            return None
+        end = self._map.find(b"\n", start)
+        return start, self._map[start:end if end >= 0 else self._size]
+
+
+    def lines(self, start=0, end=None):
+        if not self._map:
+            return
+        end = self._size if end is None else min(end, self._size)
+        self._map.seek(start)
+        readline = self._map.readline
+        if end == self._size:
+            yield from iter(readline, b"")
+            return
+        tell = self._map.tell
+        while tell() < end:
+            yield readline()
+
+
+    def read(self, size=-1):
+        return self._map.read(size) if self._map else b""
+
+
+    def __iter__(self):
+        return self.lines(start=self._start)
+
+
+    def close(self):
+        if self._map:
+            self._map.close()
+        self._file.close()
@@ -1,23 +1,63 @@
-from random import random
+import sys
+
+from itertools import islice
+from math import floor, log, log1p
+from random import Random
+
+
+def merge_samples(ours, mine, theirs, other, size, rng):
+    ours = list(ours)
+    theirs = list(theirs)
+    rng.shuffle(ours)
+    rng.shuffle(theirs)
+    merged = []
+    while len(merged) < size:
+        if ours and (not theirs or rng.random() * (mine + other) < mine):
+            merged.append(ours.pop())
+            mine -= 1
+        elif theirs:
+            merged.append(theirs.pop())
+            other -= 1
+        else:
+            break
+    return merged
 
 
 class BaseSampler():
-    def __init__(self, size=0, valid=lambda item: True, transform=lambda item: item):
+    def __init__(self, size=0, valid=lambda item: True, transform=lambda item: item, seed=None):
         self._size = size
         self._samples = [None] * size
         self._processed = 0
         self._valid = valid
         self._transform = transform
+        self._rng = Random(seed)
 
 
     def __call__(self, item):
         pass
 
 
+    def merge(self, samples, processed):
+        if not self._size:
+            return
+        merged = merge_samples(self.samples(), self._processed, samples, processed, self._size, self._rng)
+        self._samples = merged + [None] * (self._size - len(merged))
+        self._processed += processed
+
+
+    def load(self, samples, processed):
+        self._samples = list(samples)
+        self._processed = processed
+
+
     def samples(self):
         return filter(lambda sample: sample is not None, self._samples)
 
 
+    def processed(self):
+        return self._processed
+
+
     def __str__(self):
         return str(self.samples())
 
@@ -27,6 +67,164 @@ class DynamicRandomStreamSampler(BaseSampler):
         if not self._valid(item):
             return
         quotient, remainder = divmod(self._processed, self._size)
-        if random() < 1 / (quotient + 1):
+        if self._rng.random() < 1 / (quotient + 1):
             self._samples[remainder] = self._transform(item)
         self._processed += 1
+
+
+    def extend(self, items, load=lambda item: item):
+        for item in items:
+            quotient, remainder = divmod(self._processed, self._size)
+            if self._rng.random() < 1 / (quotient + 1):
+                self._samples[remainder] = self._transform(load(item))
+            self._processed += 1
+
+
+class Reservoir():
+    __slots__ = ("samples", "processed", "threshold", "skip")
+
+
+    def __init__(self, samples=(), processed=0):
+        self.samples = list(samples)
+        self.processed = max(processed, len(self.samples))
+        self.threshold = 1.0
+        self.skip = 0
+
+
+    def restart(self, size, rng):
+        if size and len(self.samples) >= size:
+            self.threshold = rng.betavariate(size, self.processed - size + 1)
+            self._advance(rng)
+
+
+    def _advance(self, rng):
+        step = log1p(-self.threshold)
+        self.skip = floor(log(1.0 - rng.random()) / step) if step else sys.maxsize
+
+
+    def offer(self, item, size, transform, rng):
+        self.processed += 1
+        if self.skip:
+            self.skip -= 1
+        elif len(self.samples) < size:
+            self.samples.append(transform(item))
+            self.restart(size, rng)
+        else:
+            self.samples[rng.randrange(size)] = transform(item)
+            self.threshold *= (1.0 - rng.random()) ** (1 / size)
+            self._advance(rng)
+
+
+    def merge(self, samples, processed, size, rng):
+        self.samples = merge_samples(self.samples, self.processed, samples, processed, size, rng)
+        self.processed += processed
+        self.restart(size, rng)
+
+
+class ReservoirSampler(BaseSampler):
+    def __init__(self, size=0, valid=lambda item: True, transform=lambda item: item, seed=None):
+        super().__init__(size=size, valid=valid, transform=transform, seed=seed)
+        self._reservoir = Reservoir()
+
+
+    def __call__(self, item):
+        if not self._valid(item):
+            return
+        reservoir = self._reservoir
+        if reservoir.skip:
+            reservoir.skip -= 1
+            reservoir.processed += 1
+            return
+        reservoir.offer(item, self._size, self._transform, self._rng)
+
+
+    def extend(self, items, load=lambda item: item):
+        reservoir = self._reservoir
+        transform = lambda item: self._transform(load(item))
+        items = iter(items)
+        while True:
+            if reservoir.skip:
+                skipped = 0
+                for skipped, _ in enumerate(islice(items, reservoir.skip), 1):
+                    pass
+                reservoir.processed += skipped
+                reservoir.skip -= skipped
+                if reservoir.skip:
+                    return
+            item = next(items, None)
+            if item is None:
+                return
+            reservoir.offer(item, self._size, transform, self._rng)
+
+
+    def merge(self, samples, processed):
+        self._reservoir.merge(samples, processed, self._size, self._rng)
+
+
+    def load(self, samples, processed):
+        self._reservoir = Reservoir(samples, processed)
+        self._reservoir.restart(self._size, self._rng)
+
+
+    def samples(self):
+        return iter(self._reservoir.samples)
+
+
+    def processed(self):
+        return self._reservoir.processed
+
+
+class StratifiedSampler():
+    def __init__(self, key=lambda item: None, size=1, valid=lambda item: True, transform=lambda item: item, seed=None):
+        self._key = key
+        self._size = size
+        self._valid = valid
+        self._transform = transform
+        self._rng = Random(seed)
+        self._strata = {}
+
+
+    def __call__(self, item):
+        if not self._valid(item):
+            return
+        key = self._key(item)
+        reservoir = self._strata.get(key)
+        if reservoir is None:
+            reservoir = self._strata[key] = Reservoir()
+        elif reservoir.skip:
+            reservoir.skip -= 1
+            reservoir.processed += 1
+            return
+        reservoir.offer(item, self._size, self._transform, self._rng)
+
+
+    def merge(self, strata):
+        for key, stratum in strata.items():
+            samples = [tuple(sample) for sample in stratum["samples"]]
+            reservoir = self._strata.get(key)
+            if reservoir is None:
+                reservoir = self._strata[key] = Reservoir(samples[:self._size], stratum["sampled"])
+                reservoir.restart(self._size, self._rng)
+            else:
+                reservoir.merge(samples, stratum["sampled"], self._size, self._rng)
+
+
+    def load(self, strata):
+        self._strata = {}
+        self.merge(strata)
+
+
+    def limit(self, keep):
+        if len(self._strata) <= keep:
+            return 0
+        ranked = sorted(self._strata.items(), key=lambda item: -item[1].processed)
+        self._strata = dict(ranked[:keep])
+        return len(ranked) - keep
+
+
+    def strata(self):
+        return {key: {"sampled": reservoir.processed, "samples": list(reservoir.samples)} for key, reservoir in sorted(self._strata.items())}
+
+
+    def __len__(self):
+        return len(self._strata)
@@ -0,0 +1,360 @@
+import argparse
+import asyncio
+import functools
+import itertools
+import json
+import os
+import re
+import signal
+import sys
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.managers import SyncManager
+from urllib.parse import parse_qs, parse_qsl, urlencode, urlsplit
+
+if not __package__:
+    sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from cdxsummary import __NAME, __VERSION
+from cdxsummary.__main__ import CDXAPI, PETABOX, get_stream_from_api, get_stream_from_file, get_stream_from_url
+from cdxsummary.console import errprint
+from cdxsummary.columnar import ENGINES
+from cdxsummary.parser import PARSERS
+from cdxsummary.summarizer import ReportSummarizer
+
+
+SOURCES = ("item", "url", "api", "file")
+PROGRESS = 1.0
+HEALTH = {"status": "ok", "name": __NAME, "version": __VERSION}
+SERVER = f"{__NAME}/{__VERSION}"
+REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed", 410: "Gone", 429: "Too Many Requests", 502: "Bad Gateway", 503: "Service Unavailable"}
+ITEMID = re.compile(r"^[A-Za-z0-9][\w.-]*$")
+LIMITS = {"samples": (0, None), "tophosts": (0, None), "precision": (0, 18)}
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def tracked_lines(jobid, stream, progress, interval=PROGRESS):
+    progress.put((jobid, 0))
+    lines = 0
+    last = time.monotonic()
+    for line in stream:
+        lines += 1
+        if not lines % 10000 and time.monotonic() - last >= interval:
+            last = time.monotonic()
+            progress.put((jobid, lines))
+        yield line
+    progress.put((jobid, lines))
+
+
+def open_source(kind, target, decoder="auto", concurrency=4):
+    if kind == "api":
+        return get_stream_from_api(target, concurrency=concurrency)
+    if kind == "file":
+        return get_stream_from_file([target], decoder=decoder)
+    return get_stream_from_url(target, decoder=decoder)
+
+
+def analyze_job(jobid, kind, target, progress, samplesize=0, maxhosts=None, parser="fast", precision=12, engine="record", decoder="auto", concurrency=4):
+    stream = open_source(kind, target, decoder=decoder, concurrency=concurrency)
+    analyzer = ENGINES[engine](samplesize=samplesize, maxhosts=maxhosts, parser=parser, precision=precision)
+    try:
+        analyzer(tracked_lines(jobid, stream, progress))
+    finally:
+        try:
+            stream.close()
+        except:
+            pass
+    return str(analyzer)
+
+
+class Job():
+    def __init__(self, jobid, key):
+        self.id = jobid
+        self.key = key
+        self.status = "queued"
+        self.lines = 0
+        self.listeners = set()
+        self.task = None
+        self.future = asyncio.get_event_loop().create_future()
+
+
+    def event(self):
+        return {"status": self.status, "lines": self.lines}
+
+
+    def notify(self):
+        for listener in self.listeners:
+            listener.put_nowait(self.event())
+
+
+class SummaryServer():
+    def __init__(self, workers=2, maxqueue=64, root=None, cdxapi=CDXAPI, petabox=PETABOX, samples=10, tophosts=10, parser="fast", precision=12, engine="record", decoder="auto", concurrency=4, allowurls=(), cors=None):
+        self._workers = max(1, workers)
+        self._maxqueue = maxqueue
+        self._root = os.path.realpath(root) if root else None
+        self._cdxapi = cdxapi
+        self._petabox = petabox.rstrip("/")
+        self._allowurls = [self._petabox, cdxapi.rstrip("/"), *(url.rstrip("/") for url in allowurls)]
+        self._cors = cors
+        self._defaults = {"samples": samples, "tophosts": tophosts, "precision": precision}
+        self._options = {"parser": parser, "engine": engine, "decoder": decoder, "concurrency": concurrency}
+        self._jobs = {}
+        self._byid = {}
+        self._ids = itertools.count(1)
+        self._stats = {"requests": 0, "analyses": 0, "coalesced": 0, "completed": 0, "failed": 0, "rejected": 0}
+        self._manager = None
+        self._queue = None
+        self._pool = None
+
+
+    def _resolve(self, params):
+        given = [kind for kind in SOURCES if params.get(kind)]
+        if len(given) != 1:
+            raise RequestError(400, f"Exactly one of {', '.join(SOURCES)} parameters is required")
+        kind = given[0]
+        target = params[kind]
+        if kind == "item":
+            if not ITEMID.match(target):
+                raise RequestError(400, f"Invalid item identifier: {target}")
+            return "url", f"{self._petabox}/{target}/{target}.cdx.gz"
+        if kind == "api":
+            query = [(key, value) for key, value in parse_qsl(params.get("query") or "matchType=exact") if key != "url"]
+            return "api", f"{self._cdxapi}?{urlencode([*query, ('url', target)])}"
+        if kind == "file":
+            if not self._root:
+                raise RequestError(403, "Local files are not served, start the server with --root DIR")
+            path = os.path.realpath(os.path.join(self._root, target))
+            if not path.startswith(self._root + os.sep):
+                raise RequestError(403, f"Outside of the served root: {target}")
+            if not os.path.isfile(path):
+                raise RequestError(404, f"No such file: {target}")
+            return "file", path
+        if not any(target == base or target.startswith(base + "/") for base in self._allowurls):
+            raise RequestError(403, f"URL is not under the Petabox, CDX API, or an --allow-url base: {target}")
+        return "url", target
+
+
+    def _number(self, params, name):
+        try:
+            value = int(params.get(name, self._defaults[name]))
+        except ValueError:
+            raise RequestError(400, f"Invalid integer for '{name}': {params[name]}")
+        low, high = LIMITS[name]
+        if value < low or high is not None and value > high or name == "precision" and 0 < value < 4:
+            raise RequestError(400, f"Out of range value for '{name}': {value}")
+        return value
+
+
+    def submit(self, kind, target, samplesize, maxhosts, precision):
+        key = (kind, target, samplesize, maxhosts, precision)
+        job = self._jobs.get(key)
+        if job:
+            self._stats["coalesced"] += 1
+            return job, True
+        if len(self._jobs) >= self._maxqueue:
+            self._stats["rejected"] += 1
+            raise RequestError(503, f"Too many pending analyses ({self._maxqueue})")
+        job = Job(next(self._ids), key)
+        self._jobs[key] = job
+        self._byid[job.id] = job
+        self._stats["analyses"] += 1
+        errprint(f"Analyzing [cyan]#{job.id}[/cyan] {kind}: [magenta]{target}[/magenta]")
+        loop = asyncio.get_event_loop()
+        job.task = loop.run_in_executor(self._pool, functools.partial(analyze_job, job.id, kind, target, self._queue, samplesize=samplesize, maxhosts=maxhosts, precision=precision, **self._options))
+        job.task.add_done_callback(lambda fut: self._finish(job, fut))
+        return job, False
+
+
+    def _finish(self, job, fut):
+        self._jobs.pop(job.key, None)
+        self._byid.pop(job.id, None)
+        if fut.cancelled():
+            job.status = "cancelled"
+            job.future.cancel()
+        elif fut.exception():
+            job.status = "failed"
+            self._stats["failed"] += 1
+            errprint(f"Failed [cyan]#{job.id}[/cyan]: {fut.exception()}")
+            status = getattr(fut.exception(), "status", None)
+            job.future.set_exception(RequestError(status if status and 400 <= status < 500 else 502, str(fut.exception())))
+        else:
+            job.status = "done"
+            self._stats["completed"] += 1
+            job.future.set_result(json.loads(fut.result()))
+        job.notify()
+
+
+    async def _drain(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            item = await loop.run_in_executor(None, self._queue.get)
+            if item is None:
+                break
+            job = self._byid.get(item[0])
+            if job and not job.future.done():
+                job.status = "running"
+                job.lines = item[1]
+                job.notify()
+
+
+    def stats(self):
+        statuses = [job.status for job in self._jobs.values()]
+        return {
+            **self._stats,
+            "queued": statuses.count("queued"),
+            "running": statuses.count("running"),
+            "workers": self._workers
+        }
+
+
+    def _output(self, route, report):
+        if route == "/report":
+            return report
+        return ReportSummarizer(report)()
+
+
+    async def _respond(self, writer, status, body, ctype="application/json"):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        writer.write(self._head(status, ctype, [f"Content-Length: {len(data)}"]) + data)
+        await writer.drain()
+
+
+    def _head(self, status, ctype, extra=[]):
+        cors = [f"Access-Control-Allow-Origin: {self._cors}", "Vary: Origin"] if self._cors else []
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {ctype}", *cors, "Cache-Control: no-store", "Connection: close", f"Server: {SERVER}", *extra]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+
+    async def _chunk(self, writer, event):
+        data = json.dumps(event).encode() + b"\n"
+        writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        await writer.drain()
+
+
+    async def _stream(self, writer, route, job, coalesced):
+        listener = asyncio.Queue()
+        job.listeners.add(listener)
+        writer.write(self._head(200, "application/x-ndjson", ["Transfer-Encoding: chunked"]))
+        try:
+            await self._chunk(writer, {"job": job.id, "coalesced": coalesced, **job.event()})
+            while not job.future.done():
+                event = await listener.get()
+                if event["status"] == "running":
+                    await self._chunk(writer, event)
+            try:
+                await self._chunk(writer, {"status": "done", "lines": job.lines, route.strip("/"): self._output(route, job.future.result())})
+            except RequestError as e:
+                await self._chunk(writer, {"status": "failed", "error": str(e)})
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            job.listeners.discard(listener)
+
+
+    async def _analyze(self, writer, route, params):
+        kind, target = self._resolve(params)
+        maxhosts = None if route == "/report" else self._number(params, "tophosts")
+        samplesize = self._number(params, "samples")
+        precision = self._number(params, "precision")
+        job, coalesced = self.submit(kind, target, samplesize, maxhosts, precision)
+        if params.get("progress") not in (None, "", "0", "false"):
+            return await self._stream(writer, route, job, coalesced)
+        report = await asyncio.shield(job.future)
+        await self._respond(writer, 200, self._output(route, report))
+
+
+    async def handle(self, reader, writer):
+        try:
+            try:
+                method, target, _ = (await reader.readline()).decode("latin-1").split(" ", 2)
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+            except ValueError:
+                raise RequestError(400, "Malformed request")
+            self._stats["requests"] += 1
+            if method != "GET":
+                raise RequestError(405, f"Unsupported method: {method}")
+            url = urlsplit(target)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            if url.path == "/health":
+                await self._respond(writer, 200, HEALTH)
+            elif url.path == "/stats":
+                await self._respond(writer, 200, self.stats())
+            elif url.path in ("/summary", "/report"):
+                await self._analyze(writer, url.path, params)
+            else:
+                raise RequestError(404, f"Unknown endpoint: {url.path}")
+        except RequestError as e:
+            await self._respond(writer, e.status, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        self._manager = SyncManager()
+        self._manager.start(signal.signal, (signal.SIGINT, signal.SIG_IGN))
+        self._queue = self._manager.Queue()
+        self._pool = ProcessPoolExecutor(max_workers=self._workers)
+        drain = asyncio.ensure_future(self._drain())
+        server = await asyncio.start_server(self.handle, host, port)
+        errprint(f"Serving summaries with [cyan]{self._workers}[/cyan] workers: [magenta]http://{host}:{port}/[/magenta]")
+        try:
+            await server.wait_closed()
+        finally:
+            server.close()
+            for job in list(self._jobs.values()):
+                job.task.cancel()
+            self._queue.put(None)
+            await drain
+            self._pool.shutdown()
+            self._manager.shutdown()
+
+
+def argument_parser():
+    ap = argparse.ArgumentParser(prog=f"{__NAME} serve", description="Serve CDX summaries of Petabox items, CDX URLs, CDX API queries, or local files over HTTP.")
+    ap.add_argument("-b", "--bind", default="127.0.0.1", metavar="HOST", help="Address to listen on (default: 127.0.0.1)")
+    ap.add_argument("-c", "--concurrency", type=int, default=4, metavar="N", help="Number of CDX API pages to download concurrently per analysis (default: 4)")
+    ap.add_argument("-d", "--decoder", choices=["auto", "builtin", "external"], default="auto", help="Decompression method for compressed inputs (default: 'auto')")
+    ap.add_argument("-e", "--engine", choices=ENGINES, default="record", help="Analysis engine (default: 'record')")
+    ap.add_argument("-n", "--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    ap.add_argument("-P", "--precision", type=int, default=12, metavar="P", help="Default HyperLogLog precision, 0 to disable (default: 12)")
+    ap.add_argument("-p", "--parser", choices=PARSERS, default="fast", help="CDX line parser engine (default: 'fast')")
+    ap.add_argument("-q", "--max-queue", type=int, default=64, metavar="N", help="Maximum number of distinct pending analyses before rejecting requests (default: 64)")
+    ap.add_argument("-r", "--root", metavar="DIR", help="Serve local CDX files under the given directory via the 'file' parameter (default: disabled)")
+    ap.add_argument("-s", "--samples", type=int, default=10, metavar="N", help="Default number of sample memento URLs (default: 10)")
+    ap.add_argument("-t", "--tophosts", type=int, default=10, metavar="N", help="Default number of top hosts (default: 10)")
+    ap.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, metavar="N", help="Number of worker processes bounding concurrent analyses (default: CPU count)")
+    ap.add_argument("-A", "--cdx-api", default=CDXAPI, metavar="URL", help=f"CDX API endpoint for 'api' requests (default: '{CDXAPI}')")
+    ap.add_argument("-B", "--petabox", default=PETABOX, metavar="URL", help=f"Download base URL for 'item' requests (default: '{PETABOX}')")
+    ap.add_argument("--allow-url", action="append", default=[], metavar="URL", help="Also allow 'url' requests for remote CDX files under the given base URL, which can be repeated (default: only under --petabox and --cdx-api)")
+    ap.add_argument("--cors", metavar="ORIGIN", help="Allow cross-origin requests from the given origin, or '*' for any (default: disabled)")
+    return ap
+
+
+def main(argv=None):
+    args = argument_parser().parse_args(argv)
+    server = SummaryServer(workers=args.workers, maxqueue=args.max_queue, root=args.root, cdxapi=args.cdx_api, petabox=args.petabox, samples=args.samples, tophosts=args.tophosts, parser=args.parser, precision=args.precision, engine=args.engine, decoder=args.decoder, concurrency=args.concurrency, allowurls=args.allow_url, cors=args.cors)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    task = loop.create_task(server.serve(host=args.bind, port=args.port))
+    try:
+        loop.run_until_complete(task)
+    except KeyboardInterrupt:
+        task.cancel()
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+    finally:
+        loop.close()
+
+
+if __name__ == "__main__":
+    main()
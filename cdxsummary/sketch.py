@@ -0,0 +1,81 @@
+from base64 import b64decode, b64encode
+from hashlib import blake2b
+from math import log
+from zlib import compress, decompress
+
+
+class HyperLogLog():
+    def _alpha(self, m):
+        if m <= 16:
+            return 0.673
+        if m <= 32:
+            return 0.697
+        if m <= 64:
+            return 0.709
+        return 0.7213 / (1 + 1.079 / m)
+
+
+    def __init__(self, precision=12, registers=None):
+        if not 4 <= precision <= 18:
+            raise ValueError(f"HyperLogLog precision must be between 4 and 18: {precision}")
+        self._precision = precision
+        self._size = 1 << precision
+        self._width = 64 - precision
+        self._mask = (1 << self._width) - 1
+        self._registers = bytearray(registers) if registers else bytearray(self._size)
+
+
+    def add(self, value):
+        x = int.from_bytes(blake2b(value, digest_size=8).digest(), "big")
+        i = x >> self._width
+        rank = self._width - (x & self._mask).bit_length() + 1
+        if rank > self._registers[i]:
+            self._registers[i] = rank
+
+
+    def fold(self, precision):
+        if precision >= self._precision:
+            return self
+        shift = self._precision - precision
+        lowbits = (1 << shift) - 1
+        folded = bytearray(1 << precision)
+        for j, rank in enumerate(self._registers):
+            if not rank:
+                continue
+            bits = j & lowbits
+            rank = shift - bits.bit_length() + 1 if bits else shift + rank
+            if rank > folded[j >> shift]:
+                folded[j >> shift] = rank
+        return HyperLogLog(precision, folded)
+
+
+    def merge(self, other):
+        if other._precision < self._precision:
+            folded = self.fold(other._precision)
+            self.__init__(folded._precision, folded._registers)
+        other = other.fold(self._precision)
+        self._registers = bytearray(map(max, self._registers, other._registers))
+        return self
+
+
+    def __len__(self):
+        m = self._size
+        estimate = self._alpha(m) * m * m / sum(2.0 ** -r for r in self._registers)
+        zeros = self._registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * log(m / zeros)
+        return round(estimate)
+
+
+    def dumps(self):
+        return f"{self._precision}:{b64encode(compress(bytes(self._registers))).decode()}"
+
+
+    @classmethod
+    def loads(cls, data):
+        precision, _, registers = data.partition(":")
+        return cls(int(precision), decompress(b64decode(registers)))
+
+
+    def __str__(self):
+        return str(len(self))
@@ -1,13 +1,17 @@
+import os
 import sys
 
 from datetime import datetime
-from humanize import intcomma, naturalsize, naturaldate
+from functools import lru_cache
 from json import dumps
 from os import getenv
 from random import random
-from rich.console import Console
-from rich.json import JSON
-from rich.table import Table, box
+
+if not __package__:
+    sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from cdxsummary.console import print_json
+from cdxsummary.mimes import MIMEMAP, mime_group
 
 
 class ReportSummarizer():
@@ -15,44 +19,21 @@ class ReportSummarizer():
     QSEGMENTS = [f"Q{i}" for i in range(5)] + ["Other"]
     MONTHS = [f"{i:02}" for i in range(1, 13)]
     CODEGROUPS = ["2XX", "3XX", "4XX", "5XX", "Other"]
+    STRATALABELS = {"host": "Top Host", "year": "Year", "mime": "MIME Type"}
+
+    MIMEMAP = MIMEMAP
+    _mime_group = staticmethod(mime_group)
 
-    MIMEMAP = {
-        "html": "HTML",
-        "image": "Image",
-        "css": "CSS",
-        "javascript": "JavaScript",
-        "json": "JSON",
-        "xml": "XML",
-        "plain": "Text",
-        "pdf": "PDF",
-        "font": "Font",
-        "audio": "Audio",
-        "video": "Video",
-        "revisit": "Revisit",
-        "other": "Other"
-    }
-
-
-    def _mime_group(self, mime):
-        group, _, subtype = mime.lower().partition("/")
-        for part in [subtype, group]:
-            try:
-                return self.MIMEMAP[part]
-            except KeyError:
-                pass
-        if subtype.startswith("xhtml"):
-            return "HTML"
-        if subtype.endswith("+xml") or subtype.startswith("xml-"):
-            return "XML"
-        return "Other"
-
-
-    def _valid_status(self, code):
+
+    @staticmethod
+    def _valid_status(code):
         return code >= "200" and code < "600"
 
 
-    def _status_group(self, code):
-        return f"{code[0]}XX" if self._valid_status(code) else "Other"
+    @classmethod
+    @lru_cache(maxsize=1024)
+    def _status_group(cls, code):
+        return f"{code[0]}XX" if cls._valid_status(code) else "Other"
 
 
     def _path_query_grid(self, pq):
@@ -76,23 +57,48 @@ class ReportSummarizer():
 
     def _mime_status_grid(self, ms):
         grid = {mime: {code: 0 for code in self.CODEGROUPS} for mime in self.MIMEMAP.values()}
+        mime_group = self._mime_group
+        status_group = self._status_group
         for mime, codes in ms.items():
-            mg = self._mime_group(mime)
+            row = grid[mime_group(mime)]
             for code, count in codes.items():
-                sg = self._status_group(code)
-                grid[mg][sg] += count
+                row[status_group(code)] += count
         return grid
 
 
+    def _strata(self, strata, tophosts):
+        if "host" in strata and tophosts is not None:
+            strata = {**strata, "host": {host: strata["host"][host] for host in tophosts if host in strata["host"]}}
+        return strata
+
+
+    def _dedup(self, dedup):
+        mimes = {}
+        for mime, counts in dedup["mimes"].items():
+            group = mimes.setdefault(self._mime_group(mime), {"captures": 0, "bytes": 0})
+            group["captures"] += counts["captures"]
+            group["bytes"] += counts["bytes"]
+        return {**dedup, "mimes": dict(sorted(mimes.items(), key=lambda item: -item[1]["bytes"]))}
+
+
     def _non_zero_grid_rows(self, grid):
-        return sum([bool(sum(v.values())) for v in grid.values()])
+        return sum(bool(sum(v.values())) for v in grid.values())
 
 
-    def _fit_table_width(self, table):
-        return sum([max([len(cell) for cell in list(col.cells) + [col.header, col.footer]]) for col in table.columns]) + len(table.columns) + 1
+    def _add_rows(self, table, rows):
+        widths = [max(len(col.header), len(col.footer)) for col in table.columns]
+        for row in rows:
+            table.add_row(*row)
+            for i, cell in enumerate(row):
+                if len(cell) > widths[i]:
+                    widths[i] = len(cell)
+        for col, width in zip(table.columns, widths):
+            col.width = width
+        table.width = sum(widths) + len(widths) + 1
 
 
     def _natural_date(self, dt):
+        from humanize import naturaldate
         try:
             return naturaldate(datetime.strptime(dt, "%Y%m%d%H%M%S"))
         except ValueError:
@@ -102,13 +108,26 @@ class ReportSummarizer():
     def __init__(self, report, outfile=sys.stdout):
         self._report = report
         self._replayurl = getenv("REPLAYURL", "https://web.archive.org/web")
-        self._print = Console(file=outfile, soft_wrap=True).print
+        self._outfile = outfile
+        self._console = None
+        grids = (("pathquery", self._path_query_grid), ("yearmonth", self._year_month_grid), ("mimestatus", self._mime_status_grid))
         self._summary = {
-            **report,
-            "pathquery": self._path_query_grid(report["pathquery"]),
-            "yearmonth": self._year_month_grid(report["yearmonth"]),
-            "mimestatus": self._mime_status_grid(report["mimestatus"])
+            **{key: value for key, value in report.items() if key not in ("sketches", "warcs")},
+            **{key: grid(report[key]) for key, grid in grids if key in report}
         }
+        if "warcs" in report:
+            self._summary["warcfiles"] = len(report["warcs"])
+        if "dedup" in report:
+            self._summary["dedup"] = self._dedup(report["dedup"])
+        if "strata" in report:
+            self._summary["strata"] = self._strata(report["strata"], report.get("tophosts"))
+
+
+    def _print(self, *args, **kwargs):
+        if not self._console:
+            from rich.console import Console
+            self._console = Console(file=self._outfile, soft_wrap=True)
+        self._console.print(*args, **kwargs)
 
 
     def __call__(self):
@@ -120,80 +139,136 @@ class ReportSummarizer():
 
 
     def print_overview(self):
+        from humanize import intcomma, naturalsize
+        from rich.table import Table, box
         table = Table(title="CDX Overview", box=box.HORIZONTALS, show_header=False, padding=(0, 0))
         table.add_column(style="bold cyan")
         table.add_column(style="bold magenta", justify="right")
-        table.add_row("Total Captures in CDX", intcomma(self._summary["captures"]))
-        table.add_row("Consecutive Unique URLs", intcomma(self._summary["urls"]))
-        table.add_row("Consecutive Unique Hosts", intcomma(self._summary["hosts"]))
-        table.add_row("Total WARC Records Size", naturalsize(self._summary["bytes"]))
-        table.add_row("First Memento Date", self._natural_date(self._summary["first"]))
-        table.add_row("Last Memento Date", self._natural_date(self._summary["last"]))
-        table.width = self._fit_table_width(table)
+        rows = [
+            ("Total Captures in CDX", intcomma(self._summary["captures"])),
+            ("Consecutive Unique URLs", intcomma(self._summary["urls"])),
+            ("Consecutive Unique Hosts", intcomma(self._summary["hosts"]))
+        ]
+        distinct = {key: min(count, self._summary["captures"]) for key, count in self._summary.get("distinct", {}).items()}
+        if "urls" in distinct:
+            rows.append(("Distinct URLs (Estimated)", intcomma(distinct["urls"])))
+        if "hosts" in distinct:
+            rows.append(("Distinct Hosts (Estimated)", intcomma(distinct["hosts"])))
+        if "digests" in distinct:
+            rows.append(("Distinct Payload Digests (Estimated)", intcomma(distinct["digests"])))
+        rows.append(("Total WARC Records Size", naturalsize(self._summary["bytes"])))
+        if "warcfiles" in self._summary:
+            rows.append(("WARC Files", intcomma(self._summary["warcfiles"])))
+        rows.append(("First Memento Date", self._natural_date(self._summary["first"])))
+        rows.append(("Last Memento Date", self._natural_date(self._summary["last"])))
+        self._add_rows(table, rows)
         self._print(table)
 
 
     def print_mimestatus_grid(self):
-        mimestatus = self._summary["mimestatus"]
+        from humanize import intcomma
+        from rich.table import Table, box
+        mimestatus = self._summary.get("mimestatus")
+        if mimestatus is None:
+            return
         manyrows = self._non_zero_grid_rows(mimestatus) > 1
         table = Table(title="MIME Type and Status Code Distribution", box=box.HORIZONTALS, show_header=True, show_footer=manyrows, header_style="bold magenta", footer_style="bold magenta", padding=(0, 0))
         table.add_column("MIME", "TOTAL", style="bold cyan")
         for code in self.CODEGROUPS:
-            table.add_column(code, intcomma(sum([codes[code] for codes in mimestatus.values()])), justify="right")
+            table.add_column(code, intcomma(sum(codes[code] for codes in mimestatus.values())), justify="right")
         table.add_column("TOTAL", intcomma(self._summary["captures"]), style="bold cyan", justify="right")
-        for mime, codes in mimestatus.items():
-            row_total = sum(codes.values())
-            if row_total:
-                table.add_row(mime, *map(intcomma, codes.values()), intcomma(row_total))
-        table.width = self._fit_table_width(table)
+        self._add_rows(table, ((mime, *map(intcomma, codes.values()), intcomma(sum(codes.values()))) for mime, codes in mimestatus.items() if any(codes.values())))
         self._print(table)
 
 
     def print_pathquery_grid(self):
-        pathquery = self._summary["pathquery"]
+        from humanize import intcomma
+        from rich.table import Table, box
+        pathquery = self._summary.get("pathquery")
+        if pathquery is None:
+            return
         manyrows = self._non_zero_grid_rows(pathquery) > 1
         table = Table(title="Path and Query Segments", box=box.HORIZONTALS, show_header=True, show_footer=manyrows, header_style="bold magenta", footer_style="bold magenta", padding=(0, 0))
         table.add_column("Path", "TOTAL", style="bold cyan")
         for query in self.QSEGMENTS:
-            table.add_column(query, intcomma(sum([queries[query] for queries in pathquery.values()])), justify="right")
+            table.add_column(query, intcomma(sum(queries[query] for queries in pathquery.values())), justify="right")
         table.add_column("TOTAL", intcomma(self._summary["captures"]), style="bold cyan", justify="right")
-        for path, queries in pathquery.items():
-            row_total = sum(queries.values())
-            if row_total:
-                table.add_row(path, *map(intcomma, queries.values()), intcomma(row_total))
-        table.width = self._fit_table_width(table)
+        self._add_rows(table, ((path, *map(intcomma, queries.values()), intcomma(sum(queries.values()))) for path, queries in pathquery.items() if any(queries.values())))
         self._print(table)
 
 
     def print_yearmonth_grid(self):
-        yearmonth = self._summary["yearmonth"]
+        from humanize import intcomma
+        from rich.table import Table, box
+        yearmonth = self._summary.get("yearmonth")
+        if yearmonth is None:
+            return
         manyrows = self._non_zero_grid_rows(yearmonth) > 1
         table = Table(title="Year and Month Distribution", box=box.HORIZONTALS, show_header=True, show_footer=manyrows, header_style="bold magenta", footer_style="bold magenta", padding=(0, 0))
         table.add_column("Year", "TOTAL", style="bold cyan")
         for month in self.MONTHS:
-            table.add_column(month, intcomma(sum([months[month] for months in yearmonth.values()])), justify="right")
+            table.add_column(month, intcomma(sum(months[month] for months in yearmonth.values())), justify="right")
         table.add_column("TOTAL", intcomma(self._summary["captures"]), style="bold cyan", justify="right")
-        for year, months in yearmonth.items():
-            row_total = sum(months.values())
-            if row_total:
-                table.add_row(year, *map(intcomma, months.values()), intcomma(row_total))
-        table.width = self._fit_table_width(table)
+        self._add_rows(table, ((year, *map(intcomma, months.values()), intcomma(sum(months.values()))) for year, months in yearmonth.items() if any(months.values())))
         self._print(table)
 
 
     def print_tophosts(self):
-        tophosts = self._summary["tophosts"]
+        from humanize import intcomma
+        from rich.table import Table, box
+        tophosts = self._summary.get("tophosts")
+        if tophosts is None:
+            return
         others = self._summary["hosts"] - len(tophosts)
-        table = Table(title=f"Top {len(tophosts)} Out of {intcomma(self._summary['hosts'])} Hosts", box=box.HORIZONTALS, show_header=True, show_footer=(others > 0), header_style="bold magenta", footer_style="bold magenta", padding=(0, 0))
+        pruned = self._summary.get("approximated", {}).get("tophosts")
+        caption = f"Host counts pruned to fit the memory budget or host limit, each may be undercounted by up to {intcomma(pruned['error'])} captures" if pruned else None
+        table = Table(title=f"Top {len(tophosts)} Out of {intcomma(self._summary['hosts'])} Hosts", caption=caption, box=box.HORIZONTALS, show_header=True, show_footer=(others > 0), header_style="bold magenta", footer_style="bold magenta", padding=(0, 0))
         table.add_column("Host", f"OTHERS ({intcomma(others)} Hosts)", style="bold cyan")
         table.add_column("Captures", intcomma(self._summary["captures"] - sum(tophosts.values())), justify="right")
-        for host, count in tophosts.items():
-            table.add_row(host, intcomma(count))
-        table.width = self._fit_table_width(table)
+        self._add_rows(table, ((host, intcomma(count)) for host, count in tophosts.items()))
+        self._print(table)
+
+
+    def print_dedup(self):
+        from humanize import intcomma, naturalsize
+        from rich.table import Table, box
+        dedup = self._summary.get("dedup")
+        if not dedup:
+            return
+        notes = []
+        if dedup["filter"]["type"] == "bloom":
+            notes.append(f"Bloom filter of {naturalsize(dedup['filter']['memory'], binary=True)}, estimated false positive rate {dedup['filter']['error']:.4%}")
+        if dedup.get("estimated"):
+            notes.append(f"{intcomma(dedup['estimated']['captures'])} duplicates found across parallel shards with an estimated {naturalsize(dedup['estimated']['bytes'])}, not included in the MIME type and host rows")
+        if dedup["filter"]["merged"]:
+            notes.append(f"Duplicates across {intcomma(dedup['filter']['merged'])} merged reports are not detected")
+        table = Table(title="Payload Deduplication", caption="\n".join(notes) or None, box=box.HORIZONTALS, show_header=True, header_style="bold magenta", padding=(0, 0))
+        table.add_column("Records", style="bold cyan")
+        table.add_column("Captures", justify="right")
+        table.add_column("Size", justify="right")
+        revisits = dedup["revisit"]["captures"]
+        self._add_rows(table, [
+            ("Unique Payloads", intcomma(dedup["unique"]["captures"]), naturalsize(dedup["unique"]["bytes"])),
+            ("Duplicate Payloads", intcomma(dedup["duplicate"]["captures"]), naturalsize(dedup["duplicate"]["bytes"])),
+            ("Revisit Records", intcomma(revisits), naturalsize(dedup["revisit"]["bytes"])),
+            ("Revisits of Payloads in CDX", intcomma(dedup["resolved"]), ""),
+            ("Revisits of Other Payloads", intcomma(revisits - dedup["resolved"]), "")
+        ])
         self._print(table)
+        for title, label, rows in (("Duplicate Payloads per MIME Type", "MIME", dedup["mimes"]), (f"Top {len(dedup['hosts'])} Hosts by Duplicate Bytes", "Host", dedup["hosts"])):
+            if not rows:
+                continue
+            print("")
+            table = Table(title=title, box=box.HORIZONTALS, show_header=True, header_style="bold magenta", padding=(0, 0))
+            table.add_column(label, style="bold cyan")
+            table.add_column("Captures", justify="right")
+            table.add_column("Size", justify="right")
+            self._add_rows(table, ((key, intcomma(counts["captures"]), naturalsize(counts["bytes"])) for key, counts in rows.items()))
+            self._print(table)
 
 
     def print_samples(self):
+        from humanize import intcomma
         samples = self._summary.get("samples", [])
         if not samples:
             return
@@ -203,21 +278,32 @@ class ReportSummarizer():
             self._print(f" * [dim]{self._replayurl}[/dim]/[cyan]{dt}[/cyan]/[magenta]{url}[/magenta]", soft_wrap=True, highlight=False)
 
 
+    def print_strata(self):
+        from humanize import intcomma
+        for kind, strata in self._summary.get("strata", {}).items():
+            if not strata:
+                continue
+            self._print(f"Stratified Sample of Mementos per {self.STRATALABELS.get(kind, kind)}", width=50, justify="center", style="italic", highlight=False)
+            self._print(f" {'─' * 48}")
+            for key, stratum in strata.items():
+                self._print(f" [bold cyan]{key}[/bold cyan] [dim]({intcomma(len(stratum['samples']))} of {intcomma(stratum['sampled'])})[/dim]", soft_wrap=True, highlight=False)
+                for dt, url in stratum["samples"]:
+                    self._print(f"   * [dim]{self._replayurl}[/dim]/[cyan]{dt}[/cyan]/[magenta]{url}[/magenta]", soft_wrap=True, highlight=False)
+            print("")
+
+
     def print_summary(self):
         print("")
         self.print_overview()
         print("")
-        self.print_mimestatus_grid()
-        print("")
-        self.print_pathquery_grid()
-        print("")
-        self.print_yearmonth_grid()
-        print("")
-        self.print_tophosts()
-        print("")
+        for key, printer in (("mimestatus", self.print_mimestatus_grid), ("pathquery", self.print_pathquery_grid), ("yearmonth", self.print_yearmonth_grid), ("tophosts", self.print_tophosts), ("dedup", self.print_dedup)):
+            if key in self._summary:
+                printer()
+                print("")
         self.print_samples()
         print("")
+        self.print_strata()
 
 
-    def print_summary_json(self):
-        self._print(JSON.from_data(self._summary), soft_wrap=True)
+    def print_summary_json(self, raw=False):
+        print_json(self._summary, outfile=self._outfile, raw=raw)
@@ -0,0 +1,88 @@
+import csv
+import os
+import sys
+
+if not __package__:
+    sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from cdxsummary.console import write_json
+from cdxsummary.mimes import MIMEMAP, mime_group
+
+
+COLUMNS = ("warc", "captures", "bytes", "start", "end", "first", "last")
+
+
+class WARCStats():
+    def __init__(self):
+        self._files = {}
+
+
+    def __call__(self, cdxrec):
+        warc = cdxrec.warcfile
+        if not warc or warc == "-":
+            return
+        dt = cdxrec.datetime
+        stats = self._files.get(warc)
+        if stats is None:
+            stats = self._files[warc] = [0, 0, None, 0, dt, dt, {}]
+        size = cdxrec.bytes
+        size = int(size) if size.isdigit() else 0
+        stats[0] += 1
+        stats[1] += size
+        offset = cdxrec.offset
+        if offset.isdigit():
+            offset = int(offset)
+            if stats[2] is None or offset < stats[2]:
+                stats[2] = offset
+            if offset + size > stats[3]:
+                stats[3] = offset + size
+        if dt < stats[4]:
+            stats[4] = dt
+        elif dt > stats[5]:
+            stats[5] = dt
+        mimes = stats[6]
+        group = mime_group(cdxrec.mime)
+        mimes[group] = mimes.get(group, 0) + 1
+
+
+    def merge(self, warcs):
+        for warc, other in warcs.items():
+            stats = self._files.get(warc)
+            if stats is None:
+                self._files[warc] = [other["captures"], other["bytes"], other["start"], other["end"], other["first"], other["last"], dict(other["mimes"])]
+                continue
+            stats[0] += other["captures"]
+            stats[1] += other["bytes"]
+            if other["start"] is not None and (stats[2] is None or other["start"] < stats[2]):
+                stats[2] = other["start"]
+            stats[3] = max(stats[3], other["end"])
+            stats[4] = min(stats[4], other["first"])
+            stats[5] = max(stats[5], other["last"])
+            for group, count in other["mimes"].items():
+                stats[6][group] = stats[6].get(group, 0) + count
+
+
+    def report(self):
+        return {warc: {**dict(zip(COLUMNS[1:], stats)), "mimes": dict(sorted(stats[6].items(), key=lambda item: (-item[1], item[0])))} for warc, stats in sorted(self._files.items())}
+
+
+    def __len__(self):
+        return len(self._files)
+
+
+def write_csv(warcs, outfile):
+    groups = list(MIMEMAP.values())
+    writer = csv.writer(outfile, lineterminator="\n")
+    writer.writerow([*COLUMNS, *groups])
+    for warc, stats in warcs.items():
+        writer.writerow([warc, *(stats[column] for column in COLUMNS[1:]), *(stats["mimes"].get(group, 0) for group in groups)])
+
+
+def write_table(warcs, path):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", newline="") as f:
+        if path.endswith(".csv"):
+            write_csv(warcs, f)
+        else:
+            write_json(warcs, f)
+    os.replace(tmp, path)
@@ -33,6 +33,10 @@ setuptools.setup(
         "requests",
         "rich"
     ],
+    extras_require={
+        "columnar": ["numpy"],
+        "test": ["pytest", "numpy"]
+    },
     zip_safe=True,
     entry_points={
         "console_scripts": [
@@ -0,0 +1,62 @@
+import gzip
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+
+MIMES = ("text/html", "image/jpeg", "application/pdf", "text/css", "warc/revisit", "unk")
+STATUSES = ("200", "200", "200", "301", "302", "404", "-")
+INVALID = (b"not a cdx line\n", b"\n", b"com,broken) 2020 x\n")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def generate_lines(count=3000, hosts=40, seed=7):
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(count):
+        host = f"h{rng.randrange(hosts)}"
+        path = "/".join(rng.choice(("a", "bb", "ccc")) for _ in range(rng.randrange(4)))
+        query = "&".join(f"k{i}=v" for i in range(rng.randrange(3)))
+        surt = f"com,{host})/{path}" + (f"?{query}" if query else "")
+        url = f"http://{host}.com/{path}" + (f"?{query}" if query else "")
+        ts = f"{rng.randrange(1996, 2024)}{rng.randrange(1, 13):02}{rng.randrange(1, 29):02}{rng.randrange(24):02}{rng.randrange(60):02}{rng.randrange(60):02}"
+        length = str(rng.randrange(200, 90000)) if rng.random() > 0.02 else "-"
+        digest = f"D{rng.randrange(count // 3):07}"
+        lines.append(f"{surt} {ts} {url} {rng.choice(MIMES)} {rng.choice(STATUSES)} {digest} - - {length} {rng.randrange(10 ** 9)} file{rng.randrange(4)}.warc.gz\n".encode())
+    lines.sort()
+    for i, line in enumerate(INVALID):
+        lines.insert((i + 1) * count // (len(INVALID) + 1), line)
+    return lines
+
+
+@pytest.fixture(scope="session")
+def cdx_lines():
+    return generate_lines()
+
+
+@pytest.fixture
+def cdx_file(tmp_path, cdx_lines):
+    path = tmp_path / "input.cdx"
+    path.write_bytes(b"".join(cdx_lines))
+    return str(path)
+
+
+@pytest.fixture
+def gz_file(tmp_path, cdx_lines):
+    path = tmp_path / "input.cdx.gz"
+    path.write_bytes(gzip.compress(b"".join(cdx_lines)))
+    return str(path)
+
+
+@pytest.fixture
+def cli():
+    def run(*args, check=True):
+        env = dict(os.environ, PYTHONPATH=ROOT, NO_PROXY="*")
+        proc = subprocess.run([sys.executable, "-m", "cdxsummary", *map(str, args)], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, timeout=120)
+        if check and proc.returncode:
+            raise AssertionError(proc.stderr.decode())
+        return proc
+    return run
@@ -0,0 +1,75 @@
+import io
+import json
+import os
+import time
+
+from cdxsummary import batch
+from cdxsummary.__main__ import is_item_id
+from cdxsummary.batch import BatchRunner, batch_name, read_batch
+
+
+def test_read_batch_skips_blanks_and_comments(tmp_path):
+    path = tmp_path / "batch.txt"
+    path.write_text("a.cdx\n\n  # comment\n  http://x/b.cdx  \nitem-id\n")
+    assert read_batch(str(path)) == ["a.cdx", "http://x/b.cdx", "item-id"]
+
+
+def test_batch_names_are_safe_and_distinct():
+    entries = ["http://x/a b.cdx", "http://x/a_b.cdx", "http://x/a/b.cdx", "../a b.cdx", "item"]
+    names = [batch_name(entry) for entry in entries]
+    assert len(set(names)) == len(names)
+    assert all("/" not in name and name.endswith(".json") for name in names)
+    assert batch_name("item") == batch_name("item")
+
+
+def test_item_ids(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "exists").write_bytes(b"")
+    assert is_item_id("some-item_2020.01")
+    assert not is_item_id("exists")
+    assert not is_item_id("missing.cdx") and not is_item_id("missing.CDX.gz")
+    assert not is_item_id("data/missing") and not is_item_id("./missing") and not is_item_id("-missing")
+
+
+def test_missing_local_files_fail(tmp_path, cdx_file, cli):
+    batch, out = tmp_path / "batch.txt", tmp_path / "out.jsonl"
+    batch.write_text(f"{tmp_path / 'missing.cdx'}\n{cdx_file}\n")
+    proc = cli("-r", "-s", 0, "--batch", batch, "--out", out, check=False)
+    assert proc.returncode
+    missing, summarized = [json.loads(line) for line in out.read_text().splitlines()]
+    assert missing["input"] == str(tmp_path / "missing.cdx") and "No such local file" in missing["error"]
+    assert summarized["report"]["captures"] == 3000
+
+
+def test_spooled_downloads_are_bounded(monkeypatch, cdx_lines):
+    data = b"".join(cdx_lines)
+    spooled = []
+
+    class Response():
+        ok = True
+
+        def __init__(self):
+            self.raw = io.BytesIO(data)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            pass
+
+    class Session():
+        def get(self, url, stream=False):
+            spooled.append(len(os.listdir(runner._spool)))
+            return Response()
+
+    def analyze_file(path, **options):
+        time.sleep(0.02)
+        with open(path, "rb") as f:
+            return str(len(f.read()))
+
+    monkeypatch.setattr(batch, "analyze_file", analyze_file)
+    results = []
+    runner = BatchRunner(lambda url: Session(), concurrency=2, jobs=1, logger=lambda message: None)
+    assert runner([(f"u{i}", f"http://x/{i}.cdx", None) for i in range(12)], lambda entry, payload, error: results.append(payload)) == 12
+    assert results == [str(len(data))] * 12
+    assert len(spooled) == 12 and max(spooled) <= 1
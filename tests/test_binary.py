@@ -0,0 +1,51 @@
+import io
+import json
+
+import pytest
+
+from cdxsummary.analyzer import CDXAnalyzer
+from cdxsummary.binary import MAGIC, dump_report, is_binary, load_report
+
+
+def roundtrip(value):
+    return json.loads(json.dumps(value))
+
+
+@pytest.fixture(scope="module")
+def report(cdx_lines):
+    return roundtrip(CDXAnalyzer(samplesize=20, seed=3, strata=("host", "mime"), dedup=1024 * 1024, bywarc=True)(iter(cdx_lines)))
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_binary_roundtrip(report, compress):
+    out = io.BytesIO()
+    dump_report(report, out, compress=compress)
+    assert is_binary(out.getvalue())
+    assert roundtrip(load_report(io.BytesIO(out.getvalue()))) == report
+
+
+def test_binary_is_smaller(report):
+    out = io.BytesIO()
+    dump_report(report, out)
+    assert len(out.getvalue()) < len(json.dumps(report).encode())
+
+
+def test_json_report_is_loaded(report):
+    assert load_report(io.BytesIO(json.dumps(report).encode())) == report
+
+
+def test_loaded_binary_report_resumes(report):
+    out = io.BytesIO()
+    dump_report(report, out)
+    loaded = roundtrip(CDXAnalyzer(samplesize=20).load_report(load_report(io.BytesIO(out.getvalue()))))
+    assert loaded.pop("dedup").keys() == report["dedup"].keys()
+    assert loaded == {key: value for key, value in report.items() if key != "dedup"}
+
+
+def test_newer_version_is_rejected(report):
+    out = io.BytesIO()
+    dump_report(report, out)
+    data = bytearray(out.getvalue())
+    data[len(MAGIC)] = 0x7f
+    with pytest.raises(ValueError):
+        load_report(io.BytesIO(bytes(data)))
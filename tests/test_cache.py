@@ -0,0 +1,114 @@
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+
+from cdxsummary.cache import ReportCache, file_identity
+
+
+REPORT = {"captures": 3, "samples": [["20200101000000", "http://a/"], ["20200102000000", "http://b/"]], "tophosts": {"a": 2, "b": 1}}
+
+
+def test_hit_and_miss(tmp_path, cdx_file):
+    cache = ReportCache(str(tmp_path / "cache"))
+    key = cache.key(cdx_file, precision=12)
+    identity = file_identity([cdx_file])
+    assert cache.lookup(key, identity=identity) is None
+    cache.miss()
+    cache.put(key, cdx_file, identity, REPORT, samplesize=2)
+    assert cache.lookup(key, samples=1, identity=identity)
+    samples = cache.get(key, samples=1)["samples"]
+    assert len(samples) == 1 and samples[0] in REPORT["samples"]
+    stats = ReportCache(str(tmp_path / "cache")).stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_changed_file_is_not_served(tmp_path, cdx_file):
+    cache = ReportCache(str(tmp_path / "cache"))
+    key = cache.key(cdx_file)
+    cache.put(key, cdx_file, file_identity([cdx_file]), REPORT)
+    with open(cdx_file, "ab") as f:
+        f.write(b"com,zzz)/ 20200101000000 http://zzz.com/ text/html 200 D - - 10 0 f.warc.gz\n")
+    assert cache.lookup(key, identity=file_identity([cdx_file])) is None
+
+
+def test_more_samples_than_cached(tmp_path):
+    cache = ReportCache(str(tmp_path))
+    key = cache.key("source")
+    cache.put(key, "source", None, REPORT, samplesize=2)
+    assert cache.lookup(key, samples=5) is None
+    cache.put(key, "source", None, REPORT, samplesize=5)
+    assert cache.lookup(key, samples=5)
+
+
+def test_fewer_samples_are_a_random_subset(tmp_path):
+    cache = ReportCache(str(tmp_path))
+    report = {"captures": 100, "samples": [[str(i), f"http://a/{i}"] for i in range(100)]}
+    early = 0
+    for i in range(200):
+        key = cache.key(f"source{i}")
+        cache.put(key, f"source{i}", None, report, samplesize=100)
+        samples = cache.get(key, samples=10)["samples"]
+        assert len(samples) == 10 and samples == sorted(samples, key=lambda sample: int(sample[0]))
+        assert samples == cache.get(key, samples=10)["samples"]
+        early += sum(int(sample[0]) < 50 for sample in samples)
+    assert 0.45 <= early / 2000 <= 0.55
+    assert cache.get(key, samples=0)["samples"] == []
+
+
+def test_fewer_hosts_than_requested(tmp_path):
+    cache = ReportCache(str(tmp_path))
+    key = cache.key("source")
+    cache.put(key, "source", None, REPORT, tophosts=2)
+    assert cache.lookup(key, tophosts=2)
+    assert cache.lookup(key, tophosts=10) is None
+
+
+def test_revalidation(tmp_path):
+    cache = ReportCache(str(tmp_path))
+    key = cache.key("http://example.com/a.cdx")
+    assert cache.validators(None) == {}
+    cache.put(key, "http://example.com/a.cdx", {"etag": '"v1"', "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT", "size": "10"}, REPORT)
+    assert cache.validators(cache.lookup(key)) == {"If-None-Match": '"v1"'}
+    cache.put(key, "http://example.com/a.cdx", {"etag": None, "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT", "size": "10"}, REPORT)
+    assert cache.validators(cache.lookup(key)) == {"If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    assert cache.get(key, samples=2, revalidated=True) == REPORT
+    assert cache.stats()["revalidated"] == 1
+
+
+def test_missing_report_file_is_discarded(tmp_path):
+    cache = ReportCache(str(tmp_path))
+    key = cache.key("source")
+    cache.put(key, "source", None, REPORT)
+    os.remove(tmp_path / f"{key}.json.gz")
+    assert cache.get(key) is None
+    assert cache.lookup(key) is None
+
+
+def test_least_recently_used_is_evicted(tmp_path):
+    cache = ReportCache(str(tmp_path))
+    size = None
+    for i in range(3):
+        key = cache.key(f"source{i}")
+        cache.put(key, f"source{i}", None, REPORT)
+        size = size or cache.stats()["bytes"]
+    cache.get(cache.key("source0"))
+    cache = ReportCache(str(tmp_path), maxsize=size * 2)
+    cache.put(cache.key("source3"), "source3", None, REPORT)
+    assert cache.lookup(cache.key("source0"))
+    assert cache.lookup(cache.key("source1")) is None
+    assert cache.stats()["evictions"] == 2
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(".json.gz")]) == 2
+
+
+def update_cache(directory, i):
+    cache = ReportCache(directory)
+    for _ in range(20):
+        cache.miss()
+    cache.put(cache.key(f"source{i}"), f"source{i}", None, REPORT)
+
+
+def test_concurrent_updates(tmp_path):
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(update_cache, [str(tmp_path)] * 4, range(4)))
+    stats = ReportCache(str(tmp_path)).stats()
+    assert (stats["misses"], stats["entries"]) == (80, 4)
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from cdxsummary.analyzer import CDXAnalyzer
+from cdxsummary.checkpoint import TrackedStream, load_checkpoint, save_checkpoint, skip_bytes
+
+
+def test_resume_mid_file(tmp_path, cdx_file, cdx_lines, cli):
+    checkpoint = tmp_path / "state.json"
+    analyzer = CDXAnalyzer()
+    tracked = TrackedStream(iter(cdx_lines[:1234]))
+    analyzer(tracked)
+    save_checkpoint(str(checkpoint), cdx_file, analyzer.partial(), offset=tracked.offset, lines=tracked.lines)
+    resumed = json.loads(cli("-r", "-s", 0, "-C", checkpoint, "-R", cdx_file).stdout)
+    assert resumed == json.loads(cli("-r", "-s", 0, cdx_file).stdout)
+
+
+def test_resume_folds_appended_lines(tmp_path, cdx_lines, cli):
+    path, checkpoint = tmp_path / "growing.cdx", tmp_path / "state.json"
+    path.write_bytes(b"".join(cdx_lines[:2000]))
+    cli("-r", "-s", 0, "-C", checkpoint, "-E", 300, path)
+    assert json.loads(checkpoint.read_text())["lines"] == 2000
+    with open(path, "ab") as f:
+        f.write(b"".join(cdx_lines[2000:]))
+    resumed = json.loads(cli("-r", "-s", 0, "-C", checkpoint, "-R", path).stdout)
+    assert resumed == json.loads(cli("-r", "-s", 0, path).stdout)
+    assert json.loads(checkpoint.read_text())["lines"] == len(cdx_lines)
+
+
+def test_checkpoint_of_other_input_is_rejected(tmp_path):
+    path = str(tmp_path / "state.json")
+    save_checkpoint(path, "a.cdx", {}, offset=0, lines=0)
+    assert load_checkpoint(path, "a.cdx")["source"] == "a.cdx"
+    assert load_checkpoint(str(tmp_path / "missing.json"), "a.cdx") == {}
+    with pytest.raises(ValueError):
+        load_checkpoint(path, "b.cdx")
+
+
+def test_tracked_stream_and_skip_bytes(cdx_lines):
+    tracked = TrackedStream(iter(cdx_lines))
+    assert list(tracked) == cdx_lines
+    assert (tracked.offset, tracked.lines) == (sum(map(len, cdx_lines)), len(cdx_lines))
+    assert list(skip_bytes(iter(cdx_lines), sum(map(len, cdx_lines[:10])))) == cdx_lines[10:]
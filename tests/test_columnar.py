@@ -0,0 +1,31 @@
+import json
+
+import pytest
+
+from cdxsummary.columnar import ENGINES
+from cdxsummary.parser import PARSERS
+
+
+pytest.importorskip("numpy")
+
+OPTIONS = {"samplesize": 25, "seed": "engines", "strata": ("host", "year", "mime"), "stratumsize": 2, "dedup": 1024 * 1024, "bywarc": True}
+
+
+def summarize(lines, engine="record", **options):
+    return json.loads(json.dumps(ENGINES[engine](**options)(iter(lines))))
+
+
+@pytest.mark.parametrize("blocksize", [1, 512, 65536])
+@pytest.mark.parametrize("parser", sorted(PARSERS))
+def test_columnar_matches_record(cdx_lines, parser, blocksize):
+    record = summarize(cdx_lines, parser=parser, **OPTIONS)
+    assert summarize(cdx_lines, engine="columnar", parser=parser, blocksize=blocksize, **OPTIONS) == record
+
+
+def test_columnar_fallback_lines_keep_sample_order(cdx_lines):
+    tabbed = [line.replace(b" ", b"\t", 1) if i % 97 == 0 else line for i, line in enumerate(cdx_lines)]
+    assert summarize(tabbed, engine="columnar", blocksize=256, **OPTIONS) == summarize(tabbed, **OPTIONS)
+
+
+def test_columnar_default_options(cdx_lines):
+    assert summarize(cdx_lines, engine="columnar") == summarize(cdx_lines)
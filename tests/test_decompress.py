@@ -0,0 +1,90 @@
+import bz2
+import gzip
+import io
+import lzma
+import zlib
+
+import pytest
+
+from cdxsummary.analyzer import CDXAnalyzer
+from cdxsummary.decompress import CHUNKSIZE, QueueReader, external_decoder, open_compressed
+
+
+COMPRESSORS = {".gz": gzip.compress, ".bz2": bz2.compress, ".xz": lzma.compress}
+DECODERS = ["builtin", pytest.param("external", marks=pytest.mark.skipif(not all(map(external_decoder, COMPRESSORS)), reason="external decompressors are not installed"))]
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def payload(cdx_lines):
+    return b"".join(cdx_lines)
+
+
+@pytest.mark.parametrize("decoder", DECODERS)
+@pytest.mark.parametrize("ext", sorted(COMPRESSORS))
+def test_roundtrip(tmp_path, payload, ext, decoder):
+    path = write(tmp_path, f"input.cdx{ext}", COMPRESSORS[ext](payload))
+    with open_compressed(path, decoder=decoder) as stream:
+        assert stream.read() == payload
+
+
+@pytest.mark.parametrize("decoder", DECODERS)
+@pytest.mark.parametrize("ext", sorted(COMPRESSORS))
+def test_multiple_members(tmp_path, payload, ext, decoder):
+    half = len(payload) // 2
+    path = write(tmp_path, f"input.cdx{ext}", COMPRESSORS[ext](payload[:half]) + COMPRESSORS[ext](payload[half:]))
+    with open_compressed(path, decoder=decoder) as stream:
+        assert stream.read() == payload
+
+
+@pytest.mark.parametrize("ext", sorted(COMPRESSORS))
+def test_truncated_input_raises(tmp_path, payload, ext):
+    data = COMPRESSORS[ext](payload)
+    path = write(tmp_path, f"input.cdx{ext}", data[:len(data) * 2 // 3])
+    with open_compressed(path, decoder="builtin") as stream:
+        with pytest.raises(EOFError):
+            CDXAnalyzer()(stream)
+
+
+@pytest.mark.parametrize("ext", sorted(COMPRESSORS))
+def test_truncated_second_member_raises(tmp_path, payload, ext):
+    member = COMPRESSORS[ext](payload)
+    path = write(tmp_path, f"input.cdx{ext}", member + member[:len(member) // 2])
+    with open_compressed(path, decoder="builtin") as stream:
+        with pytest.raises(EOFError):
+            stream.read()
+
+
+@pytest.mark.skipif(not external_decoder(".gz"), reason="no external gzip decompressor")
+def test_truncated_input_fails_external(tmp_path, payload):
+    data = gzip.compress(payload)
+    path = write(tmp_path, "input.cdx.gz", data[:len(data) // 2])
+    with open_compressed(path, decoder="external") as stream:
+        with pytest.raises(OSError):
+            stream.read()
+
+
+@pytest.mark.parametrize("ext", sorted(COMPRESSORS))
+def test_corrupt_input_raises(tmp_path, ext):
+    path = write(tmp_path, f"input.cdx{ext}", b"definitely not compressed data" * 100)
+    with open_compressed(path, decoder="builtin") as stream:
+        with pytest.raises((OSError, EOFError, zlib.error, lzma.LZMAError)):
+            stream.read()
+
+
+def test_close_stops_pump_thread():
+    reader = QueueReader(io.BytesIO(b"x" * CHUNKSIZE * 8), queuesize=1)
+    assert reader.read(10) == b"x" * 10
+    reader.close()
+    reader._thread.join(timeout=5)
+    assert not reader._thread.is_alive()
+
+
+def test_plain_file_is_not_decompressed(cdx_file, payload):
+    with open_compressed(cdx_file) as stream:
+        assert stream.read() == payload
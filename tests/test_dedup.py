@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from cdxsummary.analyzer import CDXAnalyzer
+from cdxsummary.dedup import DigestSet, digest_key
+
+
+def keys(start, stop):
+    return [digest_key(f"D{i}") for i in range(start, stop)]
+
+
+def test_exact_until_budget():
+    digests = DigestSet(budget=72 * 1000)
+    assert not any(digests.add(key) for key in keys(0, 1000))
+    assert all(digests.add(key) for key in keys(0, 1000))
+    assert digests.dumps().startswith("exact:1000:")
+    assert digests.error() == 0.0
+
+
+def test_bloom_beyond_budget():
+    digests = DigestSet(budget=4096)
+    added = sum(not digests.add(key) for key in keys(0, 3000))
+    assert digests.dumps().startswith("bloom:")
+    assert len(digests) == added and 2900 <= added <= 3000
+    assert all(key in digests for key in keys(0, 3000))
+    assert 0 < digests.error() < 0.05
+    assert digests.memory() == 4096
+
+
+@pytest.mark.parametrize("budget", [72 * 10000, 8192])
+def test_merge_counts_overlap(budget):
+    a, b = DigestSet(budget=budget), DigestSet(budget=budget)
+    for key in keys(0, 3000):
+        a.add(key)
+    for key in keys(2000, 5000):
+        b.add(key)
+    overlap = a.merge(b)
+    assert 0.9 * 1000 <= overlap <= 1.1 * 1000
+    assert 0.9 * 5000 <= len(a) <= 1.1 * 5000
+
+
+def test_bloom_cardinality():
+    digests = DigestSet(budget=8192)
+    for key in keys(0, 4000):
+        digests.add(key)
+    assert abs(digests._cardinality() - 4000) <= 200
+
+
+def test_dumps_and_loads():
+    for budget in (72 * 10000, 4096):
+        digests = DigestSet(budget=budget)
+        for key in keys(0, 2000):
+            digests.add(key)
+        loaded = DigestSet.loads(digests.dumps(), budget=budget)
+        assert len(loaded) == len(digests)
+        assert all(key in loaded for key in keys(0, 2000))
+
+
+def test_dedup_report(cdx_lines):
+    report = json.loads(json.dumps(CDXAnalyzer(samplesize=0, dedup=1024 * 1024)(iter(cdx_lines))))["dedup"]
+    records = [line.split() for line in cdx_lines if len(line.split()) == 11]
+    payloads = [fields[5] for fields in records if fields[3] != b"warc/revisit"]
+    assert report["filter"]["type"] == "exact"
+    assert report["unique"]["captures"] == report["filter"]["digests"] == len(set(payloads))
+    assert report["duplicate"]["captures"] == len(payloads) - len(set(payloads))
+    assert report["revisit"]["captures"] == len(records) - len(payloads)
+    assert sum(host["captures"] for host in report["hosts"].values()) == report["duplicate"]["captures"]
+
+
+def test_merged_partials_match_a_single_pass(cdx_lines):
+    whole = json.loads(json.dumps(CDXAnalyzer(samplesize=0, dedup=1024 * 1024)(iter(cdx_lines))))["dedup"]
+    merged = CDXAnalyzer(samplesize=0, dedup=1024 * 1024)
+    for part in (cdx_lines[:1000], cdx_lines[1000:]):
+        analyzer = CDXAnalyzer(samplesize=0, dedup=1024 * 1024)
+        analyzer(iter(part))
+        merged.merge(json.loads(json.dumps(analyzer.partial())))
+    report = json.loads(json.dumps(merged._report()))["dedup"]
+    for kind in ("unique", "duplicate", "revisit"):
+        assert report[kind]["captures"] == whole[kind]["captures"], kind
+    assert report["filter"]["digests"] == whole["filter"]["digests"]
@@ -0,0 +1,87 @@
+import pickle
+
+import pytest
+
+from requests.exceptions import ConnectionError
+
+from cdxsummary.analyzer import CDXAnalyzer
+from cdxsummary.fetcher import PageFetchError, PageFetcher, UpstreamError
+
+
+class Response():
+    def __init__(self, status_code, content=b""):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.reason = "Reason"
+        self.content = content
+        self.text = content.decode()
+
+
+class Session():
+    def __init__(self, pages, failures=None):
+        self._pages = pages
+        self._failures = dict(failures or {})
+        self.requests = []
+
+
+    def get(self, url, timeout=None):
+        self.requests.append(url)
+        if url.endswith("showNumPages=true"):
+            return Response(200, str(len(self._pages)).encode())
+        page = int(url.rsplit("=", 1)[1])
+        failure = self._failures.get(page)
+        if isinstance(failure, list) and failure:
+            error = failure.pop(0)
+            if isinstance(error, Exception):
+                raise error
+            return Response(error)
+        if isinstance(failure, int):
+            return Response(failure)
+        return Response(200, b"".join(self._pages[page]))
+
+
+def chunks(lines, size):
+    return [lines[i:i + size] for i in range(0, len(lines), size)]
+
+
+@pytest.mark.parametrize("concurrency,ordered", [(1, True), (4, True), (4, False)])
+def test_pages_summarize_like_a_file(cdx_lines, concurrency, ordered):
+    lines = [line for line in cdx_lines if len(line.split()) == 11]
+    fetcher = PageFetcher(Session(chunks(lines, 250)), "http://cdx/?url=x", concurrency=concurrency, ordered=ordered, backoff=0)
+    pages = dict(fetcher())
+    analyzer = CDXAnalyzer()
+    report = analyzer(line for page in sorted(pages) for line in pages[page])
+    assert report == CDXAnalyzer()(iter(lines))
+    assert analyzer._invalid == 0
+
+
+def test_skipped_pages_are_not_fetched(cdx_lines):
+    session = Session(chunks(cdx_lines, 500))
+    fetched = [page for page, _ in PageFetcher(session, "http://cdx/?url=x", backoff=0)(skip={0, 2})]
+    assert fetched == [page for page in range(len(session._pages)) if page not in (0, 2)]
+
+
+def test_retries_transient_errors(cdx_lines):
+    session = Session(chunks(cdx_lines, 1000), failures={1: [503, ConnectionError("reset")]})
+    pages = dict(PageFetcher(session, "http://cdx/?url=x", retries=2, backoff=0)())
+    assert b"".join(pages[1]) == b"".join(cdx_lines[1000:2000]).replace(b"\n", b"")
+    assert sum(url.endswith("page=1") for url in session.requests) == 3
+
+
+def test_gives_up_after_retries(cdx_lines):
+    session = Session(chunks(cdx_lines, 1000), failures={1: [503] * 3})
+    with pytest.raises(PageFetchError):
+        list(PageFetcher(session, "http://cdx/?url=x", retries=2, backoff=0)())
+
+
+def test_client_errors_are_not_completed_pages(cdx_lines):
+    session = Session(chunks(cdx_lines, 1000), failures={2: 404})
+    with pytest.raises(PageFetchError) as e:
+        list(PageFetcher(session, "http://cdx/?url=x", concurrency=2, backoff=0)())
+    assert e.value.status == 404
+
+
+def test_upstream_error_pickles():
+    error = pickle.loads(pickle.dumps(PageFetchError("gone", 410)))
+    assert isinstance(error, UpstreamError)
+    assert (str(error), error.status) == ("gone", 410)
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from cdxsummary.analyzer import CDXAnalyzer
+from cdxsummary.filters import LineFilter, bisect_offset, file_range, prefix_successor
+from cdxsummary.reader import MappedCDXFile
+
+
+QUERIES = [
+    {"prefix": "com,h1"},
+    {"prefix": "com,h17)"},
+    {"prefix": "com,h23)/a"},
+    {"prefix": "com,zzz"},
+    {"start": "20050000000000", "end": "20101231235959"},
+    {"prefix": "com,h3", "start": "20000000000000"},
+    {"end": "19991231235959"},
+    {}
+]
+
+
+def summarize(lines):
+    return json.loads(json.dumps(CDXAnalyzer(samplesize=0)(iter(lines))))
+
+
+def expected(lines, prefix=None, start=None, end=None):
+    selected = []
+    for line in lines:
+        fields = line.decode().split()
+        if len(fields) != 11 or prefix and not fields[0].startswith(prefix):
+            continue
+        if start and fields[1] < start or end and fields[1] > end:
+            continue
+        selected.append(line)
+    return summarize(selected)
+
+
+def valid(lines):
+    return [line for line in lines if len(line.split()) == 11]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_line_filter(cdx_lines, query):
+    analyzer = LineFilter(**query).attach(CDXAnalyzer(samplesize=0))
+    assert json.loads(json.dumps(analyzer(iter(cdx_lines)))) == expected(cdx_lines, **query)
+
+
+@pytest.mark.parametrize("prefix", ["com,h1", "com,h17)", "com,h23)/a", "com,a", "com,zzz", "com,h39)/ccc/ccc/ccc?k0=v&k1=v"])
+def test_prefix_range(tmp_path, cdx_lines, prefix):
+    lines = valid(cdx_lines)
+    path = tmp_path / "sorted.cdx"
+    path.write_bytes(b"".join(lines))
+    start, end = file_range(str(path), prefix.encode())
+    data = path.read_bytes()
+    assert data[start:end] == b"".join(line for line in lines if line.startswith(prefix.encode()))
+
+
+def test_bisect_offset_bounds(tmp_path, cdx_lines):
+    lines = valid(cdx_lines)
+    path = tmp_path / "sorted.cdx"
+    path.write_bytes(b"".join(lines))
+    mapped = MappedCDXFile(str(path))
+    try:
+        assert bisect_offset(mapped.line_at, len(mapped), b"") == 0
+        assert bisect_offset(mapped.line_at, len(mapped), b"\xff") == len(mapped)
+        assert bisect_offset(mapped.line_at, len(mapped), lines[100].rstrip(b"\n")) == sum(map(len, lines[:100]))
+    finally:
+        mapped.close()
+
+
+def test_prefix_successor():
+    assert prefix_successor(b"com,h1") == b"com,h2"
+    assert prefix_successor(b"ab\xff") == b"ac"
+    assert prefix_successor(b"\xff\xff") is None
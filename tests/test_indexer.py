@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from cdxsummary.analyzer import CDXAnalyzer
+from cdxsummary.indexer import CDXIndex, build_index
+
+
+QUERIES = [
+    {"prefix": "com,h1"},
+    {"prefix": "com,h17)"},
+    {"prefix": "com,h23)/a"},
+    {"prefix": "com,zzz"},
+    {"start": "20050000000000", "end": "20101231235959"},
+    {"prefix": "com,h3", "start": "20000000000000"},
+    {"end": "19991231235959"},
+    {}
+]
+
+
+def summarize(lines):
+    return json.loads(json.dumps(CDXAnalyzer(samplesize=0)(iter(lines))))
+
+
+def expected(lines, prefix=None, start=None, end=None):
+    selected = []
+    for line in lines:
+        fields = line.decode().split()
+        if len(fields) != 11 or prefix and not fields[0].startswith(prefix):
+            continue
+        if start and fields[1] < start or end and fields[1] > end:
+            continue
+        selected.append(line)
+    return summarize(selected)
+
+
+def index_report(tmp_path, path, samples=0, **options):
+    indexpath, _, _ = build_index(path, indexpath=str(tmp_path / "input.cdxidx"), blockspath=str(tmp_path / "blocks.gz"), blocklines=97, fanout=3, **options)
+    index = CDXIndex(indexpath)
+    try:
+        return json.loads(json.dumps(index.query(CDXAnalyzer(samplesize=samples))))
+    finally:
+        index.close()
+
+
+@pytest.mark.parametrize("compressed", [False, True])
+@pytest.mark.parametrize("query", QUERIES)
+def test_index_matches_scan(tmp_path, cdx_lines, compressed, query, request):
+    path = request.getfixturevalue("gz_file" if compressed else "cdx_file")
+    indexpath, _, _ = build_index(path, indexpath=str(tmp_path / "input.cdxidx"), blockspath=str(tmp_path / "blocks.gz"), blocklines=97, fanout=3, samplesize=0)
+    index = CDXIndex(indexpath)
+    try:
+        report = json.loads(json.dumps(index.query(CDXAnalyzer(samplesize=0), **query)))
+    finally:
+        index.close()
+    scan = expected(cdx_lines, **query)
+    for key in ("captures", "urls", "hosts", "bytes", "first", "last", "tophosts", "mimestatus", "pathquery", "yearmonth", "distinct", "sampled"):
+        assert report[key] == scan[key], key
+
+
+def test_stale_index_is_rejected(tmp_path, cdx_file):
+    indexpath, _, _ = build_index(cdx_file, indexpath=str(tmp_path / "input.cdxidx"), blocklines=500)
+    with open(cdx_file, "ab") as f:
+        f.write(b"com,zzz)/ 20200101000000 http://zzz.com/ text/html 200 D - - 10 0 f.warc.gz\n")
+    with pytest.raises(ValueError):
+        CDXIndex(indexpath)
+
+
+def test_samples_of_prebuilt_nodes(tmp_path, cdx_file):
+    assert index_report(tmp_path, cdx_file, samplesize=10)["sampled"] == 0
+    report = index_report(tmp_path, cdx_file, samples=10, samplesize=10)
+    assert len(report["samples"]) == 10
+    with open(cdx_file, "rb") as f:
+        assert report["sampled"] == CDXAnalyzer(samplesize=10)(f)["sampled"]
+
+
+def test_all_hosts_are_kept_by_default(tmp_path, cdx_file, cdx_lines):
+    report = index_report(tmp_path, cdx_file, samplesize=0)
+    assert report["tophosts"] == expected(cdx_lines)["tophosts"]
+    assert "approximated" not in report
+
+
+def test_host_limit_is_recorded(tmp_path, cdx_file, cdx_lines):
+    report = index_report(tmp_path, cdx_file, samplesize=0, hostlimit=5)
+    exact = expected(cdx_lines)["tophosts"]
+    error = report["approximated"]["tophosts"]["error"]
+    assert report["approximated"]["tophosts"]["dropped"] > 0
+    for host, count in report["tophosts"].items():
+        assert count <= exact[host] <= count + error
@@ -0,0 +1,87 @@
+import json
+import re
+
+import pytest
+
+from conftest import generate_lines
+
+from cdxsummary.analyzer import CDXAnalyzer
+from cdxsummary.memory import MemoryProfiler, deep_size
+from cdxsummary.mimes import mime_group
+
+
+@pytest.fixture(scope="module")
+def many_hosts():
+    return generate_lines(count=20000, hosts=3000, seed=11)
+
+
+@pytest.fixture(scope="module")
+def many_mimes(cdx_lines):
+    return [line.replace(b" image/jpeg ", f" image/x-{i} ".encode()) for i, line in enumerate(cdx_lines)]
+
+
+def summarize(lines, **options):
+    return json.loads(json.dumps(CDXAnalyzer(samplesize=0, precision=0, **options)(iter(lines))))
+
+
+def test_hosts_are_pruned_with_an_error_bound(many_hosts):
+    exact = summarize(many_hosts, maxhosts=None)
+    analyzer = CDXAnalyzer(samplesize=0, precision=0, maxhosts=None, maxmemory=100000)
+    report = json.loads(json.dumps(analyzer(iter(many_hosts))))
+    pruned = report["approximated"]["tophosts"]
+    assert pruned["dropped"] == len(exact["tophosts"]) - len(report["tophosts"]) > 0
+    assert analyzer.memory() <= 100000
+    for host, count in report["tophosts"].items():
+        assert count <= exact["tophosts"][host] <= count + pruned["error"]
+    assert all(count <= pruned["error"] for host, count in exact["tophosts"].items() if host not in report["tophosts"])
+    assert {key: report[key] for key in ("captures", "urls", "hosts", "bytes")} == {key: exact[key] for key in ("captures", "urls", "hosts", "bytes")}
+
+
+def test_rare_mime_types_are_collapsed(many_mimes):
+    exact = summarize(many_mimes, plugins=["mimestatus"])
+    report = summarize(many_mimes, plugins=["mimestatus"], maxmemory=60000)
+    assert report["approximated"]["mimestatus"]["collapsed"] > 0
+    assert "other/image" in report["mimestatus"] and len(report["mimestatus"]) < len(exact["mimestatus"])
+    groups = lambda grid: {group: sum(sum(cols.values()) for mime, cols in grid.items() if mime_group(mime) == group) for group in map(mime_group, grid)}
+    assert groups(report["mimestatus"]) == groups(exact["mimestatus"])
+
+
+def test_budget_that_fits_changes_nothing(cdx_lines):
+    assert summarize(cdx_lines, maxmemory=64 * 1024 * 1024) == summarize(cdx_lines)
+
+
+def test_approximations_are_merged(many_hosts):
+    merged = CDXAnalyzer(samplesize=0, precision=0, maxhosts=None)
+    for part in (many_hosts[:10000], many_hosts[10000:]):
+        analyzer = CDXAnalyzer(samplesize=0, precision=0, maxhosts=None, maxmemory=100000)
+        analyzer(iter(part))
+        merged.merge(json.loads(json.dumps(analyzer.partial())))
+    parts = [summarize(part, maxhosts=None, maxmemory=100000)["approximated"]["tophosts"] for part in (many_hosts[:10000], many_hosts[10000:])]
+    assert merged._report()["approximated"]["tophosts"] == {key: parts[0][key] + parts[1][key] for key in parts[0]}
+
+
+def test_deep_size_counts_shared_objects_once():
+    shared = list(range(1000))
+    seen = set()
+    first = deep_size({"a": shared}, seen)
+    assert first > deep_size(shared, set())
+    assert deep_size({"b": shared}, seen) < first
+
+
+def test_profiler_reports_structures(cdx_lines):
+    messages = []
+    analyzer = CDXAnalyzer(samplesize=5)
+    profiler = MemoryProfiler(logger=messages.append).attach(analyzer)
+    analyzer(iter(cdx_lines))
+    profiler.close(analyzer)
+    assert messages[0].startswith("Peak traced memory")
+    for name in ("tophosts", "mimestatus", "samples", "sketches"):
+        assert any(f"Peak [cyan]{name}[/cyan] size" in message for message in messages), name
+    assert any("Allocated" in message for message in messages)
+
+
+def test_cli_options(tmp_path, cdx_file, cli):
+    assert cli("--max-memory", 0, cdx_file, check=False).returncode
+    proc = cli("-r", "-s", 0, "--max-memory", 64, "--profile-memory", cdx_file)
+    assert json.loads(proc.stdout)["captures"] == 3000
+    assert re.search(r"Peak traced memory [\d.]+ \w+", proc.stderr.decode())
@@ -0,0 +1,51 @@
+import gzip
+import json
+
+from cdxsummary.analyzer import CDXAnalyzer
+from cdxsummary.merger import expand_report_paths, merge_parallel, merge_reports
+
+
+def roundtrip(value):
+    return json.loads(json.dumps(value))
+
+
+def write_parts(tmp_path, cdx_lines, parts=2):
+    lines = [line for line in cdx_lines if len(line.split()) == 11]
+    hosts = [line.split(b")", 1)[0] for line in lines]
+    cuts = [next(i for i in range(len(hosts) * k // parts, len(hosts)) if hosts[i] != hosts[i - 1]) for k in range(1, parts)]
+    paths = []
+    for i, (start, end) in enumerate(zip([0, *cuts], [*cuts, len(lines)])):
+        path = tmp_path / f"part{i}.json.gz"
+        with gzip.open(path, "wt") as f:
+            json.dump(CDXAnalyzer()(iter(lines[start:end])), f)
+        paths.append(str(path))
+    return lines, paths
+
+
+def test_merged_reports_sum_counts(cdx_lines, tmp_path):
+    lines, paths = write_parts(tmp_path, cdx_lines)
+    merged = roundtrip(merge_reports(CDXAnalyzer(), paths))
+    single = roundtrip(CDXAnalyzer()(iter(lines)))
+    for key in ("captures", "hosts", "bytes", "first", "last", "tophosts", "mimestatus", "pathquery", "yearmonth", "distinct", "sketches"):
+        assert merged[key] == single[key], key
+
+
+def test_parallel_merge_matches_sequential(cdx_lines, tmp_path):
+    _, paths = write_parts(tmp_path, cdx_lines, parts=5)
+    sequential = roundtrip(merge_reports(CDXAnalyzer(), paths))
+    parallel = roundtrip(merge_parallel(CDXAnalyzer(), paths, 2))
+    for key in ("captures", "hosts", "bytes", "first", "last", "tophosts", "mimestatus", "distinct"):
+        assert parallel[key] == sequential[key], key
+
+
+def test_host_limit(cdx_lines, tmp_path):
+    _, paths = write_parts(tmp_path, cdx_lines)
+    merged = merge_reports(CDXAnalyzer(), paths, hostlimit=5)
+    assert len(merged["tophosts"]) == 5
+
+
+def test_expand_report_paths(tmp_path):
+    (tmp_path / "a").mkdir()
+    for name in ("a/1.json", "a/2.cdxb", "a/notes.txt", "3.json.gz"):
+        (tmp_path / name).write_text("{}")
+    assert list(expand_report_paths([str(tmp_path / "a"), str(tmp_path / "*.json.gz")])) == [str(tmp_path / "a/1.json"), str(tmp_path / "a/2.cdxb"), str(tmp_path / "3.json.gz")]
@@ -0,0 +1,89 @@
+import io
+import json
+import re
+
+from cdxsummary.analyzer import CDXAnalyzer
+from cdxsummary.metrics import Metrics, prometheus_label
+
+
+def test_counts_lines_and_failures(cdx_lines):
+    analyzer = CDXAnalyzer()
+    metrics = Metrics(source="input.cdx", total=sum(map(len, cdx_lines)))
+    metrics.attach(analyzer)
+    analyzer(iter(cdx_lines))
+    metrics.close()
+    snapshot = metrics.snapshot()
+    assert snapshot["done"]
+    assert snapshot["lines"] == len(cdx_lines)
+    assert snapshot["captures"] == analyzer._captures == len(cdx_lines) - 3
+    assert snapshot["parse_failures"] == 3
+    assert snapshot["bytes"]["decompressed"] == snapshot["bytes"]["total"]
+    assert snapshot["seconds"]["parse"] is None
+
+
+def test_sampled_parse_time(cdx_lines):
+    analyzer = CDXAnalyzer()
+    metrics = Metrics()
+    metrics.attach(analyzer)
+    analyzer(iter(cdx_lines * 25))
+    metrics.close()
+    seconds = metrics.snapshot()["seconds"]
+    assert 0 <= seconds["parse"] <= seconds["analyze"]
+    assert abs(seconds["aggregate"] + seconds["parse"] - seconds["analyze"]) <= 0.002
+
+
+def test_metering_leaves_the_report_unchanged(cdx_lines):
+    analyzer = CDXAnalyzer()
+    Metrics().attach(analyzer)
+    analyzer(iter(cdx_lines))
+    plain = CDXAnalyzer()
+    plain(iter(cdx_lines))
+    assert str(analyzer) == str(plain)
+
+
+def test_compressed_position(cdx_lines):
+    class Positioned(io.BytesIO):
+        def position(self):
+            return 42
+    analyzer = CDXAnalyzer()
+    metrics = Metrics()
+    metrics.attach(analyzer, sample_parse=False)
+    analyzer(Positioned(b"".join(cdx_lines)))
+    metrics.close()
+    snapshot = metrics.snapshot()
+    assert snapshot["bytes"]["compressed"] == 42
+    assert snapshot["seconds"]["parse"] is None
+
+
+def test_prometheus_format(cdx_lines):
+    analyzer = CDXAnalyzer()
+    metrics = Metrics(source='a "quoted"\\path\n')
+    metrics.attach(analyzer)
+    analyzer(iter(cdx_lines))
+    metrics.close()
+    text = metrics.prometheus(metrics.snapshot())
+    label = prometheus_label('a "quoted"\\path\n')
+    assert label == 'a \\"quoted\\"\\\\path\\n'
+    assert f'cdxsummary_lines_total{{source="{label}"}} {len(cdx_lines)}' in text
+    assert f'cdxsummary_parse_failures_total{{source="{label}"}} 3' in text
+    assert f'cdxsummary_done{{source="{label}"}} 1' in text
+    assert "cdxsummary_input_bytes" not in text
+    for line in text.splitlines():
+        assert re.match(r"^(# (HELP|TYPE) cdxsummary_\w+ .+|cdxsummary_\w+\{source=\"(\\.|[^\"\\])*\"(,\w+=\"\w+\")?\} [\d.e+-]+)$", line), line
+
+
+def test_metrics_file(tmp_path, cdx_file, cli):
+    json_file, prom_file = tmp_path / "metrics.json", tmp_path / "metrics.prom"
+    report = json.loads(cli("-r", "-s", 0, "-M", json_file, cdx_file).stdout)
+    snapshot = json.loads(json_file.read_text())
+    assert snapshot["done"] and snapshot["source"] == cdx_file
+    assert snapshot["captures"] == report["captures"]
+    assert snapshot["bytes"]["total"] == snapshot["bytes"]["decompressed"]
+    cli("-r", "-s", 0, "-M", prom_file, cdx_file)
+    assert "cdxsummary_done{" in prom_file.read_text()
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_progress_log_lines(cdx_file, cli):
+    proc = cli("-r", "-s", 0, "-b", cdx_file)
+    assert re.search(r"Analyzed 3,003 lines \([\d,]+ lines/s\), [\d,]+ bytes of [\d,]+", proc.stderr.decode())
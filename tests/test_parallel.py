@@ -0,0 +1,90 @@
+import json
+import random
+
+import pytest
+
+from cdxsummary import parallel
+from cdxsummary.analyzer import CDXAnalyzer
+from cdxsummary.columnar import ENGINES
+from cdxsummary.parallel import analyze_parallel
+
+
+EXACT = ("captures", "urls", "hosts", "bytes", "first", "last", "tophosts", "mimestatus", "pathquery", "yearmonth", "sampled", "warcs", "distinct", "sketches")
+OPTIONS = {"samplesize": 25, "seed": "merge", "strata": ("host", "year", "mime"), "stratumsize": 2, "dedup": 1024 * 1024, "bywarc": True}
+
+
+def roundtrip(value):
+    return json.loads(json.dumps(value))
+
+
+def split_points(lines, parts, seed):
+    return [0, *sorted(random.Random(seed).sample(range(1, len(lines)), parts - 1)), len(lines)]
+
+
+def merged_partials(lines, bounds, engine="record"):
+    analyzer = ENGINES[engine](**OPTIONS)
+    for start, end in zip(bounds, bounds[1:]):
+        shard = ENGINES[engine](**OPTIONS)
+        shard(iter(lines[start:end]))
+        analyzer.merge(roundtrip(shard.partial()))
+    return roundtrip(analyzer._report())
+
+
+def assert_merged(merged, single, lines):
+    for key in EXACT:
+        assert merged[key] == single[key], key
+    assert len(merged["samples"]) == len(single["samples"])
+    assert {tuple(sample) for sample in merged["samples"]} <= {tuple(sample) for sample in single["samples"]} | sampled_pairs(lines)
+    assert merged["strata"].keys() == single["strata"].keys()
+    dedup, expected = merged["dedup"], single["dedup"]
+    for kind in ("unique", "duplicate", "revisit"):
+        assert dedup[kind]["captures"] == expected[kind]["captures"]
+    assert sum(dedup[kind]["bytes"] for kind in ("unique", "duplicate", "revisit")) == sum(expected[kind]["bytes"] for kind in ("unique", "duplicate", "revisit"))
+    estimated = dedup.get("estimated", {"captures": 0})["captures"]
+    assert sum(row["captures"] for row in dedup["mimes"].values()) + estimated == dedup["duplicate"]["captures"]
+
+
+def sampled_pairs(lines):
+    pairs = set()
+    for line in lines:
+        fields = line.decode().split()
+        if len(fields) == 11:
+            pairs.add((fields[1], fields[2]))
+    return pairs
+
+
+@pytest.mark.parametrize("parts,seed", [(2, 1), (4, 2), (7, 3)])
+def test_partials_merge_to_single_pass(cdx_lines, parts, seed):
+    single = roundtrip(CDXAnalyzer(**OPTIONS)(iter(cdx_lines)))
+    assert_merged(merged_partials(cdx_lines, split_points(cdx_lines, parts, seed)), single, cdx_lines)
+
+
+def test_split_inside_a_url_run(cdx_lines):
+    surts = [line.split(b" ", 1)[0] for line in cdx_lines]
+    i = next(i for i in range(1, len(surts)) if surts[i] == surts[i - 1])
+    single = roundtrip(CDXAnalyzer(**OPTIONS)(iter(cdx_lines)))
+    assert_merged(merged_partials(cdx_lines, [0, i, len(cdx_lines)]), single, cdx_lines)
+
+
+def test_columnar_partials_merge_to_single_pass(cdx_lines):
+    pytest.importorskip("numpy")
+    single = roundtrip(CDXAnalyzer(**OPTIONS)(iter(cdx_lines)))
+    assert_merged(merged_partials(cdx_lines, split_points(cdx_lines, 3, 4), engine="columnar"), single, cdx_lines)
+
+
+def test_empty_partial(cdx_lines):
+    analyzer = CDXAnalyzer(**OPTIONS)
+    single = roundtrip(analyzer(iter(cdx_lines)))
+    empty = CDXAnalyzer(**OPTIONS)
+    empty([])
+    assert roundtrip(analyzer.merge(roundtrip(empty.partial()))) == single
+
+
+def test_parallel_shards_match_single_pass(cdx_file, cdx_lines, monkeypatch):
+    monkeypatch.setattr(parallel, "MINSHARD", 4096)
+    sampling = {key: OPTIONS[key] for key in ("seed", "strata", "stratumsize")}
+    options = {"samplesize": OPTIONS["samplesize"], "dedup": OPTIONS["dedup"], "bywarc": OPTIONS["bywarc"]}
+    assert len(list(parallel.shard_tasks([cdx_file], 3))) == 3
+    merged = roundtrip(analyze_parallel(CDXAnalyzer(**options, **sampling), [cdx_file], 3, sampling=sampling, **options))
+    single = roundtrip(CDXAnalyzer(**OPTIONS)(iter(cdx_lines)))
+    assert_merged(merged, single, cdx_lines)
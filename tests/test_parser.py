@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from cdxsummary.analyzer import CDXAnalyzer
+from cdxsummary.parser import FIELDS, PARSERS, CDXRecord, FastCDXRecord
+
+
+OPTIONS = {"samplesize": 25, "seed": "parsers", "strata": ("host", "year", "mime"), "stratumsize": 2, "dedup": 1024 * 1024, "bywarc": True}
+LINES = [
+    b"com,example)/ 20200101000000 http://example.com/ text/html 200 ABC - - 1043 77 a.warc.gz\n",
+    b"com,example)/a/b?x=1&y=2 20200101000000 http://example.com/a/b?x=1&y=2 text/html 200 ABC - - 1043 77 a.warc.gz\n",
+    b"com,example)/ 20200101000000 http://example.com/ warc/revisit - ABC http://example.com/x - 1043 77 a.warc.gz\n",
+    b"com,example)/ 20200101000000 http://example.com/ text/html 301 ABC 512 77 a.warc.gz\n",
+    b"com,example)/ 20200101000000 http://example.com/ text/html 200 ABC\n",
+    b"com,example)/ 20200101000000 http://example.com/ text/html 200 ABC NOARCHIVE 12 34 b.warc.gz\n"
+]
+
+
+def summarize(lines, **options):
+    return json.loads(json.dumps(CDXAnalyzer(**options)(iter(lines))))
+
+
+@pytest.mark.parametrize("line", LINES)
+def test_fast_record_matches_regex(line):
+    fast, regex = FastCDXRecord(line), CDXRecord(line.decode())
+    assert {field: getattr(fast, field) for field in FIELDS} == {field: getattr(regex, field) for field in FIELDS}
+
+
+@pytest.mark.parametrize("line", [b"not a cdx line", b"com,example)/ 2020 http://example.com/ text/html 200 ABC", b"com,example)/ 20200101000000 http://example.com/ text/html 20 ABC", b"com,example)/\t20200101000000 http://example.com/ text/html 200 ABC"])
+def test_fast_record_rejects_irregular_lines(line):
+    with pytest.raises(ValueError):
+        FastCDXRecord(line)
+
+
+@pytest.mark.parametrize("parser", sorted(PARSERS))
+def test_parsers_match(cdx_lines, parser):
+    assert summarize(cdx_lines, parser=parser, **OPTIONS) == summarize(cdx_lines, **OPTIONS)
+
+
+def test_counts(cdx_lines):
+    report = CDXAnalyzer()(iter(cdx_lines))
+    valid = [line.split() for line in cdx_lines if len(line.split()) == 11]
+    assert report["captures"] == len(valid)
+    assert report["urls"] == len({fields[0] for fields in valid})
+    assert report["hosts"] == len({fields[0].split(b")")[0] for fields in valid})
+    assert report["bytes"] == sum(int(fields[8]) for fields in valid if fields[8].isdigit())
+    assert sum(report["tophosts"].values()) == report["captures"]
+    assert sum(sum(row.values()) for row in report["mimestatus"].values()) == report["captures"]
@@ -0,0 +1,105 @@
+import json
+import textwrap
+
+import pytest
+
+from cdxsummary.analyzer import CDXAnalyzer
+from cdxsummary.plugins import AnalyzerPlugin, installed_plugins, plugin_class
+
+
+PLUGIN = """
+from collections import Counter
+
+from cdxsummary.plugins import AnalyzerPlugin
+
+
+class StatusPlugin(AnalyzerPlugin):
+    name = "statuses"
+    keys = ("statuses",)
+    fields = ("status",)
+
+    def __init__(self, analyzer):
+        super().__init__(analyzer)
+        self._counts = Counter()
+
+    def update(self, cdxrec):
+        self._counts[cdxrec.status] += 1
+
+    def report(self):
+        return {"statuses": dict(sorted(self._counts.items()))}
+
+    def merge(self, partial):
+        self._counts.update(partial["statuses"])
+"""
+
+
+@pytest.fixture
+def plugin_module(tmp_path, monkeypatch):
+    (tmp_path / "statusplugin.py").write_text(PLUGIN)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    return "statusplugin"
+
+
+def statuses(lines):
+    counts = {}
+    for line in lines:
+        fields = line.split()
+        if len(fields) == 11:
+            counts[fields[4].decode()] = counts.get(fields[4].decode(), 0) + 1
+    return dict(sorted(counts.items()))
+
+
+def test_module_plugin(cdx_lines, plugin_module):
+    analyzer = CDXAnalyzer(samplesize=0, plugins=["tophosts", f"{plugin_module}:StatusPlugin"])
+    report = json.loads(json.dumps(analyzer(iter(cdx_lines))))
+    assert report["statuses"] == statuses(cdx_lines)
+    assert "tophosts" in report and "mimestatus" not in report
+    assert analyzer.fields() == {"surt", "datetime", "bytes", "host", "status"}
+
+
+def test_module_plugin_merges(cdx_lines, plugin_module):
+    merged = CDXAnalyzer(samplesize=0, plugins=[f"{plugin_module}:StatusPlugin"])
+    for part in (cdx_lines[:1000], cdx_lines[1000:]):
+        analyzer = CDXAnalyzer(samplesize=0, plugins=[f"{plugin_module}:StatusPlugin"])
+        analyzer(iter(part))
+        merged.merge(json.loads(json.dumps(analyzer.partial())))
+    assert merged._report()["statuses"] == statuses(cdx_lines)
+
+
+def test_entry_point_plugin(tmp_path, plugin_module):
+    pytest.importorskip("importlib.metadata")
+    dist = tmp_path / "statusplugin-1.0.dist-info"
+    dist.mkdir()
+    (dist / "METADATA").write_text("Metadata-Version: 2.1\nName: statusplugin\nVersion: 1.0\n")
+    (dist / "entry_points.txt").write_text(textwrap.dedent("""
+        [cdxsummary.plugins]
+        statuses = statusplugin:StatusPlugin
+    """))
+    assert "statuses" in installed_plugins()
+    assert plugin_class("statuses").name == "statuses"
+
+
+def test_fields_of_plugins():
+    assert CDXAnalyzer(plugins=[]).fields() == {"surt", "datetime", "bytes", "host"}
+    assert CDXAnalyzer(plugins=[], dedup=1024).fields() >= {"digest", "mime"}
+    assert CDXAnalyzer(plugins=["yearmonth"], precision=0).fields() == {"surt", "datetime", "bytes", "host", "year", "month"}
+
+
+@pytest.mark.parametrize("spec", ["nosuchplugin", "nosuchmodule:Plugin", "json:dumps", "cdxsummary.plugins:AnalyzerPlugin"])
+def test_invalid_plugins(spec):
+    with pytest.raises(ValueError):
+        plugin_class(spec)
+
+
+def test_unknown_fields_are_rejected():
+    class Broken(AnalyzerPlugin):
+        name = "broken"
+        fields = ("nosuchfield",)
+    with pytest.raises(ValueError):
+        plugin_class(Broken)
+
+
+def test_overview_only(cdx_file, cli):
+    report = json.loads(cli("-r", "-s", 0, "--plugins", "none", cdx_file).stdout)
+    assert report["captures"] == 3000
+    assert not {"tophosts", "mimestatus", "pathquery", "yearmonth", "samples"} & set(report)
@@ -0,0 +1,71 @@
+import pytest
+
+from cdxsummary.reader import MappedCDXFile
+
+
+@pytest.fixture
+def mapped(cdx_file):
+    mapped = MappedCDXFile(cdx_file)
+    yield mapped
+    mapped.close()
+
+
+def test_lines(mapped, cdx_lines):
+    assert list(mapped) == cdx_lines
+
+
+def test_start_offset(cdx_file, cdx_lines):
+    mapped = MappedCDXFile(cdx_file, start=sum(map(len, cdx_lines[:7])))
+    try:
+        assert list(mapped) == cdx_lines[7:]
+    finally:
+        mapped.close()
+
+
+@pytest.mark.parametrize("parts", [1, 2, 3, 7, 64])
+def test_split_points_are_line_aligned(mapped, cdx_lines, parts):
+    offsets = mapped.split_points(parts)
+    assert offsets[0] == 0 and offsets[-1] == len(mapped)
+    assert offsets == sorted(set(offsets))
+    assert len(offsets) == parts + 1
+    starts = {0}
+    for line in cdx_lines:
+        starts.add(max(starts) + len(line))
+    assert set(offsets) <= starts
+    assert [line for start, end in mapped.ranges(parts) for line in mapped.lines(start, end)] == cdx_lines
+
+
+def test_split_points_within_range(mapped, cdx_lines):
+    start, end = sum(map(len, cdx_lines[:100])), sum(map(len, cdx_lines[:900]))
+    assert [line for a, b in mapped.ranges(4, start=start, end=end) for line in mapped.lines(a, b)] == cdx_lines[100:900]
+
+
+def test_more_parts_than_lines(tmp_path):
+    path = tmp_path / "tiny.cdx"
+    path.write_bytes(b"a 1\nb 2\n")
+    mapped = MappedCDXFile(str(path))
+    try:
+        assert mapped.split_points(10) == [0, 4, 8]
+    finally:
+        mapped.close()
+
+
+def test_line_at(mapped, cdx_lines):
+    offset = sum(map(len, cdx_lines[:50]))
+    assert mapped.line_at(0) == (0, cdx_lines[0].rstrip(b"\n"))
+    assert mapped.line_at(offset) == (offset, cdx_lines[50].rstrip(b"\n"))
+    assert mapped.line_at(offset + 5) == (offset + len(cdx_lines[50]), cdx_lines[51].rstrip(b"\n"))
+    assert mapped.line_at(len(mapped)) is None
+    assert mapped.line_at(len(mapped) - 2) is None
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.cdx"
+    path.write_bytes(b"")
+    mapped = MappedCDXFile(str(path))
+    try:
+        assert list(mapped) == []
+        assert mapped.split_points(4) == [0, 0]
+        assert mapped.line_at(0) is None
+    finally:
+        mapped.close()
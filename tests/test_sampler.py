@@ -0,0 +1,97 @@
+import json
+import random
+
+from cdxsummary.analyzer import CDXAnalyzer
+from cdxsummary.sampler import BaseSampler, ReservoirSampler, StratifiedSampler, merge_samples
+
+
+def test_reservoir_is_uniform():
+    hits = [0] * 100
+    for seed in range(2000):
+        sampler = ReservoirSampler(size=10, seed=seed)
+        sampler.extend(range(100))
+        for item in sampler.samples():
+            hits[item] += 1
+    assert sum(hits) == 20000
+    assert all(140 <= count <= 260 for count in hits)
+
+
+def test_reservoir_calls_match_extend():
+    hits = [0] * 100
+    for seed in range(2000):
+        sampler = ReservoirSampler(size=10, seed=seed)
+        for item in range(100):
+            sampler(item)
+        assert sampler.processed() == 100
+        for item in sampler.samples():
+            hits[item] += 1
+    assert all(140 <= count <= 260 for count in hits)
+
+
+def test_short_stream_is_kept():
+    sampler = ReservoirSampler(size=10, seed=1)
+    sampler.extend(range(7))
+    assert sorted(sampler.samples()) == list(range(7))
+    assert sampler.processed() == 7
+
+
+def test_invalid_items_are_not_counted():
+    sampler = ReservoirSampler(size=5, valid=lambda item: item % 2, seed=1)
+    for item in range(100):
+        sampler(item)
+    assert sampler.processed() == 50
+    assert all(item % 2 for item in sampler.samples())
+
+
+def test_weighted_reservoir_merge():
+    mine = 0
+    for seed in range(2000):
+        merged = merge_samples(["a"] * 10, 900, ["b"] * 10, 100, 10, random.Random(seed))
+        assert len(merged) == 10
+        mine += merged.count("a")
+    assert 0.87 <= mine / 20000 <= 0.93
+
+
+def test_reservoir_merge_counts():
+    a, b = ReservoirSampler(size=10, seed=1), ReservoirSampler(size=10, seed=2)
+    a.extend(range(300))
+    b.extend(range(300, 305))
+    a.merge(list(b.samples()), b.processed())
+    assert a.processed() == 305
+    assert len(list(a.samples())) == 10
+
+
+def test_disabled_sampler_ignores_merges():
+    sampler = BaseSampler()
+    sampler.merge([("20200101000000", "http://a/")], 100)
+    assert list(sampler.samples()) == [] and sampler.processed() == 0
+
+
+def test_strata_are_sampled_separately():
+    sampler = StratifiedSampler(key=lambda item: item % 3, size=4, seed=1)
+    for item in range(300):
+        sampler(item)
+    strata = sampler.strata()
+    assert sorted(strata) == [0, 1, 2]
+    for key, stratum in strata.items():
+        assert stratum["sampled"] == 100
+        assert len(stratum["samples"]) == 4 and all(item % 3 == key for item in stratum["samples"])
+
+
+def test_strata_merge_and_limit():
+    a, b = StratifiedSampler(key=lambda item: item[0], size=2, seed=1), StratifiedSampler(key=lambda item: item[0], size=2, seed=2)
+    for i in range(50):
+        a(("x", i))
+        b(("y" if i % 5 else "x", i))
+    a.merge(b.strata())
+    strata = a.strata()
+    assert (strata["x"]["sampled"], strata["y"]["sampled"]) == (60, 40)
+    assert a.limit(1) == 1 and list(a.strata()) == ["x"]
+
+
+def test_report_strata(cdx_lines):
+    report = json.loads(json.dumps(CDXAnalyzer(samplesize=3, seed=1, strata=("mime",))(iter(cdx_lines))))
+    strata = report["strata"]["mime"]
+    ok = sum(len(line.split()) == 11 and line.split()[4] == b"200" for line in cdx_lines)
+    assert sum(stratum["sampled"] for stratum in strata.values()) == ok
+    assert all(len(stratum["samples"]) == min(3, stratum["sampled"]) for stratum in strata.values())
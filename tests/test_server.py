@@ -0,0 +1,186 @@
+import gzip
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.error import HTTPError
+from urllib.parse import parse_qs, quote, urlsplit
+from urllib.request import urlopen
+
+import pytest
+
+from cdxsummary.analyzer import CDXAnalyzer
+from conftest import ROOT
+
+
+PAGESIZE = 1000
+
+
+class Upstream(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+    def _send(self, status, body=b""):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        lines = self.server.lines
+        if url.path == "/cdx":
+            params = parse_qs(url.query)
+            self.server.queries.append(params)
+            if "showNumPages" in params:
+                return self._send(200, str(-(-len(lines) // PAGESIZE)).encode())
+            page = int(params["page"][0])
+            return self._send(200, b"".join(lines[page * PAGESIZE:(page + 1) * PAGESIZE]))
+        if url.path in ("/dl/small/small.cdx.gz", "/ok/small.cdx.gz"):
+            return self._send(200, gzip.compress(b"".join(lines)))
+        self._send(404, b"Not Found")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get(base, path):
+    try:
+        r = urlopen(f"{base}/{path}", timeout=60)
+        return r.status, r.headers, r.read()
+    except HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+@pytest.fixture(scope="module")
+def upstream(cdx_lines):
+    server = HTTPServer(("127.0.0.1", 0), Upstream)
+    server.lines = cdx_lines
+    server.queries = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope="module")
+def start(upstream, tmp_path_factory):
+    procs = []
+    def run(*extra):
+        root = tmp_path_factory.mktemp("root")
+        base = f"http://127.0.0.1:{upstream.server_address[1]}"
+        port = free_port()
+        env = dict(os.environ, PYTHONPATH=ROOT, NO_PROXY="*")
+        proc = subprocess.Popen([sys.executable, "-m", "cdxsummary", "serve", "-n", str(port), "-w", "1", "-r", str(root), "-B", f"{base}/dl", "-A", f"{base}/cdx", "--allow-url", f"{base}/ok", *extra], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env)
+        procs.append(proc)
+        url = f"http://127.0.0.1:{port}"
+        for _ in range(200):
+            try:
+                get(url, "health")
+                break
+            except OSError:
+                time.sleep(0.05)
+        return url, root, base
+    yield run
+    for proc in procs:
+        proc.send_signal(signal.SIGINT)
+        try:
+            proc.wait(timeout=20)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+
+@pytest.fixture(scope="module")
+def server(start, cdx_lines):
+    url, root, base = start()
+    (root / "input.cdx").write_bytes(b"".join(cdx_lines))
+    return url, base
+
+
+@pytest.fixture(scope="module")
+def expected(cdx_lines):
+    return json.loads(json.dumps(CDXAnalyzer()(iter(cdx_lines))))
+
+
+def test_health(server):
+    status, headers, body = get(server[0], "health")
+    assert status == 200
+    assert json.loads(body)["status"] == "ok"
+    assert headers.get("Access-Control-Allow-Origin") is None
+
+
+def test_report_of_local_file(server, expected):
+    status, _, body = get(server[0], "report?file=input.cdx&samples=0")
+    assert status == 200
+    assert json.loads(body) == expected
+
+
+def test_summary_of_item_from_upstream(server, expected):
+    status, _, body = get(server[0], "summary?item=small&samples=0")
+    summary = json.loads(body)
+    assert (status, summary["captures"]) == (200, expected["captures"])
+    assert "sketches" not in summary and len(summary["tophosts"]) == 10
+
+
+def test_allowed_url(server, expected):
+    status, _, body = get(server[0], f"report?url={quote(server[1])}/ok/small.cdx.gz&samples=0")
+    assert (status, json.loads(body)["captures"]) == (200, expected["captures"])
+
+
+def test_cdx_api_pages(server, upstream, expected):
+    status, _, body = get(server[0], "report?api=example.com&query=" + quote("matchType=prefix&url=evil.example") + "&samples=0")
+    assert (status, json.loads(body)["captures"]) == (200, expected["captures"])
+    assert {params["url"][0] for params in upstream.queries} == {"example.com"}
+    assert {params["matchType"][0] for params in upstream.queries} == {"prefix"}
+
+
+def test_progress_stream(server, expected):
+    status, headers, body = get(server[0], "report?file=input.cdx&samples=0&precision=10&progress=1")
+    events = [json.loads(line) for line in body.splitlines()]
+    assert (status, headers["Content-Type"]) == (200, "application/x-ndjson")
+    assert events[0]["job"] and events[-1]["status"] == "done"
+    assert events[-1]["report"]["captures"] == expected["captures"]
+
+
+@pytest.mark.parametrize("path,status", [
+    ("summary?item=missing", 404),
+    ("summary?item=../x", 400),
+    ("summary?file=../input.cdx", 403),
+    ("summary?file=missing.cdx", 404),
+    ("summary?url=http://169.254.169.254/latest", 403),
+    ("summary?item=small&samples=-3", 400),
+    ("summary?item=small&precision=2", 400),
+    ("summary?item=small&precision=40", 400),
+    ("summary?item=small&tophosts=many", 400),
+    ("summary?item=small&file=input.cdx", 400),
+    ("summary", 400),
+    ("unknown", 404)
+])
+def test_errors(server, path, status):
+    code, _, body = get(server[0], path)
+    assert code == status
+    assert json.loads(body)["error"]
+
+
+def test_stats(server):
+    stats = json.loads(get(server[0], "stats")[2])
+    assert stats["requests"] >= 1 and stats["workers"] == 1
+
+
+def test_cors_is_opt_in(start):
+    url, _, _ = start("--cors", "https://example.org")
+    _, headers, _ = get(url, "health")
+    assert headers["Access-Control-Allow-Origin"] == "https://example.org"
+    assert headers["Vary"] == "Origin"
@@ -0,0 +1,63 @@
+import pytest
+
+from cdxsummary.analyzer import CDXAnalyzer
+from cdxsummary.sketch import HyperLogLog
+
+
+def test_distinct_estimates(cdx_lines):
+    report = CDXAnalyzer(dedup=1024 * 1024)(iter(cdx_lines))
+    valid = [line.split() for line in cdx_lines if len(line.split()) == 11]
+    for key, values in (("urls", {fields[0] for fields in valid}), ("hosts", {fields[0].split(b")")[0] for fields in valid}), ("digests", {fields[5] for fields in valid})):
+        assert abs(report["distinct"][key] - len(values)) <= len(values) * 0.05, key
+
+
+def test_digest_sketch_needs_dedup(cdx_lines):
+    assert set(CDXAnalyzer()(iter(cdx_lines))["distinct"]) == {"urls", "hosts"}
+    assert set(CDXAnalyzer(dedup=1024 * 1024)(iter(cdx_lines))["distinct"]) == {"urls", "hosts", "digests"}
+    assert CDXAnalyzer(precision=0, dedup=1024 * 1024)(iter(cdx_lines))["distinct"] == {}
+
+
+def test_distinct_estimates_never_exceed_captures():
+    lines = [f"com,h{i})/ 20200101000000 http://h{i}.com/ text/html 200 D{i} - - 100 0 f.warc.gz\n".encode() for i in range(40)]
+    report = CDXAnalyzer(precision=4, dedup=1024 * 1024)(iter(sorted(lines)))
+    assert all(count <= report["captures"] for count in report["distinct"].values())
+
+
+def test_hll_fold_matches_lower_precision():
+    high, low = HyperLogLog(12), HyperLogLog(8)
+    for i in range(20000):
+        high.add(str(i).encode())
+        low.add(str(i).encode())
+    assert high.fold(8)._registers == low._registers
+    assert high.fold(12) is high
+
+
+def test_hll_merge_is_union():
+    a, b, union = HyperLogLog(10), HyperLogLog(10), HyperLogLog(10)
+    for i in range(5000):
+        (a if i % 3 else b).add(str(i).encode())
+        union.add(str(i).encode())
+    assert a.merge(b)._registers == union._registers
+
+
+def test_hll_merge_mixed_precision():
+    a, b, union = HyperLogLog(12), HyperLogLog(9), HyperLogLog(9)
+    for i in range(5000):
+        (a if i % 2 else b).add(str(i).encode())
+        union.add(str(i).encode())
+    merged = HyperLogLog.loads(a.merge(b).dumps())
+    assert merged._precision == 9
+    assert merged._registers == union._registers
+
+
+@pytest.mark.parametrize("count", [10, 1000, 50000])
+def test_hll_estimate(count):
+    sketch = HyperLogLog(12)
+    for i in range(count):
+        sketch.add(str(i).encode())
+    assert abs(len(sketch) - count) <= max(2, count * 0.05)
+
+
+def test_hll_precision_bounds():
+    with pytest.raises(ValueError):
+        HyperLogLog(3)
@@ -0,0 +1,49 @@
+import csv
+import json
+
+from cdxsummary.analyzer import CDXAnalyzer
+from cdxsummary.warcs import COLUMNS
+
+
+def records(lines):
+    return [line.decode().split() for line in lines if len(line.split()) == 11]
+
+
+def test_per_warc_stats(cdx_lines):
+    warcs = json.loads(json.dumps(CDXAnalyzer(samplesize=0, bywarc=True)(iter(cdx_lines))))["warcs"]
+    fields = records(cdx_lines)
+    assert sorted(warcs) == sorted({f[10] for f in fields})
+    for warc, stats in warcs.items():
+        mine = [f for f in fields if f[10] == warc]
+        sizes = [int(f[8]) if f[8].isdigit() else 0 for f in mine]
+        assert stats["captures"] == len(mine) == sum(stats["mimes"].values())
+        assert stats["bytes"] == sum(sizes)
+        assert stats["first"] == min(f[1] for f in mine) and stats["last"] == max(f[1] for f in mine)
+        assert stats["start"] == min(int(f[9]) for f in mine)
+        assert stats["end"] == max(int(f[9]) + size for f, size in zip(mine, sizes))
+
+
+def test_merged_partials(cdx_lines):
+    whole = json.loads(json.dumps(CDXAnalyzer(samplesize=0, bywarc=True)(iter(cdx_lines))))["warcs"]
+    merged = CDXAnalyzer(samplesize=0, bywarc=True)
+    for part in (cdx_lines[:1111], cdx_lines[1111:]):
+        analyzer = CDXAnalyzer(samplesize=0, bywarc=True)
+        analyzer(iter(part))
+        merged.merge(json.loads(json.dumps(analyzer.partial())))
+    assert json.loads(json.dumps(merged._report()))["warcs"] == whole
+
+
+def test_csv_table(tmp_path, cdx_file, cli):
+    table, jsonfile = tmp_path / "warcs.csv", tmp_path / "warcs.json"
+    cli("-r", "-s", 0, "--by-warc", table, cdx_file)
+    cli("-r", "-s", 0, "--by-warc", jsonfile, cdx_file)
+    warcs = json.loads(jsonfile.read_text())
+    with open(table, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0])[:len(COLUMNS)] == list(COLUMNS)
+    assert [row["warc"] for row in rows] == list(warcs)
+    for row in rows:
+        stats = warcs[row["warc"]]
+        assert [row[column] for column in COLUMNS[1:]] == [str(stats[column]) for column in COLUMNS[1:]]
+        assert {group: int(count) for group, count in list(row.items())[len(COLUMNS):] if int(count)} == stats["mimes"]
+    assert not list(tmp_path.glob("*.tmp"))
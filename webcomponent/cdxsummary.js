@@ -287,14 +287,15 @@ ${this.sampleCapturesList()}
     this.report = this.getAttribute('report') || '';
     this.src = this.getAttribute('src') || '';
     this.item = this.getAttribute('item') || '';
+    this.service = (this.getAttribute('service') || '').replace(/\/+$/, '');
     if(this.item && !this.src) {
-      this.src = `${this.PETABOX}${this.item}/${this.item}.summary.json`;
+      this.src = this.service ? `${this.service}/summary?item=${encodeURIComponent(this.item)}` : `${this.PETABOX}${this.item}/${this.item}.summary.json`;
     }
     if(this.item && !this.report) {
-      this.report = `${this.PETABOX}${this.item}/${this.item}.report.json.gz`;
+      this.report = this.service ? `${this.service}/report?item=${encodeURIComponent(this.item)}` : `${this.PETABOX}${this.item}/${this.item}.report.json.gz`;
     }
     if(!this.name) {
-      this.name = this.src.split('/').pop().replace(/(.summary)?.json$/, '');
+      this.name = this.item || this.src.split('/').pop().replace(/(.summary)?.json$/, '');
     }
     this.data['msg'] = this.src ? 'Loading summary...' : 'Either "src" or "item" attribute is required for the &lt;cdx-summary&gt; element!';
 